@@ -0,0 +1,341 @@
+import hashlib
+import os
+import posixpath
+import re
+import shlex
+import tempfile
+import urllib.parse
+import urllib.request
+from threading import Lock
+
+from config import (ARTIFACTS_DIR, DOCKER_INSTALL_URL, K3S_CHANNEL_URL, K3S_INSTALL_URL,
+                    K3S_RELEASE_URL, P2P_SERVE_LIFETIME)
+from ssh import _ssh_run_live
+
+# Owned by the SSH user, mode 700, inside a root-owned parent that nobody
+# else can create or swap: files are later installed and run through sudo.
+REMOTE_STAGING_ROOT = '/var/lib/k3sforge'
+REMOTE_STAGING_DIR  = posixpath.join(REMOTE_STAGING_ROOT, 'staging')
+
+# `uname -m` → (K3s release arch, binary asset name)
+_ARCHES = {
+    'x86_64':  ('amd64', 'k3s'),
+    'amd64':   ('amd64', 'k3s'),
+    'aarch64': ('arm64', 'k3s-arm64'),
+    'arm64':   ('arm64', 'k3s-arm64'),
+    'armv7l':  ('arm',   'k3s-armhf'),
+}
+
+_fetch_locks      = {}   # local path -> Lock, so each artifact is downloaded once
+_fetch_locks_lock = Lock()
+
+_digests      = {}   # (local path, size, mtime) -> sha256 hex
+_digests_lock = Lock()
+
+
+# ── Local cache ───────────────────────────────────────────────────────────
+
+def _download(url: str, dest: str, timeout: int = 60):
+    """Stream *url* into *dest* atomically (temp file + rename)."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out, urllib.request.urlopen(url, timeout=timeout) as resp:
+            while True:
+                chunk = resp.read(1 << 20)
+                if not chunk:
+                    break
+                out.write(chunk)
+        os.replace(tmp_path, dest)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _local_digest(path: str) -> str:
+    """sha256 of a cached file, hashed once per (size, mtime)."""
+    st  = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _digests_lock:
+        if key in _digests:
+            return _digests[key]
+    digest = _sha256_file(path)
+    with _digests_lock:
+        _digests[key] = digest
+    return digest
+
+
+def _ensure_artifact(path: str, url: str) -> str:
+    """Return *path*, downloading it from *url* first unless it is already
+    cached (or was pre-seeded by hand for offline deploys)."""
+    with _fetch_locks_lock:
+        lock = _fetch_locks.setdefault(path, Lock())
+    with lock:
+        if not os.path.isfile(path):
+            _download(url, path)
+    return path
+
+
+_K3S_VERSION_RE = re.compile(r'^v(\d+)\.(\d+)\.(\d+)\+k3s(\d+)$')
+
+
+def _version_key(name: str):
+    """Sort key for K3s versions (v1.30.2+k3s1): numeric, so v1.30 ranks
+    above v1.9 and +k3s10 above +k3s2. Anything else sorts first."""
+    match = _K3S_VERSION_RE.match(name)
+    return (1, tuple(int(n) for n in match.groups())) if match else (0, ())
+
+
+def _resolve_k3s_version(version: str = '') -> str:
+    """Pin *version*, or ask the stable channel which release is current.
+
+    Offline, falls back to the newest version already present in the cache.
+    """
+    if version:
+        return version
+    try:
+        with urllib.request.urlopen(K3S_CHANNEL_URL, timeout=15) as resp:
+            return urllib.parse.unquote(resp.geturl().rstrip('/').rsplit('/', 1)[-1])
+    except Exception:
+        k3s_dir = os.path.join(ARTIFACTS_DIR, 'k3s')
+        cached  = sorted(os.listdir(k3s_dir), key=_version_key) if os.path.isdir(k3s_dir) else []
+        if not cached:
+            raise ValueError('Cannot resolve the K3s version: no network and no cached release.')
+        return cached[-1]
+
+
+def _k3s_install_script() -> str:
+    return _ensure_artifact(os.path.join(ARTIFACTS_DIR, 'scripts', 'k3s-install.sh'),
+                            K3S_INSTALL_URL)
+
+
+def _docker_install_script() -> str:
+    return _ensure_artifact(os.path.join(ARTIFACTS_DIR, 'scripts', 'get-docker.sh'),
+                            DOCKER_INSTALL_URL)
+
+
+class _K3sRelease:
+    """One K3s version held in the local artifact cache.
+
+    Layout: artifacts/k3s/<version>/{k3s*, k3s-airgap-images-<arch>.tar.zst,
+    sha256sum-<arch>.txt}. Files are fetched from GitHub on first use and
+    verified against the release checksums; an asset that cannot be verified
+    is never handed out.
+    """
+
+    def __init__(self, version: str, airgap: bool = False):
+        self.version   = version
+        self.airgap    = airgap
+        self.dir       = os.path.join(ARTIFACTS_DIR, 'k3s', version)
+        self._verified = {}   # asset -> local path, checksum already checked
+        self._lock     = Lock()
+
+    def _url(self, asset: str) -> str:
+        return K3S_RELEASE_URL.format(version=urllib.parse.quote(self.version, safe=''),
+                                      asset=asset)
+
+    def _checksums(self, arch: str) -> dict:
+        """Release checksums by asset name. Raises ValueError when they can
+        be neither downloaded nor found in the cache."""
+        name = f'sha256sum-{arch}.txt'
+        try:
+            path = _ensure_artifact(os.path.join(self.dir, name), self._url(name))
+        except Exception as exc:
+            raise ValueError(f'Cannot fetch the K3s {self.version} checksums ({name}): {exc}')
+        sums = {}
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    sums[parts[1].lstrip('*')] = parts[0]
+        return sums
+
+    def _asset(self, arch: str, asset: str) -> str:
+        with self._lock:
+            if asset in self._verified:
+                return self._verified[asset]
+            path     = _ensure_artifact(os.path.join(self.dir, asset), self._url(asset))
+            expected = self._checksums(arch).get(asset)
+            if expected is None:
+                raise ValueError(f'No checksum for {asset} in the K3s {self.version} release.')
+            if _local_digest(path) != expected:
+                os.unlink(path)
+                raise ValueError(f'Checksum mismatch for cached {asset} ({self.version}).')
+            self._verified[asset] = path
+            return path
+
+    def files_for(self, machine: str) -> dict:
+        """Local paths for the node architecture reported by `uname -m`."""
+        if machine not in _ARCHES:
+            raise ValueError(f'Unsupported node architecture: {machine}')
+        arch, binary = _ARCHES[machine]
+        files = {'script': _k3s_install_script(), 'binary': self._asset(arch, binary)}
+        if self.airgap:
+            files['images'] = self._asset(arch, f'k3s-airgap-images-{arch}.tar.zst')
+        return files
+
+    def manifest(self, machine: str) -> dict:
+        """Map each file in `files_for` to (local path, staging name, sha256)."""
+        files = self.files_for(machine)
+        names = {'script': 'k3s-install.sh', 'binary': 'k3s'}
+        return {
+            key: (path, names.get(key, os.path.basename(path)), _local_digest(path))
+            for key, path in files.items()
+        }
+
+
+# ── Push to nodes ─────────────────────────────────────────────────────────
+
+def _run_checked(client, cmd: str, abort, timeout: int = 120):
+    rc = None
+    for _, code in _ssh_run_live(client, cmd, timeout=timeout, abort=abort):
+        if code is not None:
+            rc = code
+    if rc != 0:
+        raise RuntimeError(f'Remote command failed (rc={rc}): {cmd}')
+
+
+def _remote_machine(client, abort) -> str:
+    lines = [line for line, code in _ssh_run_live(client, 'uname -m', timeout=15, abort=abort)
+             if code is None]
+    return lines[0].strip() if lines else ''
+
+
+def _remote_digests(client, names: list, abort) -> dict:
+    """sha256 of the given files in the node's staging dir (missing ones omitted)."""
+    quoted = ' '.join(shlex.quote(n) for n in names)
+    cmd    = f'cd {REMOTE_STAGING_DIR} 2>/dev/null && sha256sum {quoted} 2>/dev/null'
+    found  = {}
+    for line, code in _ssh_run_live(client, cmd, timeout=120, abort=abort):
+        parts = (line or '').split()
+        if code is None and len(parts) == 2:
+            found[parts[1].lstrip('*')] = parts[0]
+    return found
+
+
+def _ensure_staging_dir(client, abort):
+    """Create the node's staging dir if needed and check that nobody but the
+    SSH user (and root) can write to it. Raises RuntimeError otherwise."""
+    root, path = REMOTE_STAGING_ROOT, REMOTE_STAGING_DIR
+    _run_checked(client, (
+        f'(sudo install -d -o root -g root -m 755 {root} && '
+        f'sudo install -d -o "$(id -u)" -g "$(id -g)" -m 700 {path} && '
+        f'test "$(stat -c %u:%a {root})" = 0:755 && '
+        f'test "$(stat -c %u:%a {path})" = "$(id -u):700") 2>&1'
+    ), abort, timeout=30)
+
+
+def _verify_cmd(remote_path: str, digest: str) -> str:
+    """Shell check that *remote_path* still has sha256 *digest*; chain it
+    with `&&` right before the sudo command that uses the file."""
+    return f'echo "{digest}  {remote_path}" | sha256sum -c --quiet'
+
+
+def _sftp_put(client, local_path: str, remote_name: str) -> str:
+    """Upload *local_path* into the node's staging dir (see
+    `_ensure_staging_dir`) over the existing transport and return the remote
+    path."""
+    remote_path = posixpath.join(REMOTE_STAGING_DIR, remote_name)
+    sftp = client.open_sftp()
+    try:
+        sftp.put(local_path, remote_path)
+    finally:
+        sftp.close()
+    return remote_path
+
+
+def _seed_release(client, manifest: dict, abort) -> dict:
+    """Upload the files of *manifest* the node's staging dir does not already
+    hold with the right checksum. Returns key -> remote path."""
+    _ensure_staging_dir(client, abort)
+    present = _remote_digests(client, [name for _, name, _ in manifest.values()], abort)
+    remote  = {}
+    for key, (path, name, digest) in manifest.items():
+        if present.get(name) == digest:
+            remote[key] = posixpath.join(REMOTE_STAGING_DIR, name)
+        else:
+            remote[key] = _sftp_put(client, path, name)
+    return remote
+
+
+def _push_k3s_release(client, release: _K3sRelease, abort) -> tuple:
+    """Place the cached K3s binary (and airgap images) on the node.
+
+    Files already staged on the node (e.g. by peer distribution) are reused
+    when their checksum matches; every file is re-verified right before sudo
+    installs it. Returns (remote path, sha256) of the install script, to be
+    run with INSTALL_K3S_SKIP_DOWNLOAD=true after `_verify_cmd`.
+    """
+    manifest = release.manifest(_remote_machine(client, abort))
+    files    = _seed_release(client, manifest, abort)
+    binary   = files['binary']
+    _run_checked(client, f'{_verify_cmd(binary, manifest["binary"][2])} && '
+                         f'sudo install -m 755 {binary} /usr/local/bin/k3s 2>&1', abort)
+    if 'images' in files:
+        images     = files['images']
+        images_dir = '/var/lib/rancher/k3s/agent/images'
+        _run_checked(client, f'{_verify_cmd(images, manifest["images"][2])} && '
+                             f'sudo mkdir -p {images_dir} && '
+                             f'sudo install -m 644 {images} {images_dir}/ 2>&1', abort)
+    return files['script'], manifest['script'][2]
+
+
+def _push_docker_script(client, abort=None) -> tuple:
+    """Upload the cached get.docker.com script; return its remote path and
+    sha256, to be checked with `_verify_cmd` before running it."""
+    local = _docker_install_script()
+    _ensure_staging_dir(client, abort)
+    return _sftp_put(client, local, 'get-docker.sh'), _local_digest(local)
+
+
+# ── Peer-to-peer distribution ─────────────────────────────────────────────
+
+def _serve_staging(client, ip: str, port: int, abort):
+    """Serve the node's staging dir over HTTP so peers can pull from it.
+
+    The server listens on *ip* (the node's inventory address) only, and
+    exits by itself after P2P_SERVE_LIFETIME seconds should `_stop_serving`
+    never run.
+    """
+    host = shlex.quote(ip)
+    _run_checked(client, (
+        f'cd {REMOTE_STAGING_DIR} && '
+        f'(test -f .httpd.pid && kill -0 $(cat .httpd.pid) 2>/dev/null || '
+        f'(nohup timeout {P2P_SERVE_LIFETIME} python3 -m http.server {port} --bind {host} '
+        f'>/dev/null 2>&1 & echo $! > .httpd.pid)) && '
+        f'for i in $(seq 40); do '
+        f'curl -sf -o /dev/null http://{host}:{port}/ && exit 0; sleep 0.25; done; exit 1'
+    ), abort, timeout=30)
+
+
+def _stop_serving(client, abort):
+    _run_checked(client, (
+        f'cd {REMOTE_STAGING_DIR} 2>/dev/null && test -f .httpd.pid && '
+        f'kill $(cat .httpd.pid) 2>/dev/null; rm -f {REMOTE_STAGING_DIR}/.httpd.pid; true'
+    ), abort, timeout=15)
+
+
+def _pull_from_peer(client, peer_ip: str, port: int, manifest: dict, rate_limit: str,
+                    abort, timeout: int = 900):
+    """Have the node behind *client* fetch *manifest* from a peer's staging
+    dir, capped at *rate_limit* (curl syntax, e.g. '50M'), and verify it."""
+    limit = f'--limit-rate {rate_limit} ' if rate_limit else ''
+    _ensure_staging_dir(client, abort)
+    steps = [f'cd {REMOTE_STAGING_DIR}']
+    for _, name, digest in manifest.values():
+        q = shlex.quote(name)
+        steps.append(f'curl -sfS {limit}-o {q}.part http://{peer_ip}:{port}/{q}')
+        steps.append(f'echo "{digest}  {q}.part" | sha256sum -c --status')
+        steps.append(f'mv {q}.part {q}')
+    _run_checked(client, '(' + ' && '.join(steps) + ') 2>&1', abort, timeout=timeout)
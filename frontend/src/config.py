@@ -1,27 +1,82 @@
 import os
-from threading import Lock, Event
 
 # ── Path constants ────────────────────────────────────────────────────────
 _SRC_DIR          = os.path.dirname(__file__)
 WORKSPACE_ROOT    = os.path.abspath(os.path.join(_SRC_DIR, '..', '..'))
 K3S_TEMPLATES_DIR = os.path.join(_SRC_DIR, 'k3s_templates')
 K3S_INVENTORY_DIR = os.path.join(WORKSPACE_ROOT, 'inventory')
+ARTIFACTS_DIR     = os.path.join(WORKSPACE_ROOT, 'artifacts')
 
 os.makedirs(K3S_INVENTORY_DIR, exist_ok=True)
 
-# ── Shared deploy / uninstall state ──────────────────────────────────────
-proc_lock  = Lock()
-abort_flag = Event()
+# ── Clusters ──────────────────────────────────────────────────────────────
+# The default cluster uses inventory/ itself; any other cluster id keeps its
+# node files in inventory/<cluster id>/.
+DEFAULT_CLUSTER_ID = 'default'
+IMPORT_MAX_ERRORS  = 100   # per-row errors reported by /import-inventory before it stops
 
+# ── Deploy tuning ─────────────────────────────────────────────────────────
+DEFAULT_PARALLELISM = 10   # nodes joined concurrently when ?parallelism= is omitted
+MAX_PARALLELISM     = 64
+DOCKER_NODE_TIMEOUT = 420  # seconds; overall budget for the Docker phase on one node
+STAGE_WAIT_TIMEOUT  = 660  # seconds a joining node waits for its pre-staging before a full install
 
-class _DeployState:
-    """Mutable container for deploy/uninstall runtime state.
+# ── Readiness probing ─────────────────────────────────────────────────────
+READY_TIMEOUT               = 120                    # seconds to wait for an API server / kubelet
+READY_BACKOFF               = (0.25, 0.5, 1, 1, 2)   # probe delays; the last one repeats
+READY_SSH_FALLBACK_INTERVAL = 5                      # min seconds between SSH fallback probes
 
-    Using an object instead of module-level globals lets every module
-    mutate the same instance after a simple `from config import deploy_state`.
-    """
-    status       = 'idle'   # idle | running | success | failed | aborted
-    current_proc = None     # subprocess.Popen | None  (kept for abort compat)
+# ── Pre-flight checks ─────────────────────────────────────────────────────
+PREFLIGHT_FACTS_TTL     = 300    # seconds gathered node facts are reused
+PREFLIGHT_TIMEOUT       = 60     # per-node budget for connecting and gathering facts
+PREFLIGHT_MIN_DISK_MB   = 2048   # free space needed under /var/lib
+PREFLIGHT_MIN_MEMORY_MB = 512
 
+# ── Installer sources / local artifact cache ──────────────────────────────
+K3S_INSTALL_URL    = 'https://get.k3s.io'
+DOCKER_INSTALL_URL = 'https://get.docker.com'
+K3S_CHANNEL_URL    = 'https://update.k3s.io/v1-release/channels/stable'
+K3S_RELEASE_URL    = 'https://github.com/k3s-io/k3s/releases/download/{version}/{asset}'
 
-deploy_state = _DeployState()
+# ── Peer-to-peer artifact distribution ────────────────────────────────────
+P2P_PORT           = 45873   # port nodes serve their staging dir on while distributing
+P2P_FANOUT         = 2       # peers each holder feeds per round
+P2P_RATE_LIMIT     = ''      # default per-hop cap in curl --limit-rate syntax ('' = none)
+P2P_SERVE_LIFETIME = 3600    # seconds a node's artifact server lives at most if never stopped
+
+# ── Background jobs ───────────────────────────────────────────────────────
+JOB_EVENT_BUFFER       = 5000  # SSE events kept per job for Last-Event-ID replay
+JOB_HISTORY            = 20    # finished jobs kept around for late subscribers
+SSE_KEEPALIVE_INTERVAL = 15    # seconds between keepalive comments on idle streams
+
+# ── In-process Kubernetes API client ──────────────────────────────────────
+KUBEAPI_POOL_SIZE   = 4    # idle keep-alive connections kept per cluster
+KUBEAPI_MAX_CLIENTS = 16   # kubeconfigs with a live client (least recently used evicted)
+KUBEAPI_TIMEOUT     = 30   # seconds per API request
+SNAPSHOT_TIMEOUT    = 35   # seconds /cluster-snapshot waits for its slowest section
+KUBE_SESSION_TTL    = 1800 # idle seconds before a kubeconfig session is dropped
+KUBE_SESSION_MAX    = 64   # live kubeconfig sessions (least recently used evicted)
+KUBE_CACHE_TTL      = 5    # seconds a cluster read is served from the response cache
+KUBE_CACHE_MAX      = 256  # cached (cluster, section) responses
+PODS_PAGE_SIZE      = 500  # pods per API page when /kubectl-pods streams
+PODS_MAX_LIMIT      = 5000 # largest page a client may ask for
+
+# ── Live resource watches ─────────────────────────────────────────────────
+WATCH_TIMEOUT     = 60     # seconds per upstream watch request before it is renewed
+WATCH_LINGER      = 30     # seconds an unwatched upstream watch is kept alive
+WATCH_QUEUE_SIZE  = 2000   # events a slow browser may lag before it is resynced
+WATCH_BACKOFF_MAX = 30     # cap on the retry delay after upstream errors
+
+# ── Metrics history ───────────────────────────────────────────────────────
+METRICS_INTERVAL  = 10     # seconds between metrics-server polls per cluster
+METRICS_TIERS     = (('10s', 10, 360), ('1m', 60, 1440), ('10m', 600, 1008))  # name, step, slots
+METRICS_IDLE_STOP = 3600   # stop sampling a cluster nobody queried for this long
+METRICS_PODS      = False  # also sample per-pod usage (one series pair per pod)
+
+# ── SSH connection pool ───────────────────────────────────────────────────
+SSH_KEEPALIVE_INTERVAL = 30    # seconds between transport keepalive packets
+SSH_IDLE_TIMEOUT       = 300   # pooled connections unused this long are closed
+SSH_KEY_CACHE_TTL      = 900   # parsed private keys kept for connection-test sessions
+SSH_TEST_PARALLELISM   = 32    # hosts /test-ssh-all probes at the same time
+SSH_TEST_TIMEOUT       = 10    # per-host connect/auth timeout
+SSH_TEST_DEADLINE      = 30    # whole-batch budget; hosts still pending are reported as timed out
@@ -2,18 +2,32 @@ import json
 import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
 
-from flask import Blueprint, Response, jsonify, request
+from flask import Blueprint, jsonify, request
 from jinja2 import Environment, FileSystemLoader
 
-from config import K3S_TEMPLATES_DIR, abort_flag, deploy_state, proc_lock
-from inventory import _load_inventory
-from ssh import _open_ssh_client, _ssh_run_live, _write_temp_key
+from artifacts import (_K3sRelease, _pull_from_peer, _push_docker_script, _push_k3s_release,
+                       _remote_machine, _resolve_k3s_version, _seed_release, _serve_staging,
+                       _stop_serving, _verify_cmd)
+from config import (DEFAULT_PARALLELISM, DOCKER_NODE_TIMEOUT, K3S_INSTALL_URL,
+                    K3S_TEMPLATES_DIR, MAX_PARALLELISM, P2P_FANOUT, P2P_PORT,
+                    P2P_RATE_LIMIT, STAGE_WAIT_TIMEOUT)
+from inventory import _inventory_errors, _load_inventory, _local_kubeconfig_path
+from jobs import (_Job, _job_response, _last_event_id, _latest_job, _request_cluster_id,
+                  _SelectableEvent, _start_job, _valid_cluster_id)
+from parallel import _gen_parallel
+from preflight import _converged, _forget_facts, _gen_preflight
+from readiness import _wait_apiserver, _wait_kubelet
+from ssh import _SSHPool, _remove_temp_key, _ssh_run_live, _write_temp_key
 
 installer_bp = Blueprint('installer', __name__)
 
 _jinja_env = None
 
+_RATE_RE = re.compile(r'^\d+[KkMmGg]?$')   # curl --limit-rate syntax
+
 
 def _get_jinja_env() -> Environment:
     global _jinja_env
@@ -25,16 +39,34 @@ def _get_jinja_env() -> Environment:
 
 # ── Sub-generators ────────────────────────────────────────────────────────
 
-def _gen_docker_on_node(ip: str, name: str, username: str, key_path: str):
-    """Sub-generator: ensure Docker is installed on the node."""
+def _gen_docker_on_node(ip: str, name: str, username: str, key_path: str,
+                        pool: _SSHPool, abort, node_timeout: int = DOCKER_NODE_TIMEOUT,
+                        cached: bool = False, installed: bool = False):
+    """Sub-generator: ensure Docker is installed on the node.
+
+    Every remote command is capped by what is left of *node_timeout*, so one
+    slow node cannot hold the phase open past its budget. With *cached*, the
+    install script is pushed from the local artifact cache. *installed*
+    (known from pre-flight facts gathered in this run) skips the node
+    without connecting.
+    """
     def _sse(d): return f"data: {json.dumps(d)}\n\n"
+    deadline = time.monotonic() + node_timeout
+
+    def _budget(cmd_timeout):
+        return max(1, min(cmd_timeout, int(deadline - time.monotonic())))
+
     client = None
     try:
         yield _sse({'type': 'node_start', 'step': 'docker', 'node': name})
-        client = _open_ssh_client(ip, username, key_path)
+        if installed:
+            yield _sse({'type': 'node_done', 'step': 'docker', 'node': name})
+            return 0
+        client = pool.acquire(ip, username, key_path, connect_timeout=_budget(30))
 
         rc = None
-        for _, code in _ssh_run_live(client, 'docker --version 2>&1', timeout=10):
+        for _, code in _ssh_run_live(client, 'docker --version 2>&1', timeout=_budget(10),
+                                     abort=abort):
             if code is not None:
                 rc = code
 
@@ -42,21 +74,27 @@ def _gen_docker_on_node(ip: str, name: str, username: str, key_path: str):
             yield _sse({'type': 'node_done', 'step': 'docker', 'node': name})
             return 0
 
+        if cached:
+            script, digest = _push_docker_script(client, abort)
+            docker_cmd     = f'{_verify_cmd(script, digest)} && sudo sh {script} 2>&1'
+        else:
+            docker_cmd = 'curl -fsSL https://get.docker.com | sudo sh 2>&1'
         rc = None
-        for _, code in _ssh_run_live(
-                client, 'curl -fsSL https://get.docker.com | sudo sh 2>&1', timeout=300):
+        for _, code in _ssh_run_live(client, docker_cmd, timeout=_budget(300), abort=abort):
             if code is not None:
                 rc = code
 
         if rc != 0:
             yield _sse({'type': 'node_failed', 'step': 'docker', 'node': name})
-            return rc
+            return rc if rc is not None else -1
 
         for _, _ in _ssh_run_live(
-                client, 'sudo systemctl enable --now docker 2>&1', timeout=30):
+                client, 'sudo systemctl enable --now docker 2>&1',
+                timeout=_budget(30), abort=abort):
             pass
         for _, _ in _ssh_run_live(
-                client, f'sudo usermod -aG docker {username} 2>&1', timeout=10):
+                client, f'sudo usermod -aG docker {username} 2>&1',
+                timeout=_budget(10), abort=abort):
             pass
 
         yield _sse({'type': 'node_done', 'step': 'docker', 'node': name})
@@ -67,43 +105,148 @@ def _gen_docker_on_node(ip: str, name: str, username: str, key_path: str):
         return -1
     finally:
         if client:
-            client.close()
+            pool.release(client)
+
+
+def _fresh_docker(facts: dict, since: float) -> bool:
+    """Docker is known installed from facts gathered after *since*; cached
+    facts may predate a removal."""
+    return bool(facts.get('docker')) and facts.get('gathered_at', 0) >= since
+
+
+def _upload_k3s_config(client, config_content: str) -> int:
+    """Write *config_content* to /etc/rancher/k3s/config.yaml; return tee's rc."""
+    stdin, stdout, _ = client.exec_command(
+        'sudo mkdir -p /etc/rancher/k3s && sudo tee /etc/rancher/k3s/config.yaml',
+        timeout=15,
+    )
+    stdin.write(config_content.encode('utf-8'))
+    stdin.channel.shutdown_write()
+    stdout.read()
+    return stdout.channel.recv_exit_status()
+
+
+def _k3s_service_name(install_args: str) -> str:
+    return 'k3s-agent' if install_args.split()[0] == 'agent' else 'k3s'
+
+
+def _k3s_install_cmd(client, install_args: str, abort, release: _K3sRelease = None,
+                     skip_start: bool = False) -> str:
+    """Build the K3s install command for the node behind *client*.
+
+    Without *release* the node downloads the script and binary itself; with
+    one, both are pushed from the local cache first and the script runs
+    with INSTALL_K3S_SKIP_DOWNLOAD once its checksum is verified on the node.
+    """
+    env = 'INSTALL_K3S_SKIP_START=true ' if skip_start else ''
+    if release is None:
+        return f'curl -sfL {K3S_INSTALL_URL} | sudo {env}sh -s - {install_args} 2>&1'
+    script, digest = _push_k3s_release(client, release, abort)
+    return (f'{_verify_cmd(script, digest)} && '
+            f'sudo INSTALL_K3S_SKIP_DOWNLOAD=true {env}sh {script} {install_args} 2>&1')
+
+
+def _stage_k3s_on_node(ip: str, username: str, key_path: str, pool: _SSHPool,
+                       abort, config_content: str, install_args: str,
+                       release: _K3sRelease = None) -> bool:
+    """Upload the node config and install K3s without starting it.
+
+    Runs in a background thread while the primordial master boots and stops
+    when *abort* (the stager's own event, not the job's) is set. Returns
+    True when only `systemctl start` is left to do on the node.
+    """
+    client = None
+    try:
+        client = pool.acquire(ip, username, key_path)
+        if _upload_k3s_config(client, config_content) != 0 or abort.is_set():
+            return False
+        stage_cmd = _k3s_install_cmd(client, install_args, abort, release, skip_start=True)
+        rc = None
+        for _, code in _ssh_run_live(client, stage_cmd, timeout=600, abort=abort):
+            if code is not None:
+                rc = code
+        return rc == 0
+    except Exception:
+        return False
+    finally:
+        if client:
+            pool.release(client)
 
 
 def _gen_k3s_on_node(ip: str, name: str, username: str, key_path: str,
-                     config_content: str, install_args: str, step_id: str):
-    """Sub-generator: upload /etc/rancher/k3s/config.yaml and run the installer."""
+                     pool: _SSHPool, abort, config_content: str, install_args: str,
+                     step_id: str, staging=None, release: _K3sRelease = None,
+                     wait_ready: bool = False, converged: bool = False):
+    """Sub-generator: upload /etc/rancher/k3s/config.yaml and run the installer.
+
+    *staging* is the Future of a `_stage_k3s_on_node` call, if any. When it
+    succeeded only the K3s service is started; when it failed the node falls
+    back to the full install, and when it is still running after
+    STAGE_WAIT_TIMEOUT the node fails. *release* selects the local artifact
+    cache. With *wait_ready*, the node is only done once its own API server (servers) or
+    kubelet (agents) reports healthy. A *converged* node already runs this
+    config and is reported as skipped without connecting.
+    """
     def _sse(d): return f"data: {json.dumps(d)}\n\n"
+    if converged:
+        yield _sse({'type': 'node_skipped', 'step': step_id, 'node': name,
+                    'reason': 'K3s already running with this config'})
+        return 0
     client = None
     try:
         yield _sse({'type': 'node_start', 'step': step_id, 'node': name})
-        client = _open_ssh_client(ip, username, key_path)
+        # Never fall back to a full install while pre-staging may still be
+        # touching the node: wait for it, or fail the node once it overruns.
+        staged   = False
+        deadline = time.monotonic() + STAGE_WAIT_TIMEOUT
+        while staging is not None and not abort.is_set():
+            try:
+                staged = staging.result(timeout=1)
+                break
+            except FutureTimeout:
+                if time.monotonic() >= deadline:
+                    yield _sse({'type': 'log', 'step': step_id, 'node': name,
+                                'msg': f'Pre-staging did not finish within {STAGE_WAIT_TIMEOUT}s'})
+                    yield _sse({'type': 'node_failed', 'step': step_id, 'node': name})
+                    return -1
+        if abort.is_set():
+            return -1
+        client = pool.acquire(ip, username, key_path)
 
-        stdin, stdout, _ = client.exec_command(
-            'sudo mkdir -p /etc/rancher/k3s && sudo tee /etc/rancher/k3s/config.yaml',
-            timeout=15,
-        )
-        stdin.write(config_content.encode('utf-8'))
-        stdin.channel.shutdown_write()
-        stdout.read()
-        tee_rc = stdout.channel.recv_exit_status()
-        if tee_rc != 0:
-            yield _sse({'type': 'node_failed', 'step': step_id, 'node': name})
-            return tee_rc
+        if staged:
+            install_cmd = f'sudo systemctl start {_k3s_service_name(install_args)} 2>&1'
+        else:
+            tee_rc = _upload_k3s_config(client, config_content)
+            if tee_rc != 0:
+                yield _sse({'type': 'node_failed', 'step': step_id, 'node': name})
+                return tee_rc
+            install_cmd = _k3s_install_cmd(client, install_args, abort, release)
 
-        install_cmd = f'curl -sfL https://get.k3s.io | sudo sh -s - {install_args} 2>&1'
         rc = None
-        for _, code in _ssh_run_live(client, install_cmd, timeout=600):
+        for _, code in _ssh_run_live(client, install_cmd, timeout=600, abort=abort):
             if code is not None:
                 rc = code
 
-        if abort_flag.is_set():
+        if abort.is_set():
             return -1
 
         if rc != 0:
             yield _sse({'type': 'node_failed', 'step': step_id, 'node': name})
             return rc
 
+        if wait_ready:
+            if install_args == 'server':
+                ready = _wait_apiserver(ip, client, abort)
+            else:
+                ready = _wait_kubelet(client, abort)
+            yield _sse({'type': 'metric', 'step': step_id, 'node': name,
+                        'name': 'time_to_ready', **ready})
+            if abort.is_set():
+                return -1
+            if not ready['ready']:
+                yield _sse({'type': 'node_failed', 'step': step_id, 'node': name})
+                return -1
+
         yield _sse({'type': 'node_done', 'step': step_id, 'node': name})
         return 0
 
@@ -112,25 +255,200 @@ def _gen_k3s_on_node(ip: str, name: str, username: str, key_path: str,
         return -1
     finally:
         if client:
-            client.close()
+            pool.release(client)
+
+
+# ── Peer-to-peer artifact distribution ────────────────────────────────────
+
+def _gen_distribute(nodes: list, username: str, key_path: str, pool: _SSHPool, abort,
+                    release: _K3sRelease, parallelism: int, fanout: int = P2P_FANOUT,
+                    rate_limit: str = P2P_RATE_LIMIT, port: int = P2P_PORT):
+    """Sub-generator: stage *release* on every node, peer to peer.
+
+    One node per architecture is seeded over SFTP; from then on, every node
+    holding the files serves them and up to *fanout* others pull from it per
+    round, so the number of holders grows geometrically and total time grows
+    with log(nodes) rather than with nodes. Each hop is capped at
+    *rate_limit* and checksum-verified. A node that cannot pull from its peer
+    falls back to a direct SFTP push.
+    """
+    def _sse(d): return f"data: {json.dumps(d)}\n\n"
+
+    def _with_client(node, fn):
+        client = pool.acquire(node['ip'], username, key_path)
+        try:
+            return fn(client)
+        finally:
+            pool.release(client)
+
+    def _manifest(node):
+        return _with_client(node, lambda c: release.manifest(_remote_machine(c, abort)))
+
+    def _unserve(node):
+        try:
+            _with_client(node, lambda c: _stop_serving(c, None))
+        except Exception:
+            pass
+
+    def _transfer(node, manifest, peer):
+        # Returns True when the node could also start serving the files.
+        # Every node that got as far as starting a server is stopped at the
+        # end, whether or not the server came up.
+        def _run(client):
+            if peer is None:
+                _seed_release(client, manifest, abort)
+            else:
+                try:
+                    _pull_from_peer(client, peer['ip'], port, manifest, rate_limit, abort)
+                except RuntimeError:
+                    if abort.is_set():
+                        raise
+                    _seed_release(client, manifest, abort)
+            serving.append(node)
+            try:
+                _serve_staging(client, node['ip'], port, abort)
+                return True
+            except RuntimeError:
+                return False
+        return _with_client(node, _run)
+
+    started = time.monotonic()
+    workers = ThreadPoolExecutor(max_workers=parallelism)
+    serving = []
+    try:
+        groups = {}   # binary digest -> {'manifest', 'holders', 'pending'}
+        futures = {workers.submit(_manifest, node): node for node in nodes}
+        for fut in as_completed(futures):
+            node = futures[fut]
+            try:
+                manifest = fut.result()
+            except Exception as exc:
+                yield _sse({'type': 'node_failed', 'step': 'distribute', 'node': node['name']})
+                yield _sse({'type': 'log', 'step': 'distribute', 'node': node['name'],
+                            'msg': str(exc)})
+                return -1
+            group = groups.setdefault(manifest['binary'][2],
+                                      {'manifest': manifest, 'holders': [], 'pending': []})
+            group['pending'].append(node)
+
+        rounds = 0
+        failed = False
+        while any(g['pending'] for g in groups.values()) and not abort.is_set():
+            rounds += 1
+            batch = []
+            for group in groups.values():
+                peers = group['holders'] or [None]
+                for peer in peers:
+                    take = fanout if peer else 1
+                    while take and group['pending'] and len(batch) < parallelism:
+                        batch.append((group, group['pending'].pop(0), peer))
+                        take -= 1
+            for _, node, _ in batch:
+                yield _sse({'type': 'node_start', 'step': 'distribute', 'node': node['name']})
+            futures = {workers.submit(_transfer, node, group['manifest'], peer):
+                       (group, node, peer) for group, node, peer in batch}
+            for fut in as_completed(futures):
+                group, node, peer = futures[fut]
+                try:
+                    serves = fut.result()
+                except Exception as exc:
+                    failed = True
+                    yield _sse({'type': 'node_failed', 'step': 'distribute', 'node': node['name']})
+                    yield _sse({'type': 'log', 'step': 'distribute', 'node': node['name'],
+                                'msg': str(exc)})
+                    continue
+                if serves:
+                    group['holders'].append(node)
+                source = peer['name'] if peer else 'local cache'
+                yield _sse({'type': 'log', 'step': 'distribute', 'node': node['name'],
+                            'msg': f'Received artifacts from {source}'})
+                yield _sse({'type': 'node_done', 'step': 'distribute', 'node': node['name']})
+            if failed:
+                return -1
+
+        if abort.is_set():
+            return -1
+        yield _sse({'type': 'task', 'step': 'distribute',
+                    'task': f'Distributed to {len(nodes)} node(s) in {rounds} round(s), '
+                            f'{time.monotonic() - started:.1f}s'})
+        return 0
+    finally:
+        list(workers.map(_unserve, serving))
+        workers.shutdown(wait=False)
 
 
 # ── Main install stream generator ─────────────────────────────────────────
 
-def _stream_k3s_install(username: str, key_path: str, token: str, use_docker: bool):
-    """Generator: installs K3s across all nodes via SSH and yields SSE events."""
+def _stream_k3s_install(job: _Job, username: str, key_path: str, token: str,
+                        use_docker: bool, parallelism: int = DEFAULT_PARALLELISM,
+                        pipelined: bool = False, artifact_cache: bool = False,
+                        k3s_version: str = '', airgap: bool = False,
+                        p2p: bool = False, p2p_fanout: int = P2P_FANOUT,
+                        p2p_rate: str = P2P_RATE_LIMIT, preflight: bool = False,
+                        incremental: bool = False):
+    """Generator: installs K3s on *job*'s cluster via SSH and yields SSE events.
+
+    The Docker phase and the worker phase fan out across nodes, at most
+    *parallelism* nodes at a time. With *pipelined*, joining masters and
+    workers are pre-staged while the primordial master boots; when the run
+    fails or is aborted first, staged nodes are not rolled back but listed
+    in the final event's 'staged' (config written, K3s not started). With
+    *artifact_cache*, install scripts and the K3s release (pinned to
+    *k3s_version*, plus airgap images if *airgap*) are served from the local
+    cache and pushed over SSH instead of being downloaded by every node;
+    *p2p* additionally spreads them node to node (see `_gen_distribute`).
+    *preflight* checks every node first (see `preflight._gen_preflight`) and
+    fails before anything is installed. With *incremental* (which implies
+    *preflight*, on fresh facts), nodes whose K3s service already runs the
+    rendered config are skipped and only new or drifted nodes are touched.
+    """
     def _sse(d): return f"data: {json.dumps(d)}\n\n"
 
+    abort       = job.abort
+    pool        = _SSHPool()
+    stager      = None
+    stage_abort = _SelectableEvent()   # stops pre-staging; job.abort is only set by the user
+    staging     = {}      # joining node name -> pre-staging Future, until the node joins
+    nodes       = []
+    touched     = False   # nodes were modified: their cached facts are stale
+    skipped     = set()   # names of nodes found converged
+
+    def _stop_staging() -> list:
+        # Pre-staging still in flight is aborted and waited for (it uses the
+        # pool and the key). Returns the joining nodes it reached that never
+        # joined: config.yaml written and K3s possibly installed, not started.
+        if stager is None:
+            return []
+        stage_abort.set()
+        stager.shutdown(wait=True, cancel_futures=True)
+        return sorted(name for name, f in staging.items() if not f.cancelled())
+
+    def _failed(aborted: bool = False) -> dict:
+        event = {'type': 'finished', 'success': False}
+        if aborted:
+            event['aborted'] = True
+        staged = _stop_staging()
+        if staged:
+            event['staged'] = staged
+        return event
+
     try:
-        nodes = _load_inventory()
+        # A node file that does not parse must not shrink the cluster silently.
+        errors = _inventory_errors(job.cluster_id)
+        if errors:
+            job.status = 'failed'
+            yield _sse({'type': 'error', 'errors': errors,
+                        'msg': f"Invalid inventory file(s): {'; '.join(errors)}"})
+            return
+        nodes = _load_inventory(job.cluster_id)
         if not nodes:
-            deploy_state.status = 'failed'
+            job.status = 'failed'
             yield _sse({'type': 'error', 'msg': 'No inventory found. Generate inventory first.'})
             return
 
         primordial = next((n for n in nodes if n.get('primordial')), None)
         if not primordial:
-            deploy_state.status = 'failed'
+            job.status = 'failed'
             yield _sse({'type': 'error', 'msg': 'No primordial master defined in inventory.'})
             return
 
@@ -139,9 +457,14 @@ def _stream_k3s_install(username: str, key_path: str, token: str, use_docker: bo
         all_nodes       = [primordial] + joining_masters + workers
         primordial_ip   = primordial['ip']
 
+        preflight = preflight or incremental
         steps = []
+        if preflight:
+            steps.append({'id': 'preflight',  'label': 'Pre-flight Checks'})
         if use_docker:
             steps.append({'id': 'docker',     'label': 'Container Runtime'})
+        if artifact_cache and p2p:
+            steps.append({'id': 'distribute', 'label': 'Distribute Artifacts'})
         steps.append(    {'id': 'primordial', 'label': 'Initialize Control Plane'})
         if joining_masters:
             steps.append({'id': 'masters',    'label': 'Expand Control Plane'})
@@ -154,89 +477,175 @@ def _stream_k3s_install(username: str, key_path: str, token: str, use_docker: bo
         master_tmpl = env.get_template('master.yaml.j2')
         worker_tmpl = env.get_template('worker.yaml.j2')
         _fetched_kubeconfig = None  # populated during kubeconfig phase
+        release = (_K3sRelease(_resolve_k3s_version(k3s_version), airgap)
+                   if artifact_cache else None)
+
+        # ── Phase 0: Pre-flight ───────────────────────────────────────────
+        facts   = {}   # node name -> facts
+        started = time.monotonic()
+        if preflight:
+            yield _sse({'type': 'step_start', 'step': 'preflight'})
+            # curl fetches the installers, unless they are pushed from the
+            # cache, and carries peer-to-peer transfers; python3 serves them.
+            tools = (('curl',) if not artifact_cache or p2p else ()) + (('python3',) if p2p else ())
+            rc = yield from _gen_preflight([primordial] + joining_masters, workers, username,
+                                           key_path, pool, abort, parallelism, facts,
+                                           fresh=incremental, tools=tools)
+
+            if abort.is_set():
+                job.status = 'aborted'
+                yield _sse(_failed(aborted=True))
+                return
+
+            if rc != 0:
+                yield _sse({'type': 'step_failed', 'step': 'preflight'})
+                job.status = 'failed'
+                yield _sse(_failed())
+                return
+            yield _sse({'type': 'step_done', 'step': 'preflight'})
+
+        config_yaml = master_tmpl.render(
+            cluster_init=True,
+            server_ip=primordial_ip,
+            token=token,
+            docker=use_docker,
+            primordial_ip=primordial_ip,
+        )
+        master_cfgs = {
+            node['name']: master_tmpl.render(
+                cluster_init=False,
+                server_ip=node['ip'],
+                token=token,
+                docker=use_docker,
+                primordial_ip=primordial_ip,
+            )
+            for node in joining_masters
+        }
+        worker_cfg = worker_tmpl.render(
+            token=token,
+            docker=use_docker,
+            primordial_ip=primordial_ip,
+        )
+
+        if incremental:
+            version = release.version if release else ''
+            wanted  = ([(primordial, config_yaml, 'k3s')] +
+                       [(n, master_cfgs[n['name']], 'k3s') for n in joining_masters] +
+                       [(n, worker_cfg, 'k3s-agent') for n in workers])
+            skipped = {node['name'] for node, cfg, service in wanted
+                       if _converged(facts.get(node['name'], {}), cfg, service, version)}
+            yield _sse({'type': 'task', 'step': 'preflight',
+                        'task': f'{len(skipped)} of {len(all_nodes)} node(s) already '
+                                f'converged, {len(all_nodes) - len(skipped)} to install'})
+        touched = True
 
         # ── Phase 1: Docker ───────────────────────────────────────────────
         if use_docker:
             yield _sse({'type': 'step_start', 'step': 'docker'})
-            step_ok = True
-            for node in all_nodes:
-                if abort_flag.is_set():
-                    break
-                rc = yield from _gen_docker_on_node(
-                    node['ip'], node['name'], username, key_path)
-                if rc != 0:
-                    step_ok = False
-
-            if abort_flag.is_set():
-                deploy_state.status = 'aborted'
-                yield _sse({'type': 'finished', 'success': False, 'aborted': True})
+            rcs = yield from _gen_parallel(
+                [_gen_docker_on_node(node['ip'], node['name'], username, key_path,
+                                     pool, abort, cached=artifact_cache,
+                                     installed=_fresh_docker(facts.get(node['name'], {}),
+                                                             started))
+                 for node in all_nodes],
+                parallelism, abort,
+            )
+            step_ok = all(rc == 0 for rc in rcs)
+
+            if abort.is_set():
+                job.status = 'aborted'
+                yield _sse(_failed(aborted=True))
                 return
 
             if step_ok:
                 yield _sse({'type': 'step_done', 'step': 'docker'})
             else:
                 yield _sse({'type': 'step_failed', 'step': 'docker'})
-                deploy_state.status = 'failed'
-                yield _sse({'type': 'finished', 'success': False})
+                job.status = 'failed'
+                yield _sse(_failed())
+                return
+
+        # ── Phase 1b: Artifact distribution ───────────────────────────────
+        if release is not None and p2p:
+            yield _sse({'type': 'step_start', 'step': 'distribute'})
+            rc = yield from _gen_distribute([n for n in all_nodes if n['name'] not in skipped],
+                                            username, key_path, pool, abort,
+                                            release, parallelism, p2p_fanout, p2p_rate)
+
+            if abort.is_set():
+                job.status = 'aborted'
+                yield _sse(_failed(aborted=True))
+                return
+
+            if rc != 0:
+                yield _sse({'type': 'step_failed', 'step': 'distribute'})
+                job.status = 'failed'
+                yield _sse(_failed())
                 return
+            yield _sse({'type': 'step_done', 'step': 'distribute'})
 
         # ── Phase 2: Primordial Master ────────────────────────────────────
         yield _sse({'type': 'step_start', 'step': 'primordial'})
-        config_yaml = master_tmpl.render(
-            cluster_init=True,
-            server_ip=primordial_ip,
-            token=token,
-            docker=use_docker,
-            primordial_ip=primordial_ip,
-        )
+
+        # Pre-stage every joining node in the background: config upload and
+        # K3s download happen now, only the service start waits for the API.
+        if pipelined and any(n['name'] not in skipped for n in joining_masters + workers):
+            stager = ThreadPoolExecutor(max_workers=parallelism)
+            for node in joining_masters:
+                if node['name'] in skipped:
+                    continue
+                staging[node['name']] = stager.submit(
+                    _stage_k3s_on_node, node['ip'], username, key_path, pool, stage_abort,
+                    master_cfgs[node['name']], 'server', release)
+            for node in workers:
+                if node['name'] in skipped:
+                    continue
+                staging[node['name']] = stager.submit(
+                    _stage_k3s_on_node, node['ip'], username, key_path, pool, stage_abort,
+                    worker_cfg, 'agent', release)
+            yield _sse({'type': 'task', 'step': 'primordial',
+                        'task': f'Pre-staging {len(staging)} joining node(s)…'})
+
         rc = yield from _gen_k3s_on_node(
-            primordial_ip, primordial['name'], username, key_path,
-            config_yaml, 'server', 'primordial',
+            primordial_ip, primordial['name'], username, key_path, pool, abort,
+            config_yaml, 'server', 'primordial', release=release,
+            converged=primordial['name'] in skipped,
         )
 
-        if abort_flag.is_set():
-            deploy_state.status = 'aborted'
-            yield _sse({'type': 'finished', 'success': False, 'aborted': True})
+        if abort.is_set():
+            job.status = 'aborted'
+            yield _sse(_failed(aborted=True))
             return
 
         if rc != 0:
             yield _sse({'type': 'step_failed', 'step': 'primordial'})
-            deploy_state.status = 'failed'
-            yield _sse({'type': 'finished', 'success': False})
+            job.status = 'failed'
+            yield _sse(_failed())
             return
 
         yield _sse({'type': 'task', 'step': 'primordial', 'task': 'Waiting for API server…'})
-        api_ready   = False
-        wait_client = _open_ssh_client(primordial_ip, username, key_path)
+        wait_client = pool.acquire(primordial_ip, username, key_path)
         try:
-            for _ in range(24):
-                if abort_flag.is_set():
-                    break
-                wait_rc = None
-                for _, code in _ssh_run_live(
-                        wait_client, 'sudo k3s kubectl get nodes 2>&1', timeout=15):
-                    if code is not None:
-                        wait_rc = code
-                if wait_rc == 0:
-                    api_ready = True
-                    break
-                time.sleep(5)
+            ready = _wait_apiserver(primordial_ip, wait_client, abort)
         finally:
-            wait_client.close()
-
-        if abort_flag.is_set():
-            deploy_state.status = 'aborted'
-            yield _sse({'type': 'finished', 'success': False, 'aborted': True})
+            pool.release(wait_client)
+        api_ready = ready['ready']
+        yield _sse({'type': 'metric', 'step': 'primordial', 'node': primordial['name'],
+                    'name': 'time_to_ready', **ready})
+
+        if abort.is_set():
+            job.status = 'aborted'
+            yield _sse(_failed(aborted=True))
             return
 
         if not api_ready:
             yield _sse({'type': 'step_failed', 'step': 'primordial'})
-            deploy_state.status = 'failed'
-            yield _sse({'type': 'finished', 'success': False})
+            job.status = 'failed'
+            yield _sse(_failed())
             return
 
         # ── Retrieve kubeconfig (silently, as part of primordial phase) ───
-        kube_client = _open_ssh_client(primordial_ip, username, key_path)
+        kube_client = pool.acquire(primordial_ip, username, key_path)
         try:
             _, stdout, _ = kube_client.exec_command(
                 'sudo cat /etc/rancher/k3s/k3s.yaml', timeout=15)
@@ -248,16 +657,15 @@ def _stream_k3s_install(username: str, key_path: str, token: str, use_docker: bo
                     raw_kube,
                 )
                 _fetched_kubeconfig = kubeconfig
-                kube_dir  = os.path.expanduser('~/.kube')
-                os.makedirs(kube_dir, exist_ok=True)
-                kube_path = os.path.join(kube_dir, 'k3s.yaml')
+                kube_path = _local_kubeconfig_path(job.cluster_id)
+                os.makedirs(os.path.dirname(kube_path), exist_ok=True)
                 with open(kube_path, 'w') as f:
                     f.write(kubeconfig)
                 os.chmod(kube_path, 0o600)
         except Exception:
             pass  # Non-fatal — kubeconfig returned in finished event if available
         finally:
-            kube_client.close()
+            pool.release(kube_client)
         yield _sse({'type': 'step_done', 'step': 'primordial'})
 
         # ── Phase 3: Join Masters ─────────────────────────────────────────
@@ -265,125 +673,142 @@ def _stream_k3s_install(username: str, key_path: str, token: str, use_docker: bo
             yield _sse({'type': 'step_start', 'step': 'masters'})
             step_ok = True
             for node in joining_masters:
-                if abort_flag.is_set():
+                if abort.is_set():
                     break
-                cfg = master_tmpl.render(
-                    cluster_init=False,
-                    server_ip=node['ip'],
-                    token=token,
-                    docker=use_docker,
-                    primordial_ip=primordial_ip,
-                )
                 rc = yield from _gen_k3s_on_node(
-                    node['ip'], node['name'], username, key_path,
-                    cfg, 'server', 'masters',
+                    node['ip'], node['name'], username, key_path, pool, abort,
+                    master_cfgs[node['name']], 'server', 'masters',
+                    staging=staging.pop(node['name'], None), release=release, wait_ready=True,
+                    converged=node['name'] in skipped,
                 )
                 if rc != 0:
                     step_ok = False
 
-            if abort_flag.is_set():
-                deploy_state.status = 'aborted'
-                yield _sse({'type': 'finished', 'success': False, 'aborted': True})
+            if abort.is_set():
+                job.status = 'aborted'
+                yield _sse(_failed(aborted=True))
                 return
 
             if step_ok:
                 yield _sse({'type': 'step_done', 'step': 'masters'})
             else:
                 yield _sse({'type': 'step_failed', 'step': 'masters'})
-                deploy_state.status = 'failed'
-                yield _sse({'type': 'finished', 'success': False})
+                job.status = 'failed'
+                yield _sse(_failed())
                 return
 
         # ── Phase 5: Join Workers ─────────────────────────────────────────
         if workers:
             yield _sse({'type': 'step_start', 'step': 'workers'})
-            step_ok = True
-            for node in workers:
-                if abort_flag.is_set():
-                    break
-                cfg = worker_tmpl.render(
-                    token=token,
-                    docker=use_docker,
-                    primordial_ip=primordial_ip,
-                )
-                rc = yield from _gen_k3s_on_node(
-                    node['ip'], node['name'], username, key_path,
-                    cfg, 'agent', 'workers',
-                )
-                if rc != 0:
-                    step_ok = False
-
-            if abort_flag.is_set():
-                deploy_state.status = 'aborted'
-                yield _sse({'type': 'finished', 'success': False, 'aborted': True})
+            rcs = yield from _gen_parallel(
+                [_gen_k3s_on_node(node['ip'], node['name'], username, key_path,
+                                  pool, abort, worker_cfg, 'agent', 'workers',
+                                  staging=staging.pop(node['name'], None), release=release,
+                                  wait_ready=True, converged=node['name'] in skipped)
+                 for node in workers],
+                parallelism, abort,
+            )
+            step_ok = all(rc == 0 for rc in rcs)
+
+            if abort.is_set():
+                job.status = 'aborted'
+                yield _sse(_failed(aborted=True))
                 return
 
             if step_ok:
                 yield _sse({'type': 'step_done', 'step': 'workers'})
             else:
                 yield _sse({'type': 'step_failed', 'step': 'workers'})
-                deploy_state.status = 'failed'
-                yield _sse({'type': 'finished', 'success': False})
+                job.status = 'failed'
+                yield _sse(_failed())
                 return
 
-        deploy_state.status = 'success'
+        job.status = 'success'
         yield _sse({'type': 'finished', 'success': True,
                     'kubeconfig': _fetched_kubeconfig or ''})
 
     except Exception as exc:
-        deploy_state.status = 'failed'
-        yield _sse({'type': 'error', 'msg': str(exc)})
+        job.status = 'failed'
+        staged     = _stop_staging()
+        yield _sse({'type': 'error', 'msg': str(exc), **({'staged': staged} if staged else {})})
     finally:
-        try:
-            os.unlink(key_path)
-        except OSError:
-            pass
+        _stop_staging()
+        stage_abort.close()
+        if touched:
+            _forget_facts(n['ip'] for n in nodes if n.get('name') not in skipped)
+        pool.close()
+        _remove_temp_key(key_path)
 
 
 # ── Routes ────────────────────────────────────────────────────────────────
 
 @installer_bp.route('/deploy', methods=['GET'])
 def deploy():
-    username = request.args.get('username', '').strip()
-    ssh_key  = request.args.get('ssh_key',  '').strip()
-    token    = request.args.get('token',    '').strip()
-    docker   = request.args.get('docker', 'false').lower() == 'true'
+    cluster_id = _request_cluster_id()
+    if not _valid_cluster_id(cluster_id):
+        return jsonify({'status': 'error', 'message': 'Invalid cluster id.'}), 400
+
+    # EventSource reconnects send Last-Event-ID: re-attach to the cluster's
+    # deploy job instead of starting a new one.
+    if 'Last-Event-ID' in request.headers:
+        job = _latest_job(cluster_id, 'deploy')
+        if job is None:
+            return jsonify({'status': 'error', 'message': 'No deploy job to resume.'}), 404
+        return _job_response(job, _last_event_id())
+
+    username  = request.args.get('username', '').strip()
+    ssh_key   = request.args.get('ssh_key',  '').strip()
+    token     = request.args.get('token',    '').strip()
+    docker    = request.args.get('docker', 'false').lower() == 'true'
+    pipelined = request.args.get('pipelined', 'false').lower() == 'true'
+    cache     = request.args.get('artifact_cache', 'false').lower() == 'true'
+    airgap    = request.args.get('airgap', 'false').lower() == 'true'
+    version   = request.args.get('k3s_version', '').strip()
+    p2p       = request.args.get('p2p', 'false').lower() == 'true'
+    p2p_rate  = request.args.get('p2p_rate', P2P_RATE_LIMIT).strip()
+    preflight = request.args.get('preflight', 'false').lower() == 'true'
+    increment = request.args.get('incremental', 'false').lower() == 'true'
 
     if not username or not ssh_key:
         return jsonify({'status': 'error', 'message': 'Missing SSH credentials.'}), 400
     if not token:
         return jsonify({'status': 'error', 'message': 'Missing cluster token.'}), 400
+    try:
+        parallelism = int(request.args.get('parallelism', DEFAULT_PARALLELISM))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'parallelism must be an integer.'}), 400
+    parallelism = max(1, min(parallelism, MAX_PARALLELISM))
+    try:
+        p2p_fanout = max(1, int(request.args.get('p2p_fanout', P2P_FANOUT)))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'p2p_fanout must be an integer.'}), 400
+    if p2p_rate and not _RATE_RE.match(p2p_rate):
+        return jsonify({'status': 'error',
+                        'message': "p2p_rate must look like '500K', '20M' or '1G'."}), 400
 
-    with proc_lock:
-        if deploy_state.status == 'running':
-            return jsonify({'status': 'error',
-                            'message': 'A deploy/uninstall is already running.'}), 409
-        deploy_state.status = 'running'
-
-    abort_flag.clear()
     key_path = _write_temp_key(ssh_key)
-
-    def gen():
-        yield from _stream_k3s_install(username, key_path, token, docker)
-
-    return Response(gen(), mimetype='text/event-stream',
-                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    job = _start_job('deploy', cluster_id, lambda j: _stream_k3s_install(
+        j, username, key_path, token, docker, parallelism, pipelined,
+        cache or airgap or p2p, version, airgap, p2p, p2p_fanout, p2p_rate, preflight,
+        increment))
+    if job is None:
+        _remove_temp_key(key_path)
+        return jsonify({'status': 'error',
+                        'message': 'A deploy/uninstall is already running for this cluster.'}), 409
+    return _job_response(job)
 
 
 @installer_bp.route('/deploy-abort', methods=['POST'])
 def deploy_abort():
-    abort_flag.set()
-    with proc_lock:
-        if deploy_state.current_proc is not None:
-            deploy_state.status = 'aborted'
-            try:
-                import signal
-                os.killpg(os.getpgid(deploy_state.current_proc.pid), signal.SIGTERM)
-            except ProcessLookupError:
-                pass
+    job = _latest_job(_request_cluster_id())
+    if job is not None and not job.done:
+        job.abort.set()
     return jsonify({'status': 'success', 'message': 'Abort signal sent.'})
 
 
 @installer_bp.route('/deploy-status', methods=['GET'])
 def deploy_status():
-    return jsonify({'status': deploy_state.status})
+    job = _latest_job(_request_cluster_id())
+    if job is None:
+        return jsonify({'status': 'idle', 'job_id': None})
+    return jsonify({'status': job.status, 'job_id': job.id})
@@ -1,31 +1,433 @@
+import csv
 import io
+import ipaddress
+import json
 import os
+import re
+import shutil
 import socket
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
 
 import paramiko
 import yaml
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 
-from config import K3S_INVENTORY_DIR
+from config import (DEFAULT_CLUSTER_ID, IMPORT_MAX_ERRORS, K3S_INVENTORY_DIR, MAX_PARALLELISM,
+                    SSH_TEST_DEADLINE, SSH_TEST_PARALLELISM, SSH_TEST_TIMEOUT)
+from jobs import _idle_cluster, _latest_job, _request_cluster_id, _valid_cluster_id
+from ssh import _load_private_key
 
 inventory_bp = Blueprint('inventory', __name__)
 
+# libyaml when PyYAML was built with it; same results, much faster.
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+_stores = {}   # inventory dir -> _Inventory, guarded by _inventory_lock
+
+# Held while node files are replaced (import, /generate) and while
+# `_inventory` reads them, so no reader sees a half-replaced inventory.
+_inventory_lock = Lock()
+
+_NODE_NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,62}$')
+
 
 # ── Shared helper (imported by installer / uninstaller) ───────────────────
 
-def _load_inventory() -> list:
-    """Read every node YAML file from the InfraMind inventory directory."""
-    nodes = []
+def _inventory_dir(cluster_id: str = DEFAULT_CLUSTER_ID) -> str:
+    """Directory holding the per-node YAML files of *cluster_id*."""
+    if cluster_id == DEFAULT_CLUSTER_ID:
+        return K3S_INVENTORY_DIR
+    return os.path.join(K3S_INVENTORY_DIR, cluster_id)
+
+
+def _local_kubeconfig_path(cluster_id: str = DEFAULT_CLUSTER_ID) -> str:
+    """Where the fetched kubeconfig of *cluster_id* is kept on this host."""
+    if cluster_id == DEFAULT_CLUSTER_ID:
+        return os.path.expanduser('~/.kube/k3s.yaml')
+    return os.path.expanduser(f'~/.kube/k3s-{cluster_id}.yaml')
+
+
+class _Inventory:
+    """Parsed node files of one inventory directory, indexed by name, IP and
+    role. The node dicts are shared with the cache: treat them as read-only.
+    """
+
+    def __init__(self, files: dict):
+        self.files      = files   # file name -> (stat key, node dict or None, error)
+        self.nodes      = []
+        self.errors     = []
+        self.by_name    = {}
+        self.by_ip      = {}
+        self.by_role    = {'master': [], 'worker': []}
+        self.primordial = None
+        for fname in sorted(files):
+            _, node, error = files[fname]
+            if error:
+                self.errors.append(f'{fname}: {error}')
+            if node is None:
+                continue
+            self.nodes.append(node)
+            self.by_name[node.get('name') or os.path.splitext(fname)[0]] = node
+            if node.get('ip'):
+                self.by_ip[node['ip']] = node
+            self.by_role.setdefault(node.get('role', 'worker'), []).append(node)
+            if self.primordial is None and node.get('primordial'):
+                self.primordial = node
+
+
+def _parse_node_file(path: str):
+    """Returns (node dict or None, error message or '')."""
+    try:
+        with open(path) as f:
+            data = yaml.load(f, Loader=_YAML_LOADER)
+    except (OSError, yaml.YAMLError) as exc:
+        return None, str(exc)
+    return (data, '') if isinstance(data, dict) else (None, '')
+
+
+def _inventory(cluster_id: str = DEFAULT_CLUSTER_ID) -> _Inventory:
+    """The inventory of *cluster_id*, served from memory.
+
+    Each call stats the directory once; only files whose inode, mtime or
+    size changed since the last call are parsed again. Never observes an
+    import or /generate halfway through.
+    """
+    inv_dir = _inventory_dir(cluster_id)
+    with _inventory_lock:
+        try:
+            entries = {entry.name: entry.stat() for entry in os.scandir(inv_dir)
+                       if entry.name.endswith(('.yaml', '.yml')) and entry.is_file()}
+        except (FileNotFoundError, NotADirectoryError):
+            entries = {}
+
+        cached  = _stores.get(inv_dir)
+        old     = cached.files if cached else {}
+        files   = {}
+        changed = cached is None or entries.keys() != old.keys()
+        for fname, st in entries.items():
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if fname in old and old[fname][0] == key:
+                files[fname] = old[fname]
+            else:
+                files[fname] = (key,) + _parse_node_file(os.path.join(inv_dir, fname))
+                changed      = True
+        if changed:
+            _stores[inv_dir] = _Inventory(files)
+        return _stores[inv_dir]
+
+
+def _load_inventory(cluster_id: str = DEFAULT_CLUSTER_ID) -> list:
+    """Every valid node of *cluster_id*'s inventory (copies, file order)."""
+    return [dict(node) for node in _inventory(cluster_id).nodes]
+
+
+def _inventory_errors(cluster_id: str = DEFAULT_CLUSTER_ID) -> list:
+    """'file: error' for every node file of *cluster_id* that failed to parse."""
+    return list(_inventory(cluster_id).errors)
+
+
+def _write_node(inv_dir: str, node: dict):
+    """Write one node file into *inv_dir* atomically (temp file + rename)."""
+    os.makedirs(inv_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=inv_dir, prefix='.', suffix='.tmp')
     try:
-        for fname in sorted(os.listdir(K3S_INVENTORY_DIR)):
-            if fname.endswith('.yaml') or fname.endswith('.yml'):
-                with open(os.path.join(K3S_INVENTORY_DIR, fname)) as f:
-                    data = yaml.safe_load(f)
-                    if isinstance(data, dict):
-                        nodes.append(data)
+        with os.fdopen(fd, 'w') as f:
+            yaml.dump(node, f, Dumper=_YAML_DUMPER, default_flow_style=False)
+        os.replace(tmp_path, os.path.join(inv_dir, f"{node['name']}.yaml"))
     except Exception:
-        pass
-    return nodes
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# ── Bulk import ───────────────────────────────────────────────────────────
+
+def _csv_rows(stream):
+    """Yield (line number, row dict) from a CSV host list with a header row."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, {k.strip().lower(): (v or '').strip()
+                                for k, v in row.items() if k is not None}
+
+
+def _jsonl_rows(stream):
+    for lineno, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield lineno, json.loads(line)
+            except ValueError as exc:
+                yield lineno, ValueError(f'invalid JSON: {exc}')
+
+
+def _yaml_node(loader, event):
+    """Build a yaml node from *event* and the events that follow it."""
+    if isinstance(event, yaml.ScalarEvent):
+        tag = event.tag or loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+        return yaml.ScalarNode(tag, event.value, style=event.style)
+    if isinstance(event, yaml.MappingStartEvent):
+        tag   = event.tag or loader.resolve(yaml.MappingNode, None, event.implicit)
+        pairs = []
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = _yaml_node(loader, loader.get_event())
+            pairs.append((key, _yaml_node(loader, loader.get_event())))
+        loader.get_event()
+        return yaml.MappingNode(tag, pairs)
+    if isinstance(event, yaml.SequenceStartEvent):
+        tag   = event.tag or loader.resolve(yaml.SequenceNode, None, event.implicit)
+        items = []
+        while not loader.check_event(yaml.SequenceEndEvent):
+            items.append(_yaml_node(loader, loader.get_event()))
+        loader.get_event()
+        return yaml.SequenceNode(tag, items)
+    raise yaml.YAMLError('anchors and aliases are not supported')
+
+
+def _yaml_rows(stream):
+    """Yield (line number, host) from YAML: a top-level list of hosts, or
+    one host per document. Hosts are built one at a time from parser events,
+    so the upload is never loaded as a whole."""
+    loader = _YAML_LOADER(stream)
+    try:
+        while not loader.check_event(yaml.StreamEndEvent):
+            event = loader.get_event()
+            if not isinstance(event, yaml.DocumentStartEvent):
+                continue
+            if loader.check_event(yaml.SequenceStartEvent):
+                loader.get_event()
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    event = loader.get_event()
+                    yield event.start_mark.line + 1, \
+                        loader.construct_document(_yaml_node(loader, event))
+                loader.get_event()
+            elif not loader.check_event(yaml.DocumentEndEvent):
+                event = loader.get_event()
+                yield event.start_mark.line + 1, \
+                    loader.construct_document(_yaml_node(loader, event))
+    finally:
+        loader.dispose()
+
+
+_ROW_READERS = {'csv': _csv_rows, 'jsonl': _jsonl_rows, 'yaml': _yaml_rows}
+
+
+def _truthy(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+
+class _InventoryImport:
+    """Validates hosts one at a time and stages them in a hidden directory
+    inside the inventory; `commit` swaps the staged files in, so a failed
+    import leaves the inventory untouched.
+    """
+
+    def __init__(self, cluster_id: str):
+        self.inv_dir    = _inventory_dir(cluster_id)
+        self._created   = not os.path.isdir(self.inv_dir)
+        os.makedirs(self.inv_dir, exist_ok=True)
+        # Inside inv_dir, so every rename stays on one filesystem (inventory/
+        # may be a mount point). Cluster ids cannot start with a dot.
+        self.staging    = tempfile.mkdtemp(dir=self.inv_dir, prefix='.import-')
+        self.errors     = []
+        self.count      = 0
+        self.masters    = 0
+        self.primordial = None   # (name, explicitly flagged)
+        self._first_ip  = ''     # ip of the primordial pick, to unflag it
+        self._names     = set()
+        self._ips       = set()
+
+    def _error(self, row: int, message: str):
+        self.errors.append({'row': row, 'message': message})
+
+    def add(self, row: int, host):
+        if isinstance(host, Exception):
+            return self._error(row, str(host))
+        if not isinstance(host, dict):
+            return self._error(row, 'expected a mapping with name, ip and role')
+        name = str(host.get('name') or '').strip()
+        ip   = str(host.get('ip') or '').strip()
+        role = str(host.get('role') or '').strip().lower()
+        if not _NODE_NAME_RE.match(name):
+            return self._error(row, f'invalid or missing name: {name!r}')
+        try:
+            ip = str(ipaddress.ip_address(ip))
+        except ValueError:
+            return self._error(row, f'{name}: invalid or missing ip: {ip!r}')
+        if role not in ('master', 'worker'):
+            return self._error(row, f"{name}: role must be 'master' or 'worker'")
+        if name in self._names:
+            return self._error(row, f'{name}: duplicate name')
+        if ip in self._ips:
+            return self._error(row, f'{name}: duplicate ip {ip}')
+        primordial = _truthy(host.get('primordial', False))
+        if primordial and role != 'master':
+            return self._error(row, f'{name}: only a master can be primordial')
+        if primordial and self.primordial and self.primordial[1]:
+            return self._error(row, f'{name}: {self.primordial[0]} is already the primordial master')
+
+        self._names.add(name)
+        self._ips.add(ip)
+        self.count += 1
+        node = {'name': name, 'ip': ip, 'role': role}
+        if role == 'master':
+            self.masters += 1
+            if primordial and self.primordial and not self.errors:
+                # An explicit primordial overrides the default pick (the
+                # first master), which was already staged with the flag.
+                _write_node(self.staging, {'name': self.primordial[0], 'ip': self._first_ip,
+                                           'role': 'master'})
+            if primordial or self.primordial is None:
+                self.primordial    = (name, primordial)
+                self._first_ip     = ip
+                node['primordial'] = True
+        if not self.errors:
+            _write_node(self.staging, node)
+
+    def finish(self):
+        if not self.errors and not self.masters:
+            self._error(0, 'At least one master node is required.')
+
+    def commit(self):
+        """Replace the node files with the staged ones.
+
+        Staged files are renamed into place and node files that are not part
+        of the import removed, all under `_inventory_lock`: readers see
+        either the old inventory or the new one. Everything else in the
+        directory (the default cluster's holds the other clusters'
+        directories) is left alone.
+        """
+        with _inventory_lock:
+            staged = set(os.listdir(self.staging))
+            for fname in staged:
+                os.replace(os.path.join(self.staging, fname), os.path.join(self.inv_dir, fname))
+            for entry in os.scandir(self.inv_dir):
+                if (entry.name.endswith(('.yaml', '.yml')) and entry.name not in staged
+                        and entry.is_file(follow_symlinks=False)):
+                    os.unlink(entry.path)
+            self._created = False
+
+    def discard(self):
+        shutil.rmtree(self.staging, ignore_errors=True)
+        if self._created:
+            try:
+                os.rmdir(self.inv_dir)
+            except OSError:
+                pass
+
+
+def _import_format() -> str:
+    """Upload format from ?format=, the uploaded file's extension or the
+    Content-Type."""
+    upload = request.files.get('file')
+    hint   = (request.args.get('format') or
+              (os.path.splitext(upload.filename or '')[1] if upload else '') or
+              request.mimetype or '').lower().lstrip('.')
+    for fmt, names in (('csv',   ('csv', 'text/csv')),
+                       ('jsonl', ('jsonl', 'ndjson', 'application/x-ndjson',
+                                  'application/jsonl', 'application/json-lines')),
+                       ('yaml',  ('yaml', 'yml', 'application/yaml', 'application/x-yaml',
+                                  'text/yaml', 'text/x-yaml'))):
+        if hint in names:
+            return fmt
+    return ''
+
+
+# ── Reachability checks ───────────────────────────────────────────────────
+
+def _probe_ssh(name: str, ip: str, username: str, pkey, timeout: float) -> dict:
+    """Connect to one host, authenticate and run a trivial command.
+
+    Returns a 'host' event: latency of the TCP connect and of the whole
+    check, whether authentication passed, and an error class for failures
+    (refused, timeout, network, auth, ssh, error).
+    """
+    result  = {'type': 'host', 'name': name, 'ip': ip, 'status': 'failed', 'auth': None,
+               'connect_ms': None, 'latency_ms': None, 'error': None, 'message': ''}
+    started = time.monotonic()
+    client  = None
+    try:
+        sock = socket.create_connection((ip, 22), timeout=timeout)
+        result['connect_ms'] = round((time.monotonic() - started) * 1000, 1)
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(hostname=ip, username=username, pkey=pkey, sock=sock, timeout=timeout,
+                       banner_timeout=timeout, auth_timeout=timeout,
+                       allow_agent=False, look_for_keys=False)
+        result['auth'] = True
+        _, stdout, _ = client.exec_command('echo "SSH test successful"', timeout=timeout)
+        if 'SSH test successful' in stdout.read().decode('utf-8', 'replace'):
+            result.update(status='success', message=f'Connected successfully to {name}')
+        else:
+            result.update(error='ssh', message='Connection established but command execution failed.')
+    except paramiko.AuthenticationException:
+        result.update(auth=False, error='auth',
+                      message='Authentication failed. Check username and SSH key.')
+    except (socket.timeout, TimeoutError):
+        result.update(error='timeout', message='Connection timeout. Check IP address and network.')
+    except ConnectionRefusedError:
+        result.update(error='refused', message='Connection refused on port 22.')
+    except paramiko.SSHException as exc:
+        result.update(error='ssh', message=f'SSH error: {exc}')
+    except OSError as exc:
+        result.update(error='network', message=f'Network error: {exc}')
+    except Exception as exc:
+        result.update(error='error', message=f'Unexpected error: {exc}')
+    finally:
+        if client is not None:
+            client.close()
+    result['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+    return result
+
+
+def _gen_test_all(hosts: list, username: str, pkey, parallelism: int, deadline: float):
+    """SSE generator: probe *hosts* concurrently and stream each result as
+    it finishes. Every probe shares one *deadline* (seconds for the whole
+    batch); hosts still pending when it passes are reported as timed out.
+    """
+    def _sse(d): return f"data: {json.dumps(d)}\n\n"
+
+    started = time.monotonic()
+    end     = started + deadline
+    counts  = {'success': 0, 'failed': 0}
+    pool    = ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(hosts))))
+
+    def _probe(host):
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return _timed_out(host)
+        return _probe_ssh(host['name'], host['ip'], username, pkey,
+                          min(SSH_TEST_TIMEOUT, remaining))
+
+    def _timed_out(host):
+        return {'type': 'host', 'name': host['name'], 'ip': host['ip'], 'status': 'failed',
+                'auth': None, 'connect_ms': None, 'latency_ms': None, 'error': 'deadline',
+                'message': f'No answer within the {deadline:g}s batch deadline.'}
+
+    try:
+        futures = {pool.submit(_probe, host): host for host in hosts}
+        pending = set(futures)
+        while pending and time.monotonic() < end:
+            done, pending = wait(pending, timeout=max(0, end - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                counts[result['status']] += 1
+                yield _sse(result)
+        for future in pending:
+            counts['failed'] += 1
+            yield _sse(_timed_out(futures[future]))
+        yield _sse({'type': 'done', 'total': len(hosts), 'success': counts['success'],
+                    'failed': counts['failed'],
+                    'seconds': round(time.monotonic() - started, 2)})
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 # ── Routes ────────────────────────────────────────────────────────────────
@@ -38,7 +440,10 @@ def generate():
 
     vms               = data.get('vms', [])
     primordial_master = data.get('primordialMaster', None)
+    cluster_id        = _request_cluster_id()
 
+    if not _valid_cluster_id(cluster_id):
+        return jsonify({'status': 'error', 'message': 'Invalid cluster id.'}), 400
     if not isinstance(vms, list):
         return jsonify({'status': 'error', 'message': 'Invalid payload: vms must be a list.'}), 400
 
@@ -57,56 +462,100 @@ def generate():
     if not primordial_master or primordial_master not in master_names:
         primordial_master = master_names[0]
 
-    for vm in vms:
-        name = vm['name']
-        ip   = vm['ip']
-        role = vm['role']
+    with _inventory_lock:
+        for vm in vms:
+            name = vm['name']
+            ip   = vm['ip']
+            role = vm['role']
 
-        if role == 'master':
-            inv_data = {'name': name, 'ip': ip, 'role': 'master'}
-            if primordial_master == name:
-                inv_data['primordial'] = True
-        else:
-            inv_data = {'name': name, 'ip': ip, 'role': 'worker'}
+            if role == 'master':
+                inv_data = {'name': name, 'ip': ip, 'role': 'master'}
+                if primordial_master == name:
+                    inv_data['primordial'] = True
+            else:
+                inv_data = {'name': name, 'ip': ip, 'role': 'worker'}
 
-        with open(os.path.join(K3S_INVENTORY_DIR, f'{name}.yaml'), 'w') as f:
-            yaml.dump(inv_data, f)
+            _write_node(_inventory_dir(cluster_id), inv_data)
 
     return jsonify({'status': 'success', 'primordial_master': primordial_master})
 
 
-@inventory_bp.route('/detect-inventory', methods=['GET'])
-def detect_inventory():
-    try:
-        node_files = sorted(
-            f for f in os.listdir(K3S_INVENTORY_DIR)
-            if f.endswith('.yaml') or f.endswith('.yml')
-        )
-        if not node_files:
-            return jsonify({'status': 'error', 'message': 'No inventory found.'}), 404
-
-        vms               = []
-        primordial_master = None
-
-        for fname in node_files:
-            with open(os.path.join(K3S_INVENTORY_DIR, fname)) as f:
-                node = yaml.safe_load(f)
-            if not isinstance(node, dict):
-                continue
-
-            name = node.get('name') or os.path.splitext(fname)[0]
-            ip   = node.get('ip', '')
-            role = node.get('role', 'worker')
+@inventory_bp.route('/import-inventory', methods=['POST'])
+def import_inventory():
+    """Replace a cluster's inventory with an uploaded host list.
+
+    The body (or a multipart 'file') is CSV with a name,ip,role[,primordial]
+    header, JSON lines, or YAML; pick it with ?format=csv|jsonl|yaml or let
+    the file extension / Content-Type decide. Hosts are validated as they
+    stream in; any error leaves the current inventory untouched and every
+    failing row is reported. ?dry_run=1 validates without committing.
+    """
+    cluster_id = _request_cluster_id()
+    if not _valid_cluster_id(cluster_id):
+        return jsonify({'status': 'error', 'message': 'Invalid cluster id.'}), 400
+    fmt = _import_format()
+    if not fmt:
+        return jsonify({'status': 'error',
+                        'message': 'Unknown format: use ?format=csv, jsonl or yaml.'}), 400
+    job = _latest_job(cluster_id)
+    if job is not None and not job.done:
+        return jsonify({'status': 'error',
+                        'message': f'A {job.kind} job is running for this cluster.'}), 409
 
-            if role == 'master' and node.get('primordial'):
-                primordial_master = name
+    upload = request.files.get('file')
+    raw    = upload.stream if upload else request.stream
+    stream = io.TextIOWrapper(raw, encoding='utf-8-sig', errors='replace', newline='')
+    imp    = _InventoryImport(cluster_id)
+    try:
+        try:
+            for row, host in _ROW_READERS[fmt](stream):
+                imp.add(row, host)
+                if len(imp.errors) >= IMPORT_MAX_ERRORS:
+                    break
+        except (csv.Error, yaml.YAMLError) as exc:
+            imp._error(getattr(getattr(exc, 'problem_mark', None), 'line', -1) + 1,
+                       f'{fmt} parse error: {exc}')
+        imp.finish()
+
+        result = {'imported': imp.count,
+                  'primordial_master': imp.primordial[0] if imp.primordial else None}
+        if imp.errors:
+            return jsonify({'status': 'error', 'message': f'{len(imp.errors)} invalid row(s).',
+                            'errors': imp.errors, **result}), 400
+        if not _truthy(request.args.get('dry_run', '')):
+            # Re-checked under the job registry lock: no deploy or uninstall
+            # can start on the cluster until the new inventory is in place.
+            with _idle_cluster(cluster_id) as job:
+                if job is not None:
+                    return jsonify({'status': 'error',
+                                    'message': f'A {job.kind} job is running for this cluster.'}), 409
+                imp.commit()
+        return jsonify({'status': 'success', 'dry_run': _truthy(request.args.get('dry_run', '')),
+                        **result})
+    finally:
+        imp.discard()
 
-            vms.append({'name': name, 'ip': ip, 'role': role})
 
-        return jsonify({'status': 'success', 'vms': vms, 'primordial_master': primordial_master})
+@inventory_bp.route('/detect-inventory', methods=['GET'])
+def detect_inventory():
+    cluster_id = _request_cluster_id()
+    if not _valid_cluster_id(cluster_id):
+        return jsonify({'status': 'error', 'message': 'Invalid cluster id.'}), 400
+    if not os.path.isdir(_inventory_dir(cluster_id)):
+        return jsonify({'status': 'error', 'message': 'No inventory found.'}), 404
+
+    inv = _inventory(cluster_id)
+    if inv.errors:
+        return jsonify({'status': 'error',
+                        'message': f'Failed to load inventory: {inv.errors[0]}'}), 500
+    if not inv.nodes:
+        return jsonify({'status': 'error', 'message': 'No inventory found.'}), 404
 
-    except Exception as exc:
-        return jsonify({'status': 'error', 'message': f'Failed to load inventory: {exc}'}), 500
+    vms = [{'name': name, 'ip': node.get('ip', ''), 'role': node.get('role', 'worker')}
+           for name, node in inv.by_name.items()]
+    primordial_master = next((name for name, node in inv.by_name.items()
+                              if node.get('role') == 'master' and node.get('primordial')), None)
+    return jsonify({'status': 'success', 'vms': vms, 'primordial_master': primordial_master})
 
 
 @inventory_bp.route('/delete-host', methods=['POST'])
@@ -119,7 +568,11 @@ def delete_host():
     if not name:
         return jsonify({'status': 'error', 'message': 'Missing host name.'}), 400
 
-    inv_file = os.path.join(K3S_INVENTORY_DIR, f'{name}.yaml')
+    cluster_id = _request_cluster_id()
+    if not _valid_cluster_id(cluster_id):
+        return jsonify({'status': 'error', 'message': 'Invalid cluster id.'}), 400
+
+    inv_file = os.path.join(_inventory_dir(cluster_id), f'{name}.yaml')
 
     try:
         if os.path.exists(inv_file):
@@ -147,17 +600,9 @@ def test_ssh():
     client = paramiko.SSHClient()
     client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
     try:
-        key_file = io.StringIO(ssh_key)
-        pkey     = None
-        for key_cls in (paramiko.RSAKey, paramiko.Ed25519Key,
-                        paramiko.ECDSAKey, paramiko.DSSKey):
-            try:
-                key_file.seek(0)
-                pkey = key_cls.from_private_key(key_file)
-                break
-            except paramiko.ssh_exception.SSHException:
-                continue
-        if pkey is None:
+        try:
+            pkey = _load_private_key(ssh_key)
+        except ValueError:
             return jsonify({'status': 'error', 'message': 'Invalid SSH key format.'}), 400
 
         client.connect(hostname=ip, username=username, pkey=pkey,
@@ -189,3 +634,50 @@ def test_ssh():
             client.close()
         except Exception:
             pass
+
+
+@inventory_bp.route('/test-ssh-all', methods=['GET', 'POST'])
+def test_ssh_all():
+    """SSE: test SSH to every host at once.
+
+    Hosts come from the JSON body's 'nodes' ([{name, ip}]) or default to the
+    cluster's inventory. Credentials are 'username' and 'ssh_key' (JSON body
+    or query string, like /deploy). Streams one 'host' event per host as it
+    finishes, then a 'done' summary.
+    """
+    data = (request.get_json(silent=True) if request.is_json else None) or {}
+
+    def arg(key: str, default='') -> str:
+        return str(data.get(key) or request.args.get(key) or default)
+
+    username   = arg('username').strip()
+    ssh_key    = arg('ssh_key').strip()
+    cluster_id = _request_cluster_id()
+    if not username or not ssh_key:
+        return jsonify({'status': 'error', 'message': 'Missing required fields.'}), 400
+    if not _valid_cluster_id(cluster_id):
+        return jsonify({'status': 'error', 'message': 'Invalid cluster id.'}), 400
+    try:
+        parallelism = max(1, min(int(arg('parallelism', SSH_TEST_PARALLELISM)), MAX_PARALLELISM))
+        deadline    = min(max(1.0, float(arg('deadline', SSH_TEST_DEADLINE))), 300.0)
+    except ValueError:
+        return jsonify({'status': 'error',
+                        'message': 'parallelism and deadline must be numbers.'}), 400
+
+    nodes = data.get('nodes')
+    if nodes is None:
+        nodes = _inventory(cluster_id).nodes
+    if not isinstance(nodes, list) or not all(isinstance(n, dict) and n.get('name') and n.get('ip')
+                                              for n in nodes):
+        return jsonify({'status': 'error', 'message': 'nodes must be a list of {name, ip}.'}), 400
+    if not nodes:
+        return jsonify({'status': 'error', 'message': 'No inventory found.'}), 404
+    try:
+        pkey = _load_private_key(ssh_key)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid SSH key format.'}), 400
+
+    hosts = [{'name': str(n['name']), 'ip': str(n['ip'])} for n in nodes]
+    return Response(_gen_test_all(hosts, username, pkey, parallelism, deadline),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
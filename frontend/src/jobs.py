@@ -0,0 +1,266 @@
+import itertools
+import json
+import os
+import re
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, Event, Lock, Thread
+
+from flask import Blueprint, Response, jsonify, request
+
+from config import DEFAULT_CLUSTER_ID, JOB_EVENT_BUFFER, JOB_HISTORY, SSE_KEEPALIVE_INTERVAL
+
+jobs_bp = Blueprint('jobs', __name__)
+
+_CLUSTER_ID_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+
+_jobs      = {}   # job id -> _Job, oldest first
+_jobs_lock = Lock()
+
+
+class _SelectableEvent(Event):
+    """threading.Event that can also be waited on with select/selectors.
+
+    `set()` makes `fileno()` readable so I/O loops wake up immediately on
+    abort instead of polling the flag. `close()` releases the pipe once
+    nothing selects on it any more; the flag itself keeps working.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._rfd, self._wfd = os.pipe()
+        self._fd_lock        = Lock()
+        os.set_blocking(self._rfd, False)
+        os.set_blocking(self._wfd, False)
+
+    def fileno(self) -> int:
+        return self._rfd
+
+    def set(self):
+        super().set()
+        with self._fd_lock:
+            if self._wfd < 0:
+                return
+            try:
+                os.write(self._wfd, b'\0')
+            except BlockingIOError:
+                pass
+
+    def clear(self):
+        super().clear()
+        with self._fd_lock:
+            if self._rfd < 0:
+                return
+            try:
+                while os.read(self._rfd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        with self._fd_lock:
+            fds, self._rfd, self._wfd = (self._rfd, self._wfd), -1, -1
+        for fd in fds:
+            if fd >= 0:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    def __del__(self):
+        self.close()
+
+
+class _Job:
+    """A deploy/uninstall run for one cluster that outlives the HTTP client.
+
+    Each job owns its status, its abort event and its event stream. The SSE
+    payloads produced by the run are kept in a ring buffer, each with a
+    monotonically increasing id. Any number of subscribers can follow the
+    job and resume after a dropped connection from the last id they saw.
+    """
+
+    def __init__(self, kind: str, cluster_id: str, max_events: int = JOB_EVENT_BUFFER):
+        self.id          = uuid.uuid4().hex[:12]
+        self.kind        = kind
+        self.cluster_id  = cluster_id
+        self.status      = 'running'   # running | success | failed | aborted
+        self.abort       = _SelectableEvent()
+        self.started_at  = time.time()
+        self.finished_at = None
+        self.done        = False
+        self._events     = deque(maxlen=max_events)   # (event id, SSE payload)
+        self._next_id    = 1
+        self._cond       = Condition()
+
+    def start(self, gen):
+        """Run the SSE generator *gen* in a background thread."""
+        def _run():
+            try:
+                job_event = {'type': 'job', 'job_id': self.id, 'kind': self.kind,
+                             'cluster': self.cluster_id}
+                self._append(f"data: {json.dumps(job_event)}\n\n")
+                for payload in gen:
+                    self._append(payload)
+            except Exception as exc:
+                self._append(f"data: {json.dumps({'type': 'error', 'msg': str(exc)})}\n\n")
+            finally:
+                # The generator has returned: nothing selects on abort any more.
+                self.abort.close()
+                with self._cond:
+                    if self.status == 'running':
+                        self.status = 'failed'
+                    self.finished_at = time.time()
+                    self.done        = True
+                    self._cond.notify_all()
+        Thread(target=_run, daemon=True).start()
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id':      self.id,
+            'kind':        self.kind,
+            'cluster':     self.cluster_id,
+            'status':      self.status,
+            'started_at':  self.started_at,
+            'finished_at': self.finished_at,
+            'events':      self._next_id - 1,
+        }
+
+    def _append(self, payload: str):
+        with self._cond:
+            self._events.append((self._next_id, payload))
+            self._next_id += 1
+            self._cond.notify_all()
+
+    def _events_after(self, cursor: int) -> list:
+        # Ids are contiguous, so the first unseen event sits at a fixed offset.
+        first = self._events[0][0] if self._events else self._next_id
+        return list(itertools.islice(self._events, max(0, cursor - first + 1), None))
+
+    def subscribe(self, last_event_id: int = 0):
+        """Yield SSE frames after *last_event_id* until the job has finished.
+
+        Events that already fell out of the ring buffer are skipped.
+        """
+        cursor = last_event_id
+        while True:
+            with self._cond:
+                pending = self._events_after(cursor)
+                if not pending and not self.done:
+                    self._cond.wait(SSE_KEEPALIVE_INTERVAL)
+                    pending = self._events_after(cursor)
+                if not pending and self.done:
+                    return
+            if not pending:
+                yield ': keepalive\n\n'
+                continue
+            for event_id, payload in pending:
+                yield f'id: {event_id}\n{payload}'
+                cursor = event_id
+
+
+# ── Registry helpers ──────────────────────────────────────────────────────
+
+def _valid_cluster_id(cluster_id: str) -> bool:
+    return bool(_CLUSTER_ID_RE.match(cluster_id or ''))
+
+
+def _request_cluster_id() -> str:
+    """Cluster id from the query string or JSON body (default cluster if absent)."""
+    body = request.get_json(silent=True) if request.is_json else None
+    raw  = request.args.get('cluster') or (body or {}).get('cluster') or DEFAULT_CLUSTER_ID
+    return str(raw).strip()
+
+
+def _running_job(cluster_id: str):
+    # Caller holds _jobs_lock.
+    return next((j for j in _jobs.values() if j.cluster_id == cluster_id and not j.done), None)
+
+
+@contextmanager
+def _idle_cluster(cluster_id: str):
+    """Yield the running job of *cluster_id*, or None, holding the registry
+    lock for the whole block: no job can start on any cluster until it
+    exits, so keep the block short."""
+    with _jobs_lock:
+        yield _running_job(cluster_id)
+
+
+def _start_job(kind: str, cluster_id: str, make_gen):
+    """Register and start a job unless *cluster_id* already has one running.
+
+    *make_gen* is called with the new job and must return its SSE generator.
+    Returns the job, or None when the cluster is busy.
+    """
+    with _jobs_lock:
+        if _running_job(cluster_id) is not None:
+            return None
+        job = _Job(kind, cluster_id)
+        _jobs[job.id] = job
+        finished = [j for j in _jobs.values() if j.done]
+        evicted = finished[:max(0, len(finished) - JOB_HISTORY)]
+        for old in evicted:
+            del _jobs[old.id]
+    for old in evicted:
+        old.abort.close()
+    job.start(make_gen(job))
+    return job
+
+
+def _get_job(job_id: str):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _latest_job(cluster_id: str, kind: str = None):
+    """Most recent job for *cluster_id* (optionally of one *kind*), or None."""
+    with _jobs_lock:
+        for job in reversed(list(_jobs.values())):
+            if job.cluster_id == cluster_id and (kind is None or job.kind == kind):
+                return job
+    return None
+
+
+def _last_event_id() -> int:
+    """Read the resume cursor from the Last-Event-ID header or query string."""
+    raw = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '0')
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+def _job_response(job: _Job, last_event_id: int = 0) -> Response:
+    return Response(job.subscribe(last_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no',
+                             'X-Job-Id': job.id})
+
+
+# ── Routes ────────────────────────────────────────────────────────────────
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    cluster_id = request.args.get('cluster')
+    with _jobs_lock:
+        jobs = [j.to_dict() for j in _jobs.values()
+                if cluster_id is None or j.cluster_id == cluster_id]
+    return jsonify({'status': 'success', 'jobs': jobs})
+
+
+@jobs_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job.'}), 404
+    return _job_response(job, _last_event_id())
+
+
+@jobs_bp.route('/jobs/<job_id>/abort', methods=['POST'])
+def job_abort(job_id):
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job.'}), 404
+    job.abort.set()
+    return jsonify({'status': 'success', 'message': 'Abort signal sent.'})
@@ -0,0 +1,353 @@
+import base64
+import hashlib
+import http.client
+import json
+import os
+import socket
+import ssl
+import tempfile
+import urllib.parse
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+
+import yaml
+
+from config import KUBEAPI_MAX_CLIENTS, KUBEAPI_POOL_SIZE, KUBEAPI_TIMEOUT
+
+_TABLE_ACCEPT = 'application/json;as=Table;v=v1;g=meta.k8s.io, application/json'
+
+_clients      = OrderedDict()   # sha256(kubeconfig) -> _KubeClient, least recently used first
+_clients_lock = Lock()
+
+
+class _KubeAPIError(Exception):
+    """The API server answered with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _KubeAPIUnavailable(Exception):
+    """The kubeconfig or transport is not usable in-process (e.g. exec auth
+    plugins, unreachable server); callers fall back to the kubectl binary."""
+
+
+# ── Kubeconfig parsing ────────────────────────────────────────────────────
+
+def _select_context(cfg: dict):
+    """Return the (cluster, user) dicts of the kubeconfig's current context."""
+    def _named(section, name):
+        for entry in cfg.get(section) or []:
+            if entry.get('name') == name:
+                return entry.get(section[:-1]) or {}
+        raise _KubeAPIUnavailable(f'kubeconfig has no {section[:-1]} named {name!r}.')
+
+    contexts = cfg.get('contexts') or []
+    current  = cfg.get('current-context') or (contexts[0].get('name') if contexts else None)
+    if not current:
+        raise _KubeAPIUnavailable('kubeconfig has no context.')
+    context = _named('contexts', current)
+    return _named('clusters', context.get('cluster')), _named('users', context.get('user'))
+
+
+def _load_client_cert(ctx: ssl.SSLContext, user: dict):
+    """Load the user's client certificate; inline data goes through
+    short-lived 0600 temp files because ssl only loads chains from disk."""
+    if user.get('client-certificate'):
+        ctx.load_cert_chain(user['client-certificate'], user.get('client-key'))
+        return
+    if not user.get('client-certificate-data'):
+        return
+    paths = []
+    try:
+        for key in ('client-certificate-data', 'client-key-data'):
+            fd, path = tempfile.mkstemp(suffix='_k3sforge_tls')
+            paths.append(path)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(base64.b64decode(user.get(key, '')))
+        ctx.load_cert_chain(paths[0], paths[1])
+    finally:
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _ssl_context(cluster: dict, user: dict) -> ssl.SSLContext:
+    ctx = ssl.create_default_context()
+    if cluster.get('insecure-skip-tls-verify'):
+        ctx.check_hostname = False
+        ctx.verify_mode    = ssl.CERT_NONE
+    elif cluster.get('certificate-authority-data'):
+        ctx.load_verify_locations(
+            cadata=base64.b64decode(cluster['certificate-authority-data']).decode())
+    elif cluster.get('certificate-authority'):
+        ctx.load_verify_locations(cafile=cluster['certificate-authority'])
+    _load_client_cert(ctx, user)
+    return ctx
+
+
+# ── Client ────────────────────────────────────────────────────────────────
+
+class _KubeClient:
+    """Minimal read-only Kubernetes API client for one kubeconfig.
+
+    The kubeconfig is parsed and the TLS context built once; requests reuse
+    a small pool of keep-alive HTTPS connections.
+    """
+
+    def __init__(self, kubeconfig: str, pool_size: int = KUBEAPI_POOL_SIZE):
+        try:
+            cfg = yaml.safe_load(kubeconfig)
+        except yaml.YAMLError as exc:
+            raise _KubeAPIUnavailable(f'Invalid kubeconfig: {exc}')
+        if not isinstance(cfg, dict):
+            raise _KubeAPIUnavailable('Invalid kubeconfig.')
+        cluster, user = _select_context(cfg)
+        if user.get('exec') or user.get('auth-provider'):
+            raise _KubeAPIUnavailable('kubeconfig uses an auth plugin.')
+
+        server = urllib.parse.urlsplit(cluster.get('server', ''))
+        if server.scheme not in ('https', 'http') or not server.hostname:
+            raise _KubeAPIUnavailable('kubeconfig has no usable server URL.')
+        try:
+            ssl_ctx = _ssl_context(cluster, user) if server.scheme == 'https' else None
+        except (ssl.SSLError, ValueError, OSError) as exc:
+            raise _KubeAPIUnavailable(f'Cannot load kubeconfig credentials: {exc}')
+
+        self._host    = server.hostname
+        self._port    = server.port or (443 if server.scheme == 'https' else 80)
+        self._prefix  = server.path.rstrip('/')
+        self._ssl     = ssl_ctx
+        self._headers = {'User-Agent': 'k3sforge'}
+        self._idle    = []
+        self._size    = pool_size
+        self._lock    = Lock()
+        self._closed  = False
+
+        token = user.get('token')
+        if not token and user.get('tokenFile'):
+            with open(user['tokenFile']) as f:
+                token = f.read().strip()
+        if token:
+            self._headers['Authorization'] = f'Bearer {token}'
+        elif user.get('username'):
+            basic = base64.b64encode(
+                f"{user['username']}:{user.get('password', '')}".encode()).decode()
+            self._headers['Authorization'] = f'Basic {basic}'
+
+    def _acquire(self, timeout: float):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            if self._ssl is not None:
+                conn = http.client.HTTPSConnection(self._host, self._port, timeout=timeout,
+                                                   context=self._ssl)
+            else:
+                conn = http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+            return conn, False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _release(self, conn):
+        with self._lock:
+            if not self._closed and len(self._idle) < self._size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, path: str, query: dict = None, accept: str = 'application/json',
+                timeout: float = KUBEAPI_TIMEOUT) -> bytes:
+        """GET *path* and return the response body.
+
+        Raises `_KubeAPIError` for error statuses and timeouts, and
+        `_KubeAPIUnavailable` when the server cannot be reached at all.
+        """
+        url     = self._prefix + path + ('?' + urllib.parse.urlencode(query) if query else '')
+        headers = dict(self._headers, Accept=accept)
+        while True:
+            conn, reused = self._acquire(timeout)
+            try:
+                conn.request('GET', url, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except socket.timeout:
+                conn.close()
+                raise _KubeAPIError(408, f'Kubernetes API timed out after {timeout} seconds.')
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                if reused:
+                    continue   # stale keep-alive connection; retry on a fresh one
+                raise _KubeAPIUnavailable(str(exc))
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            break
+
+        if resp.status >= 400:
+            try:
+                message = json.loads(body).get('message')
+            except (ValueError, AttributeError):
+                message = None
+            raise _KubeAPIError(resp.status, message or f'HTTP {resp.status} {resp.reason}')
+        return body
+
+    def get_json(self, path: str, query: dict = None, **kwargs) -> dict:
+        return json.loads(self.request(path, query, **kwargs))
+
+    def stream(self, path: str, query: dict = None, accept: str = 'application/json',
+               timeout: float = KUBEAPI_TIMEOUT):
+        """GET *path* on a dedicated connection and yield the response line
+        by line (watch streams). The connection is never pooled."""
+        url     = self._prefix + path + ('?' + urllib.parse.urlencode(query) if query else '')
+        headers = dict(self._headers, Accept=accept)
+        if self._ssl is not None:
+            conn = http.client.HTTPSConnection(self._host, self._port, timeout=timeout,
+                                               context=self._ssl)
+        else:
+            conn = http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+        try:
+            try:
+                conn.request('GET', url, headers=headers)
+                resp = conn.getresponse()
+            except (OSError, http.client.HTTPException) as exc:
+                raise _KubeAPIUnavailable(str(exc))
+            if resp.status >= 400:
+                body = resp.read()
+                try:
+                    message = json.loads(body).get('message')
+                except (ValueError, AttributeError):
+                    message = None
+                raise _KubeAPIError(resp.status, message or f'HTTP {resp.status} {resp.reason}')
+            while True:
+                line = resp.readline()
+                if not line:
+                    return
+                yield line
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _client_for(kubeconfig: str) -> _KubeClient:
+    """Shared client for *kubeconfig*, built on first use."""
+    key = hashlib.sha256(kubeconfig.encode()).hexdigest()
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+    client = _KubeClient(kubeconfig)
+    with _clients_lock:
+        existing = _clients.get(key)
+        if existing is not None:
+            client.close()
+            return existing
+        _clients[key] = client
+        evicted = []
+        while len(_clients) > KUBEAPI_MAX_CLIENTS:
+            evicted.append(_clients.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+    return client
+
+
+# ── Table API ─────────────────────────────────────────────────────────────
+
+def _format_table(headers: list, rows: list) -> str:
+    """Render rows the way kubectl prints them (3-space column gaps)."""
+    widths = [len(h) for h in headers]
+    for row in rows:
+        widths = [max(w, len(cell)) for w, cell in zip(widths, row)]
+    lines = ['   '.join(cell.ljust(w) for cell, w in zip(line, widths)).rstrip()
+             for line in [headers] + rows]
+    return '\n'.join(lines)
+
+
+def _cell(value) -> str:
+    if value is None or value == '':
+        return '<none>'
+    return value if isinstance(value, str) else str(value)
+
+
+def _table_columns(table: dict, wide: bool, namespaced: bool):
+    """Pick the Table columns kubectl would print; returns (indexes, headers)."""
+    columns = [i for i, col in enumerate(table.get('columnDefinitions', []))
+               if wide or not col.get('priority')]
+    headers = [table['columnDefinitions'][i]['name'].upper() for i in columns]
+    if namespaced:
+        headers.insert(0, 'NAMESPACE')
+    return columns, headers
+
+
+def _table_row(row: dict, columns: list, namespaced: bool) -> list:
+    cells = row.get('cells', [])
+    line  = [_cell(cells[i] if i < len(cells) else None) for i in columns]
+    if namespaced:
+        meta = (row.get('object') or {}).get('metadata') or {}
+        line.insert(0, meta.get('namespace', '<none>'))
+    return line
+
+
+def _get_table(client: _KubeClient, path: str, wide: bool = False,
+               namespaced: bool = False, query: dict = None,
+               include_raw: bool = True) -> dict:
+    """Fetch *path* as a server-side Table and return it in the same shape as
+    `_kubectl_get`: {'status', 'headers', 'rows', 'raw'}.
+
+    *wide* includes the columns `-o wide` adds; *namespaced* prepends the
+    NAMESPACE column like `--all-namespaces`. *query* adds list options
+    (selectors, limit/continue); when the server cut the list short, its
+    continue token is returned as 'continue'. Without *include_raw* the
+    kubectl-style text rendering is left out.
+    """
+    table = client.get_json(
+        path, dict(query or {}, includeObject='Metadata'), accept=_TABLE_ACCEPT)
+    if table.get('kind') != 'Table':
+        raise _KubeAPIUnavailable('API server does not support the Table format.')
+
+    columns, headers = _table_columns(table, wide, namespaced)
+    rows   = [_table_row(row, columns, namespaced) for row in table.get('rows', [])]
+    result = {'status': 'success', 'headers': headers if rows else [], 'rows': rows}
+    if include_raw:
+        result['raw'] = _format_table(headers, rows) if rows else ''
+    token = (table.get('metadata') or {}).get('continue')
+    if token:
+        result['continue'] = token
+    return result
+
+
+# ── Resource quantities ───────────────────────────────────────────────────
+
+_QUANTITY_SUFFIXES = {
+    'n': 1e-9, 'u': 1e-6, 'm': 1e-3, '': 1,
+    'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15, 'E': 1e18,
+    'Ki': 2 ** 10, 'Mi': 2 ** 20, 'Gi': 2 ** 30, 'Ti': 2 ** 40, 'Pi': 2 ** 50, 'Ei': 2 ** 60,
+}
+
+
+@lru_cache(maxsize=4096)
+def _parse_quantity(quantity) -> float:
+    """Convert a Kubernetes quantity ('250m', '16Gi', '1e3') to base units.
+
+    Memoized: clusters reuse a handful of request/limit strings across
+    thousands of containers.
+    """
+    text = str(quantity).strip()
+    for size in (2, 1):
+        suffix = text[-size:]
+        if len(text) > size and suffix in _QUANTITY_SUFFIXES and not suffix.isdigit():
+            return float(text[:-size]) * _QUANTITY_SUFFIXES[suffix]
+    return float(text)
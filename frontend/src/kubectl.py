@@ -1,158 +1,483 @@
+import hashlib
 import json
 import os
+import re
 import subprocess
 import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Event, Lock, Timer
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
+
+from config import (KUBE_CACHE_MAX, KUBE_CACHE_TTL, KUBE_SESSION_MAX, KUBE_SESSION_TTL,
+                    PODS_MAX_LIMIT, PODS_PAGE_SIZE, SNAPSHOT_TIMEOUT)
+from kubeapi import (_KubeAPIError, _KubeAPIUnavailable, _KubeClient, _client_for,
+                     _format_table, _get_table, _parse_quantity)
+from kubeobjects import _PROJECTIONS, _iter_list_items
 
 kubectl_bp = Blueprint('kubectl', __name__)
 
+_sessions      = {}   # session id -> _KubeSession
+_sessions_lock = Lock()
+
+_NAMESPACE_RE = re.compile(r'^[a-z0-9]([-a-z0-9]{0,61}[a-z0-9])?$')
 
-# ── Helper ────────────────────────────────────────────────────────────────
 
-def _kubectl_get(kubeconfig: str, args: list, timeout: int = 30):
-    """Write kubeconfig to a temp file, run kubectl with *args*, parse output.
+class _ResponseCache:
+    """Bounded TTL cache with single-flight loading.
 
-    Returns a (dict, http_status) tuple suitable for jsonify.
+    Concurrent misses on the same key share one computation; entries expire
+    after *ttl* seconds and the least recently used go beyond *max_entries*.
+    Only values accepted by *cacheable* are stored.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, cacheable=lambda value: True):
+        self.ttl        = ttl
+        self._max       = max_entries
+        self._cacheable = cacheable
+        self._entries   = OrderedDict()   # key -> (expires at, value)
+        self._inflight  = {}              # key -> Future
+        self._lock      = Lock()
+
+    def get(self, key, compute, fresh: bool = False):
+        """Return the cached value for *key*, or compute it. *fresh* skips
+        the stored entry but still joins an in-flight computation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and not fresh and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        if not leader:
+            return flight.result()
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            flight.set_exception(exc)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if self._cacheable(value):
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max:
+                    self._entries.popitem(last=False)
+        flight.set_result(value)
+        return value
+
+
+# (body, http_status, etag) per (cluster identity, section); errors are not kept.
+_section_cache = _ResponseCache(KUBE_CACHE_TTL, KUBE_CACHE_MAX,
+                                cacheable=lambda value: value[1] == 200)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────
+
+class _KubeSession:
+    """One kubeconfig plus everything derived from it.
+
+    The API client is built on first use and the kubeconfig is written to a
+    0600 temp file only when a kubectl fallback needs it, at most once.
+    Ad-hoc sessions live for one request; registered ones (see
+    /kube-sessions) keep their client, TLS state and temp file until they
+    expire.
+    """
+
+    def __init__(self, kubeconfig: str, shared_client: bool = True):
+        self.kubeconfig = kubeconfig
+        self.identity   = hashlib.sha256(kubeconfig.encode()).hexdigest()
+        self.id         = None
+        self.last_used  = time.monotonic()
+        self._shared    = shared_client
+        self._client    = None
+        self._error     = None
+        self._path      = None
+        self._lock      = Lock()
+
+    def client(self) -> _KubeClient:
+        """API client for this kubeconfig; raises `_KubeAPIUnavailable` (also
+        on later calls, without re-parsing) when it cannot be used."""
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if self._client is None:
+                try:
+                    self._client = (_client_for(self.kubeconfig) if self._shared
+                                    else _KubeClient(self.kubeconfig))
+                except _KubeAPIUnavailable as exc:
+                    self._error = exc
+                    raise
+            return self._client
+
+    def path(self) -> str:
+        with self._lock:
+            if self._path is None:
+                tmp = tempfile.NamedTemporaryFile(delete=False, suffix='_inframind_kube', mode='w')
+                tmp.write(self.kubeconfig)
+                tmp.close()
+                os.chmod(tmp.name, 0o600)
+                self._path = tmp.name
+            return self._path
+
+    def close(self):
+        with self._lock:
+            path, self._path = self._path, None
+            client = None if self._shared else self._client
+            self._client = None
+        if path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        if client is not None:
+            client.close()
+
+
+def _kubectl_get(kubeconfig: str, args: list, timeout: int = 30,
+                 session: _KubeSession = None, include_raw: bool = True):
+    """Run `kubectl get <resource> ... -o json` against *session*'s
+    kubeconfig (a one-off session for *kubeconfig* when none is given) and
+    project each item into a table row.
+
+    *args* start with ['get', <resource>] for a resource in _PROJECTIONS.
+    Items are decoded one at a time from kubectl's stdout, so only the
+    compact rows are kept; stderr is spooled to a temp file and only read
+    for the error message. With *include_raw*, the body also carries the
+    rows as a plain-text table. Returns a (dict, http_status) tuple
+    suitable for jsonify.
     """
-    tmp_path = None
+    headers, project = _PROJECTIONS[args[1]]
+    owned = session is None
+    if owned:
+        session = _KubeSession(kubeconfig)
+    proc = None
+    # stderr goes to a file: a pipe nobody reads while stdout is being
+    # parsed would fill up and stall kubectl.
+    errors = tempfile.TemporaryFile(mode='w+')
     try:
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='_inframind_kube', mode='w')
-        tmp.write(kubeconfig)
-        tmp.close()
-        tmp_path = tmp.name
-        os.chmod(tmp_path, 0o600)
-
-        result = subprocess.run(
-            ['kubectl', '--kubeconfig', tmp_path] + args,
-            capture_output=True,
+        proc = subprocess.Popen(
+            ['kubectl', '--kubeconfig', session.path()] + args + ['-o', 'json'],
+            stdout=subprocess.PIPE,
+            stderr=errors,
             text=True,
-            timeout=timeout,
         )
-
-        if result.returncode != 0:
-            error_msg = result.stderr.strip() or result.stdout.strip() or 'kubectl command failed'
+        timed_out = Event()
+        timer     = Timer(timeout, lambda: (timed_out.set(), proc.kill()))
+        timer.start()
+        try:
+            try:
+                rows = [project(item) for item in _iter_list_items(proc.stdout)]
+            except ValueError:
+                rows = None
+            proc.wait()
+        finally:
+            timer.cancel()
+        errors.seek(0)
+        stderr = errors.read()
+
+        if timed_out.is_set():
+            return {'status': 'error', 'message': f'kubectl timed out after {timeout} seconds.'}, 408
+        if proc.returncode != 0 or rows is None:
+            error_msg = stderr.strip() or 'kubectl command failed'
             return {'status': 'error', 'message': error_msg}, 400
 
-        output = result.stdout.strip()
-        lines  = [ln for ln in output.splitlines() if ln.strip()]
-
-        if not lines:
-            return {'status': 'success', 'headers': [], 'rows': [], 'raw': output}, 200
-
-        headers = lines[0].split()
-        rows    = []
-        for line in lines[1:]:
-            parts = line.split(None, len(headers) - 1)
-            while len(parts) < len(headers):
-                parts.append('<none>')
-            rows.append(parts)
-
-        return {'status': 'success', 'headers': headers, 'rows': rows, 'raw': output}, 200
+        body = {'status': 'success', 'headers': headers if rows else [], 'rows': rows}
+        if include_raw:
+            body['raw'] = _format_table(headers, rows) if rows else ''
+        return body, 200
 
-    except subprocess.TimeoutExpired:
-        return {'status': 'error', 'message': f'kubectl timed out after {timeout} seconds.'}, 408
     except FileNotFoundError:
         return {'status': 'error',
                 'message': 'kubectl not found. Please ensure kubectl is installed and on PATH.'}, 400
     except Exception as exc:
         return {'status': 'error', 'message': f'Unexpected error: {str(exc)}'}, 500
     finally:
-        if tmp_path:
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
-
-
-# ── Routes ────────────────────────────────────────────────────────────────
-
-@kubectl_bp.route('/kubectl-nodes', methods=['POST'])
-def kubectl_nodes():
-    data = request.get_json(silent=True)
-    if not data:
-        return jsonify({'status': 'error', 'message': 'Invalid or missing JSON body.'}), 400
-    kubeconfig = data.get('kubeconfig', '').strip()
-    if not kubeconfig:
-        return jsonify({'status': 'error', 'message': 'Kubeconfig content is required.'}), 400
-
-    body, code = _kubectl_get(kubeconfig, ['get', 'nodes', '-o', 'wide'])
-    return jsonify(body), code
-
-
-@kubectl_bp.route('/kubectl-pods', methods=['POST'])
-def kubectl_pods():
-    data = request.get_json(silent=True)
-    if not data:
-        return jsonify({'status': 'error', 'message': 'Invalid or missing JSON body.'}), 400
-    kubeconfig = data.get('kubeconfig', '').strip()
-    if not kubeconfig:
-        return jsonify({'status': 'error', 'message': 'Kubeconfig content is required.'}), 400
-
-    body, code = _kubectl_get(kubeconfig, ['get', 'pods', '--all-namespaces', '-o', 'wide'])
-    return jsonify(body), code
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        errors.close()
+        if owned:
+            session.close()
+
+
+def _kube_get(session: _KubeSession, path: str, args: list, wide: bool = False,
+              namespaced: bool = False, query: dict = None, include_raw: bool = True):
+    """Fetch a resource table through the in-process API client, falling
+    back to `kubectl <args>` when the API cannot be used directly.
+
+    The kubectl fallback cannot page, so it ignores limit/continue in
+    *query* and returns everything in one go. Returns a (dict, http_status)
+    tuple like `_kubectl_get`.
+    """
+    try:
+        return _get_table(session.client(), path, wide=wide, namespaced=namespaced,
+                          query=query, include_raw=include_raw), 200
+    except _KubeAPIError as exc:
+        return {'status': 'error', 'message': str(exc)}, 408 if exc.status == 408 else 400
+    except (_KubeAPIUnavailable, ValueError, KeyError):
+        return _kubectl_get(session.kubeconfig, args, session=session, include_raw=include_raw)
+
+
+def _top_from_metrics(metrics_json: dict, nodes_json: dict) -> dict:
+    """Turn metrics.k8s.io NodeMetrics into `kubectl top nodes` figures
+    (usage in m / Mi, percentages of allocatable)."""
+    allocatable = {item['metadata']['name']: item['status'].get('allocatable', {})
+                   for item in nodes_json.get('items', [])}
+    metrics = {}
+    for item in metrics_json.get('items', []):
+        name  = item['metadata']['name']
+        usage = item.get('usage', {})
+        alloc = allocatable.get(name, {})
+        cpu_m = int(_parse_quantity(usage.get('cpu', '0')) * 1000)
+        mem_b = int(_parse_quantity(usage.get('memory', '0')))
+        cpu_a = _parse_quantity(alloc.get('cpu', '0')) * 1000
+        mem_a = _parse_quantity(alloc.get('memory', '0'))
+        metrics[name] = {
+            'cpu_used':       f'{cpu_m}m',
+            'cpu_percent':    str(int(cpu_m * 100 / cpu_a)) if cpu_a else '0',
+            'memory_used':    f'{mem_b // (1024 * 1024)}Mi',
+            'memory_percent': str(int(mem_b * 100 / mem_a)) if mem_a else '0',
+        }
+    return metrics
+
+
+def _container_resources(container: dict) -> list:
+    """[cpu request, cpu limit, memory request, memory limit] in cores/bytes."""
+    res = container.get('resources') or {}
+    return [_parse_quantity((res.get(kind) or {}).get(name, 0))
+            for name in ('cpu', 'memory') for kind in ('requests', 'limits')]
+
+
+def _pod_requests(pods, totals: dict):
+    """Add each scheduled pod's CPU/memory requests and limits to its node
+    in *totals* (node -> [cpu req, cpu lim, mem req, mem lim, pods]).
+
+    A pod counts like the scheduler sees it: the larger of its containers'
+    sum and its biggest init container, plus the pod overhead.
+    """
+    for pod in pods:
+        spec = pod.get('spec') or {}
+        node = spec.get('nodeName')
+        if not node or (pod.get('status') or {}).get('phase') in ('Succeeded', 'Failed'):
+            continue
+        app      = [_container_resources(c) for c in spec.get('containers') or []]
+        init     = [_container_resources(c) for c in spec.get('initContainers') or []]
+        total    = [sum(column) for column in zip(*app)] or [0.0] * 4
+        peak     = [max(column) for column in zip(*init)] or [0.0] * 4
+        overhead = _container_resources({'resources': {'requests': spec.get('overhead') or {},
+                                                       'limits':   spec.get('overhead') or {}}})
+        node_totals = totals.setdefault(node, [0.0, 0.0, 0.0, 0.0, 0])
+        for i in range(4):
+            node_totals[i] += max(total[i], peak[i]) + overhead[i]
+        node_totals[4] += 1
+
+
+def _requests_fields(values: list, allocatable: dict) -> dict:
+    """Requested-resource figures for one node, formatted like the metrics."""
+    cpu_req, cpu_lim, mem_req, mem_lim, pods = values
+    cpu_a = _parse_quantity(allocatable.get('cpu', '0'))
+    mem_a = _parse_quantity(allocatable.get('memory', '0'))
+    return {
+        'cpu_requests':            f'{round(cpu_req * 1000)}m',
+        'cpu_limits':              f'{round(cpu_lim * 1000)}m',
+        'cpu_requests_percent':    str(int(cpu_req * 100 / cpu_a)) if cpu_a else '0',
+        'memory_requests':         f'{int(mem_req) // (1024 * 1024)}Mi',
+        'memory_limits':           f'{int(mem_lim) // (1024 * 1024)}Mi',
+        'memory_requests_percent': str(int(mem_req * 100 / mem_a)) if mem_a else '0',
+        'pods_scheduled':          pods,
+    }
+
+
+_ACTIVE_PODS = 'status.phase!=Succeeded,status.phase!=Failed'
+
+
+def _api_pod_requests(client: _KubeClient) -> dict:
+    """Per-node request totals, paging through the pod list so only one page
+    of full pod objects is held at a time."""
+    totals = {}
+    query  = {'fieldSelector': _ACTIVE_PODS, 'limit': PODS_PAGE_SIZE}
+    while True:
+        page = client.get_json('/api/v1/pods', query)
+        _pod_requests(page.get('items', []), totals)
+        token = (page.get('metadata') or {}).get('continue')
+        if not token:
+            return totals
+        query['continue'] = token
+
+
+def _api_metrics(client: _KubeClient):
+    try:
+        return client.get_json('/apis/metrics.k8s.io/v1beta1/nodes', timeout=15)
+    except _KubeAPIError:
+        return None
 
 
-@kubectl_bp.route('/kubectl-services', methods=['POST'])
-def kubectl_services():
-    data = request.get_json(silent=True)
-    if not data:
-        return jsonify({'status': 'error', 'message': 'Invalid or missing JSON body.'}), 400
-    kubeconfig = data.get('kubeconfig', '').strip()
-    if not kubeconfig:
-        return jsonify({'status': 'error', 'message': 'Kubeconfig content is required.'}), 400
+def _optional(future: Future):
+    """Result of an optional lookup, or None when it failed."""
+    try:
+        return future.result()
+    except Exception:
+        return None
 
-    body, code = _kubectl_get(kubeconfig, ['get', 'services', '--all-namespaces'])
-    return jsonify(body), code
 
+def _node_resources_api(client: _KubeClient):
+    """Nodes JSON, live metrics and per-node pod requests over the in-process
+    API client, fetched concurrently.
 
-@kubectl_bp.route('/kubectl-node-resources', methods=['POST'])
-def kubectl_node_resources():
-    data = request.get_json(silent=True)
-    if not data:
-        return jsonify({'status': 'error', 'message': 'Invalid or missing JSON body.'}), 400
-    kubeconfig = data.get('kubeconfig', '').strip()
-    if not kubeconfig:
-        return jsonify({'status': 'error', 'message': 'Kubeconfig content is required.'}), 400
-
-    tmp_path = None
+    Returns (nodes_json, metrics, metrics_available, requests); metrics are
+    missing when metrics-server is not installed and requests (node -> totals)
+    are None when pods cannot be listed.
+    """
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        nodes_f    = pool.submit(client.get_json, '/api/v1/nodes')
+        metrics_f  = pool.submit(_api_metrics, client)
+        requests_f = pool.submit(_api_pod_requests, client)
+        nodes_json   = nodes_f.result()
+        metrics_json = _optional(metrics_f)
+        requests     = _optional(requests_f)
+    if metrics_json is None:
+        return nodes_json, {}, False, requests
+    return nodes_json, _top_from_metrics(metrics_json, nodes_json), True, requests
+
+
+def _kubectl_top(kubectl_path: str):
+    """`kubectl top nodes` figures, or None without metrics-server."""
+    top_result = subprocess.run(
+        ['kubectl', '--kubeconfig', kubectl_path, 'top', 'nodes', '--no-headers'],
+        capture_output=True, text=True, timeout=15,
+    )
+    if top_result.returncode != 0:
+        return None
+    metrics = {}
+    for line in top_result.stdout.strip().splitlines():
+        parts = line.split()
+        # Columns: NAME CPU(cores) CPU% MEMORY(bytes) MEMORY%
+        if len(parts) >= 5:
+            metrics[parts[0]] = {
+                'cpu_used':        parts[1],
+                'cpu_percent':     parts[2].rstrip('%'),
+                'memory_used':     parts[3],
+                'memory_percent':  parts[4].rstrip('%'),
+            }
+    return metrics
+
+
+def _kubectl_pod_requests(kubectl_path: str, timeout: int = 30) -> dict:
+    """Per-node request totals from `kubectl get pods -o json`, decoded one
+    pod at a time."""
+    proc = subprocess.Popen(
+        ['kubectl', '--kubeconfig', kubectl_path, 'get', 'pods', '--all-namespaces',
+         '--field-selector', _ACTIVE_PODS, '-o', 'json'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    timer = Timer(timeout, proc.kill)
+    timer.start()
     try:
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='_inframind_kube', mode='w')
-        tmp.write(kubeconfig)
-        tmp.close()
-        tmp_path = tmp.name
-        os.chmod(tmp_path, 0o600)
-
-        # ── Capacity / allocatable per node ───────────────────────────────
-        nodes_result = subprocess.run(
-            ['kubectl', '--kubeconfig', tmp_path, 'get', 'nodes', '-o', 'json'],
-            capture_output=True, text=True, timeout=30,
-        )
-        if nodes_result.returncode != 0:
-            err = nodes_result.stderr.strip() or nodes_result.stdout.strip() or 'kubectl get nodes failed'
-            return jsonify({'status': 'error', 'message': err}), 400
-
-        nodes_json = json.loads(nodes_result.stdout)
-
-        # ── Live metrics (requires metrics-server — optional) ─────────────
-        metrics: dict           = {}
-        metrics_available: bool = False
-        top_result = subprocess.run(
-            ['kubectl', '--kubeconfig', tmp_path, 'top', 'nodes', '--no-headers'],
-            capture_output=True, text=True, timeout=15,
-        )
-        if top_result.returncode == 0:
-            metrics_available = True
-            for line in top_result.stdout.strip().splitlines():
-                parts = line.split()
-                # Columns: NAME CPU(cores) CPU% MEMORY(bytes) MEMORY%
-                if len(parts) >= 5:
-                    metrics[parts[0]] = {
-                        'cpu_used':        parts[1],
-                        'cpu_percent':     parts[2].rstrip('%'),
-                        'memory_used':     parts[3],
-                        'memory_percent':  parts[4].rstrip('%'),
-                    }
+        totals = {}
+        _pod_requests(_iter_list_items(proc.stdout), totals)
+        if proc.wait() != 0:
+            raise RuntimeError('kubectl get pods failed')
+        return totals
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def _node_resources_kubectl(kubectl_path: str):
+    """Same as `_node_resources_api`, through the kubectl binary."""
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        nodes_f    = pool.submit(subprocess.run,
+                                 ['kubectl', '--kubeconfig', kubectl_path, 'get', 'nodes', '-o', 'json'],
+                                 capture_output=True, text=True, timeout=30)
+        metrics_f  = pool.submit(_kubectl_top, kubectl_path)
+        requests_f = pool.submit(_kubectl_pod_requests, kubectl_path)
+        nodes_result = nodes_f.result()
+        metrics      = _optional(metrics_f)
+        requests     = _optional(requests_f)
+    if nodes_result.returncode != 0:
+        err = nodes_result.stderr.strip() or nodes_result.stdout.strip() or 'kubectl get nodes failed'
+        raise _KubeAPIError(400, err)
+
+    nodes_json = json.loads(nodes_result.stdout)
+    return nodes_json, metrics or {}, metrics is not None, requests
+
+
+# ── Sections ──────────────────────────────────────────────────────────────
+# Each returns a (dict, http_status) tuple.
+
+def _nodes_section(session: _KubeSession):
+    return _kube_get(session, '/api/v1/nodes', ['get', 'nodes'], wide=True)
+
+
+def _pods_section(session: _KubeSession, namespace: str = '', label_selector: str = '',
+                  field_selector: str = '', limit: int = 0, cont: str = '',
+                  include_raw: bool = True):
+    path  = f'/api/v1/namespaces/{namespace}/pods' if namespace else '/api/v1/pods'
+    query = {key: value for key, value in (('labelSelector', label_selector),
+                                           ('fieldSelector', field_selector),
+                                           ('limit', limit), ('continue', cont)) if value}
+    args  = ['get', 'pods'] + (['-n', namespace] if namespace else ['--all-namespaces'])
+    if label_selector:
+        args += ['-l', label_selector]
+    if field_selector:
+        args += ['--field-selector', field_selector]
+    return _kube_get(session, path, args, wide=True, namespaced=True, query=query,
+                     include_raw=include_raw)
+
+
+def _pod_options(data: dict) -> dict:
+    """Validate the optional /kubectl-pods filters and paging fields.
+
+    Returns only the options that were set, as `_pods_section` kwargs;
+    raises ValueError with a user-facing message.
+    """
+    opts      = {}
+    namespace = str(data.get('namespace') or '').strip()
+    if namespace:
+        if not _NAMESPACE_RE.match(namespace):
+            raise ValueError('Invalid namespace.')
+        opts['namespace'] = namespace
+    for field, key in (('label_selector', 'label_selector'),
+                       ('field_selector', 'field_selector'),
+                       ('continue', 'cont')):
+        value = str(data.get(field) or '').strip()
+        if value:
+            opts[key] = value
+    if data.get('limit') not in (None, ''):
+        try:
+            limit = int(data['limit'])
+        except (TypeError, ValueError):
+            raise ValueError('limit must be an integer.')
+        opts['limit'] = max(1, min(limit, PODS_MAX_LIMIT))
+    if data.get('raw') is False:
+        opts['include_raw'] = False
+    return opts
+
+
+def _services_section(session: _KubeSession):
+    return _kube_get(session, '/api/v1/services',
+                     ['get', 'services', '--all-namespaces'], namespaced=True)
+
+
+def _node_resources_section(session: _KubeSession):
+    try:
+        try:
+            nodes_json, metrics, metrics_available, requests = \
+                _node_resources_api(session.client())
+        except (_KubeAPIUnavailable, ValueError, KeyError):
+            nodes_json, metrics, metrics_available, requests = \
+                _node_resources_kubectl(session.path())
 
         nodes = []
         for item in nodes_json.get('items', []):
@@ -181,25 +506,271 @@ def kubectl_node_resources():
             }
             if metrics_available and name in metrics:
                 node_data.update(metrics[name])
+            if requests is not None:
+                node_data.update(_requests_fields(requests.get(name, [0.0, 0.0, 0.0, 0.0, 0]),
+                                                  allocatable or capacity))
 
             nodes.append(node_data)
 
-        return jsonify({'status': 'success', 'nodes': nodes,
-                        'metrics_available': metrics_available})
+        return {'status': 'success', 'nodes': nodes,
+                'metrics_available': metrics_available,
+                'requests_available': requests is not None}, 200
 
+    except _KubeAPIError as exc:
+        return {'status': 'error', 'message': str(exc)}, 408 if exc.status == 408 else 400
     except subprocess.TimeoutExpired:
-        return jsonify({'status': 'error', 'message': 'kubectl timed out.'}), 408
+        return {'status': 'error', 'message': 'kubectl timed out.'}, 408
     except (json.JSONDecodeError, ValueError) as exc:
-        return jsonify({'status': 'error',
-                        'message': f'Failed to parse node data: {str(exc)}'}), 400
+        return {'status': 'error', 'message': f'Failed to parse node data: {str(exc)}'}, 400
     except FileNotFoundError:
-        return jsonify({'status': 'error',
-                        'message': 'kubectl not found. Please ensure kubectl is installed and on PATH.'}), 400
+        return {'status': 'error',
+                'message': 'kubectl not found. Please ensure kubectl is installed and on PATH.'}, 400
     except Exception as exc:
-        return jsonify({'status': 'error', 'message': f'Unexpected error: {str(exc)}'}), 500
+        return {'status': 'error', 'message': f'Unexpected error: {str(exc)}'}, 500
+
+
+_SECTIONS = {
+    'nodes':          _nodes_section,
+    'pods':           _pods_section,
+    'services':       _services_section,
+    'node_resources': _node_resources_section,
+}
+
+
+# ── Sessions ──────────────────────────────────────────────────────────────
+
+def _evict_sessions():
+    """Close sessions idle longer than KUBE_SESSION_TTL, then the least
+    recently used ones beyond KUBE_SESSION_MAX."""
+    now = time.monotonic()
+    with _sessions_lock:
+        expired = [s for s in _sessions.values() if now - s.last_used > KUBE_SESSION_TTL]
+        for sess in expired:
+            del _sessions[sess.id]
+        by_age = sorted(_sessions.values(), key=lambda s: s.last_used)
+        for sess in by_age[:max(0, len(by_age) - KUBE_SESSION_MAX)]:
+            del _sessions[sess.id]
+            expired.append(sess)
+    for sess in expired:
+        sess.close()
+
+
+def _get_session(session_id: str):
+    _evict_sessions()
+    with _sessions_lock:
+        sess = _sessions.get(session_id)
+        if sess is not None:
+            sess.last_used = time.monotonic()
+        return sess
+
+
+def _session_from_request():
+    """Resolve the POST body to a kubeconfig session.
+
+    The body carries either a 'session' handle from /kube-sessions or the
+    full 'kubeconfig'; the latter gets a one-off session the caller must
+    close. Returns (session, owned, None) or (None, False, error response).
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return None, False, (jsonify({'status': 'error', 'message': 'Invalid or missing JSON body.'}), 400)
+    if data.get('session'):
+        sess = _get_session(str(data['session']))
+        if sess is None:
+            return None, False, (jsonify({'status': 'error',
+                                          'message': 'Unknown or expired session.'}), 404)
+        return sess, False, None
+    kubeconfig = data.get('kubeconfig', '').strip()
+    if not kubeconfig:
+        return None, False, (jsonify({'status': 'error', 'message': 'Kubeconfig content is required.'}), 400)
+    return _KubeSession(kubeconfig), True, None
+
+
+def _etag(payload) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _cached_section(sess: _KubeSession, name: str, fresh: bool = False, **opts):
+    """Run section *name* (with section-specific *opts*) through the
+    response cache; returns (body, http_status, etag)."""
+    def _compute():
+        body, code = _SECTIONS[name](sess, **opts)
+        return body, code, _etag(body)
+    key = (sess.identity, name, tuple(sorted(opts.items())))
+    return _section_cache.get(key, _compute, fresh)
+
+
+def _json_response(body: dict, code: int, etag: str):
+    """jsonify *body* with its ETag, or a bodyless 304 when the client's
+    If-None-Match already names it."""
+    if code == 200 and request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(body)
+        resp.status_code = code
+    resp.set_etag(etag)
+    return resp
+
+
+def _run_section(name: str, **opts):
+    sess, owned, error = _session_from_request()
+    if error:
+        return error
+    fresh = bool((request.get_json(silent=True) or {}).get('fresh'))
+    try:
+        body, code, etag = _cached_section(sess, name, fresh, **opts)
     finally:
-        if tmp_path:
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
+        if owned:
+            sess.close()
+    return _json_response(body, code, etag)
+
+
+def _stream_pods(sess: _KubeSession, owned: bool, opts: dict):
+    """Generator: page through the pod list and emit NDJSON.
+
+    The first line carries the headers, then one line per page of rows, and
+    a final line with the total; an error ends the stream with an error line.
+    """
+    opts  = dict(opts, limit=opts.get('limit', PODS_PAGE_SIZE), include_raw=False)
+    total = 0
+    try:
+        headers = None
+        while True:
+            body, code = _pods_section(sess, **opts)
+            if code != 200:
+                yield json.dumps(body) + '\n'
+                return
+            if headers is None and body['headers']:
+                headers = body['headers']
+                yield json.dumps({'headers': headers}) + '\n'
+            if body['rows']:
+                total += len(body['rows'])
+                yield json.dumps({'rows': body['rows']}) + '\n'
+            if not body.get('continue'):
+                break
+            opts['cont'] = body['continue']
+        yield json.dumps({'status': 'success', 'done': True, 'count': total}) + '\n'
+    finally:
+        if owned:
+            sess.close()
+
+
+# ── Routes ────────────────────────────────────────────────────────────────
+
+@kubectl_bp.route('/kube-sessions', methods=['POST'])
+def create_kube_session():
+    data       = request.get_json(silent=True) or {}
+    kubeconfig = str(data.get('kubeconfig', '')).strip()
+    if not kubeconfig:
+        return jsonify({'status': 'error', 'message': 'Kubeconfig content is required.'}), 400
+
+    sess    = _KubeSession(kubeconfig, shared_client=False)
+    sess.id = uuid.uuid4().hex
+    with _sessions_lock:
+        _sessions[sess.id] = sess
+    _evict_sessions()
+    return jsonify({'status': 'success', 'session': sess.id, 'ttl': KUBE_SESSION_TTL})
+
+
+@kubectl_bp.route('/kube-sessions/<session_id>', methods=['DELETE'])
+def delete_kube_session(session_id):
+    with _sessions_lock:
+        sess = _sessions.pop(session_id, None)
+    if sess is not None:
+        sess.close()
+    return jsonify({'status': 'success'})
+
+
+@kubectl_bp.route('/kubectl-nodes', methods=['POST'])
+def kubectl_nodes():
+    return _run_section('nodes')
+
+
+@kubectl_bp.route('/kubectl-pods', methods=['POST'])
+def kubectl_pods():
+    """Pod table, optionally filtered (namespace, label_selector,
+    field_selector) and paged (limit, continue). 'raw': false drops the text
+    rendering; 'stream': true pages through everything server-side and
+    streams the rows as NDJSON."""
+    data = request.get_json(silent=True) or {}
+    try:
+        opts = _pod_options(data)
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    if not data.get('stream'):
+        return _run_section('pods', **opts)
+
+    sess, owned, error = _session_from_request()
+    if error:
+        return error
+    return Response(_stream_pods(sess, owned, opts), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@kubectl_bp.route('/kubectl-services', methods=['POST'])
+def kubectl_services():
+    return _run_section('services')
+
+
+@kubectl_bp.route('/kubectl-node-resources', methods=['POST'])
+def kubectl_node_resources():
+    return _run_section('node_resources')
+
+
+@kubectl_bp.route('/cluster-snapshot', methods=['POST'])
+def cluster_snapshot():
+    """Fetch every dashboard section concurrently in one round trip.
+
+    Sections fail independently: each carries its own status/message, and
+    per-section timings are reported in milliseconds. A section still
+    running after SNAPSHOT_TIMEOUT is reported as timed out. Sections come
+    from the response cache unless the body asks for 'fresh' data.
+    """
+    sections = (request.get_json(silent=True) or {}).get('sections') or list(_SECTIONS)
+    unknown  = [name for name in sections if name not in _SECTIONS]
+    if unknown:
+        return jsonify({'status': 'error',
+                        'message': f"Unknown section(s): {', '.join(unknown)}"}), 400
+    sess, owned, error = _session_from_request()
+    if error:
+        return error
+
+    started = time.monotonic()
+    timings = {}
+
+    fresh = bool((request.get_json(silent=True) or {}).get('fresh'))
+
+    def _timed(name):
+        t0 = time.monotonic()
+        try:
+            return _cached_section(sess, name, fresh)
+        finally:
+            timings[name] = round((time.monotonic() - t0) * 1000)
+
+    def _cleanup(_):
+        # A one-off session is closed once the last section is done, even
+        # if that is after the response has been sent.
+        if owned and all(f.done() for f in futures.values()):
+            sess.close()
+
+    executor = ThreadPoolExecutor(max_workers=len(sections))
+    futures  = {name: executor.submit(_timed, name) for name in sections}
+    for fut in futures.values():
+        fut.add_done_callback(_cleanup)
+    try:
+        wait(futures.values(), timeout=SNAPSHOT_TIMEOUT)
+        result = {'status': 'success'}
+        etags  = {}
+        for name, fut in futures.items():
+            if fut.done():
+                result[name], _, etags[name] = fut.result()
+            else:
+                result[name] = {'status': 'error',
+                                'message': f'Timed out after {SNAPSHOT_TIMEOUT} seconds.'}
+                etags[name]   = _etag(result[name])
+                timings[name] = round((time.monotonic() - started) * 1000)
+        result['timings'] = dict(timings)
+        # The ETag covers the section data only, not the timings.
+        return _json_response(result, 200, _etag(etags))
+    finally:
+        executor.shutdown(wait=False)
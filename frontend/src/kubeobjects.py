@@ -0,0 +1,247 @@
+import json
+from datetime import datetime, timezone
+
+# ── Incremental list parsing ──────────────────────────────────────────────
+
+_decoder   = json.JSONDecoder()
+_WS        = ' \t\r\n'
+_READ_SIZE = 1 << 16
+
+
+class _ListReader:
+    """Pull JSON values one at a time out of a text stream.
+
+    Only the value currently being decoded is buffered, so a `kubectl get
+    -o json` list is never held in memory as a whole.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._buf    = ''
+        self._eof    = False
+
+    def _fill(self) -> bool:
+        chunk = '' if self._eof else self._stream.read(_READ_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf += chunk
+        return True
+
+    def _skip(self):
+        while True:
+            self._buf = self._buf.lstrip(_WS)
+            if self._buf or not self._fill():
+                return
+
+    def peek(self) -> str:
+        self._skip()
+        if not self._buf:
+            raise ValueError('Unexpected end of kubectl output.')
+        return self._buf[0]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} in kubectl output.')
+        self._buf = self._buf[1:]
+
+    def value(self):
+        self._skip()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self._buf)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number may continue in the next chunk; make sure it ended.
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue
+            self._buf = self._buf[end:]
+            return obj
+
+
+def _iter_list_items(stream):
+    """Yield each element of the top-level 'items' array of a JSON List
+    read from *stream*; other top-level keys are skipped."""
+    reader = _ListReader(stream)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'items' and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield reader.value()
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            reader.value()
+        if reader.peek() != ',':
+            break
+        reader.expect(',')
+    reader.expect('}')
+
+
+# ── Projections ───────────────────────────────────────────────────────────
+# Each turns one API object into the row kubectl prints for it, with the
+# same headers the server-side Table gives (see kubeapi._get_table).
+
+def _age(timestamp: str, now: datetime = None) -> str:
+    """kubectl's short human duration since an RFC 3339 *timestamp*."""
+    if not timestamp:
+        return '<unknown>'
+    then    = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    seconds = int(((now or datetime.now(timezone.utc)) - then).total_seconds())
+    if seconds < 0:
+        return '<invalid>'
+    minutes, hours, days = seconds // 60, seconds // 3600, seconds // 86400
+    if seconds < 120:
+        return f'{seconds}s'
+    if minutes < 10:
+        return f'{minutes}m{seconds % 60}s' if seconds % 60 else f'{minutes}m'
+    if minutes < 180:
+        return f'{minutes}m'
+    if hours < 8:
+        return f'{hours}h{minutes % 60}m' if minutes % 60 else f'{hours}h'
+    if hours < 48:
+        return f'{hours}h'
+    if hours < 192:
+        return f'{days}d{hours % 24}h' if hours % 24 else f'{days}d'
+    if days < 730:
+        return f'{days}d'
+    if days < 2920:
+        return f'{days // 365}y{days % 365}d' if days % 365 else f'{days // 365}y'
+    return f'{days // 365}y'
+
+
+def _or_none(value) -> str:
+    return str(value) if value not in (None, '', []) else '<none>'
+
+
+def _node_row(node: dict) -> list:
+    meta   = node.get('metadata') or {}
+    spec   = node.get('spec') or {}
+    status = node.get('status') or {}
+    labels = meta.get('labels') or {}
+    info   = status.get('nodeInfo') or {}
+
+    ready = next((c for c in status.get('conditions') or [] if c.get('type') == 'Ready'), None)
+    state = {'True': 'Ready', 'False': 'NotReady'}.get((ready or {}).get('status'), 'Unknown')
+    if spec.get('unschedulable'):
+        state += ',SchedulingDisabled'
+
+    roles = sorted({key.split('/', 1)[1] for key in labels
+                    if key.startswith('node-role.kubernetes.io/') and key.split('/', 1)[1]}
+                   | ({labels['kubernetes.io/role']} if labels.get('kubernetes.io/role') else set()))
+    addresses = {}
+    for address in status.get('addresses') or []:
+        addresses.setdefault(address.get('type'), address.get('address'))
+
+    return [meta.get('name', ''), state, ','.join(roles) or '<none>',
+            _age(meta.get('creationTimestamp')), info.get('kubeletVersion', ''),
+            _or_none(addresses.get('InternalIP')), _or_none(addresses.get('ExternalIP')),
+            _or_none(info.get('osImage')), _or_none(info.get('kernelVersion')),
+            _or_none(info.get('containerRuntimeVersion'))]
+
+
+def _pod_state(pod: dict, status: dict) -> str:
+    """The STATUS column, following kubectl's printPod precedence."""
+    reason = status.get('reason') or status.get('phase') or 'Unknown'
+    specs  = (pod.get('spec') or {}).get('initContainers') or []
+    for i, cs in enumerate(status.get('initContainerStatuses') or []):
+        state = cs.get('state') or {}
+        term  = state.get('terminated')
+        if term and term.get('exitCode') == 0:
+            continue
+        if term:
+            reason = 'Init:' + (term.get('reason') or
+                                (f"Signal:{term['signal']}" if term.get('signal')
+                                 else f"ExitCode:{term.get('exitCode')}"))
+        elif (state.get('waiting') or {}).get('reason') not in (None, '', 'PodInitializing'):
+            reason = 'Init:' + state['waiting']['reason']
+        else:
+            reason = f'Init:{i}/{len(specs)}'
+        return reason
+
+    running = False
+    for cs in reversed(status.get('containerStatuses') or []):
+        state = cs.get('state') or {}
+        term  = state.get('terminated')
+        if (state.get('waiting') or {}).get('reason'):
+            reason = state['waiting']['reason']
+        elif term and term.get('reason'):
+            reason = term['reason']
+        elif term:
+            reason = (f"Signal:{term['signal']}" if term.get('signal')
+                      else f"ExitCode:{term.get('exitCode')}")
+        elif state.get('running') and cs.get('ready'):
+            running = True
+    if reason == 'Completed' and running:
+        reason = 'Running'
+    if (pod.get('metadata') or {}).get('deletionTimestamp'):
+        reason = 'Unknown' if status.get('reason') == 'NodeLost' else 'Terminating'
+    return reason
+
+
+def _readiness_gates(spec: dict, status: dict) -> str:
+    gates = [g.get('conditionType') for g in spec.get('readinessGates') or []]
+    if not gates:
+        return '<none>'
+    met = {c.get('type') for c in status.get('conditions') or [] if c.get('status') == 'True'}
+    return f'{sum(1 for g in gates if g in met)}/{len(gates)}'
+
+
+def _pod_row(pod: dict) -> list:
+    meta     = pod.get('metadata') or {}
+    spec     = pod.get('spec') or {}
+    status   = pod.get('status') or {}
+    statuses = status.get('containerStatuses') or []
+
+    restarts     = sum(cs.get('restartCount', 0) for cs in statuses)
+    last_restart = max((((cs.get('lastState') or {}).get('terminated') or {}).get('finishedAt', '')
+                        for cs in statuses), default='')
+    restarts = f'{restarts} ({_age(last_restart)} ago)' if restarts and last_restart else str(restarts)
+    ready    = sum(1 for cs in statuses if cs.get('ready'))
+
+    return [meta.get('namespace', ''), meta.get('name', ''),
+            f"{ready}/{len(spec.get('containers') or [])}", _pod_state(pod, status), restarts,
+            _age(meta.get('creationTimestamp')), _or_none(status.get('podIP')),
+            _or_none(spec.get('nodeName')), _or_none(status.get('nominatedNodeName')),
+            _readiness_gates(spec, status)]
+
+
+def _service_row(service: dict) -> list:
+    meta = service.get('metadata') or {}
+    spec = service.get('spec') or {}
+    kind = spec.get('type', 'ClusterIP')
+
+    external = list(spec.get('externalIPs') or [])
+    if kind == 'LoadBalancer':
+        ingress   = ((service.get('status') or {}).get('loadBalancer') or {}).get('ingress') or []
+        external += [i.get('ip') or i.get('hostname') for i in ingress]
+        external  = external or ['<pending>']
+    elif kind == 'ExternalName':
+        external = [spec.get('externalName', '')]
+    ports = [f"{p.get('port')}:{p['nodePort']}/{p.get('protocol', 'TCP')}" if p.get('nodePort')
+             else f"{p.get('port')}/{p.get('protocol', 'TCP')}" for p in spec.get('ports') or []]
+
+    return [meta.get('namespace', ''), meta.get('name', ''), kind,
+            _or_none(spec.get('clusterIP')), ','.join(external) or '<none>',
+            ','.join(ports) or '<none>', _age(meta.get('creationTimestamp'))]
+
+
+# resource -> (headers, row projection)
+_PROJECTIONS = {
+    'nodes':    (['NAME', 'STATUS', 'ROLES', 'AGE', 'VERSION', 'INTERNAL-IP', 'EXTERNAL-IP',
+                  'OS-IMAGE', 'KERNEL-VERSION', 'CONTAINER-RUNTIME'], _node_row),
+    'pods':     (['NAMESPACE', 'NAME', 'READY', 'STATUS', 'RESTARTS', 'AGE', 'IP', 'NODE',
+                  'NOMINATED NODE', 'READINESS GATES'], _pod_row),
+    'services': (['NAMESPACE', 'NAME', 'TYPE', 'CLUSTER-IP', 'EXTERNAL-IP', 'PORT(S)', 'AGE'],
+                 _service_row),
+}
@@ -4,6 +4,9 @@ from inventory import inventory_bp
 from installer import installer_bp
 from uninstaller import uninstaller_bp
 from kubectl import kubectl_bp
+from jobs import jobs_bp
+from watch import watch_bp
+from metrics import metrics_bp
 
 app = Flask(__name__)
 
@@ -11,6 +14,9 @@ app.register_blueprint(inventory_bp)
 app.register_blueprint(installer_bp)
 app.register_blueprint(uninstaller_bp)
 app.register_blueprint(kubectl_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(watch_bp)
+app.register_blueprint(metrics_bp)
 
 
 @app.route('/')
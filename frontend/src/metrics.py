@@ -0,0 +1,203 @@
+import time
+from array import array
+from threading import Lock, Thread
+
+from flask import Blueprint, jsonify, request
+
+from config import METRICS_IDLE_STOP, METRICS_INTERVAL, METRICS_PODS, METRICS_TIERS
+from kubeapi import _KubeAPIError, _KubeAPIUnavailable, _client_for, _parse_quantity
+from kubectl import _get_session
+
+metrics_bp = Blueprint('metrics', __name__)
+
+_TIER_NAMES = [name for name, _, _ in METRICS_TIERS]
+
+_samplers      = {}   # cluster identity -> _Sampler
+_samplers_lock = Lock()
+
+
+class _Ring:
+    """Fixed number of (timestamp, value) slots in two preallocated arrays;
+    the oldest sample is overwritten once the ring is full."""
+
+    def __init__(self, slots: int):
+        self._ts     = array('d', bytes(8 * slots))
+        self._values = array('d', bytes(8 * slots))
+        self._slots  = slots
+        self._head   = 0   # next slot to write
+        self._count  = 0
+
+    def append(self, ts: float, value: float):
+        self._ts[self._head]     = ts
+        self._values[self._head] = value
+        self._head  = (self._head + 1) % self._slots
+        self._count = min(self._count + 1, self._slots)
+
+    def since(self, ts: float) -> list:
+        """[[timestamp, value], ...] newer than *ts*, oldest first."""
+        start = (self._head - self._count) % self._slots
+        out   = []
+        for i in range(self._count):
+            slot = (start + i) % self._slots
+            if self._ts[slot] > ts:
+                out.append([self._ts[slot], self._values[slot]])
+        return out
+
+    def last(self) -> float:
+        return self._ts[(self._head - 1) % self._slots] if self._count else 0.0
+
+
+class _Series:
+    """One metric kept at every METRICS_TIERS resolution.
+
+    Each tier averages the samples that fall into a step-sized bucket and
+    appends the average to its ring when the next bucket starts; the still
+    open bucket is reported as the newest point.
+    """
+
+    def __init__(self):
+        self._tiers = {name: (step, _Ring(slots), [0.0, 0.0, 0])   # open bucket: start, sum, n
+                       for name, step, slots in METRICS_TIERS}
+        self.updated = 0.0
+
+    def add(self, ts: float, value: float):
+        self.updated = ts
+        for step, ring, bucket in self._tiers.values():
+            start = ts - ts % step
+            if bucket[2] and start != bucket[0]:
+                ring.append(bucket[0], bucket[1] / bucket[2])
+                bucket[1] = bucket[2] = 0
+            bucket[0]  = start
+            bucket[1] += value
+            bucket[2] += 1
+
+    def query(self, tier: str, since: float) -> list:
+        _, ring, bucket = self._tiers[tier]
+        points = ring.since(since)
+        if bucket[2] and bucket[0] > since and bucket[0] > ring.last():
+            points.append([bucket[0], bucket[1] / bucket[2]])
+        return points
+
+
+class _Sampler:
+    """Polls metrics-server for one cluster every METRICS_INTERVAL seconds
+    and keeps node (optionally pod) CPU and memory history in memory.
+
+    Any number of dashboards read from the same series, so viewers cost no
+    API calls. Sampling stops after METRICS_IDLE_STOP seconds without a
+    query. Polls go through the shared `_client_for` client, so closing the
+    session that started the sampler does not affect it.
+    """
+
+    def __init__(self, key: str, kubeconfig: str):
+        self.key         = key
+        self.available   = None   # None until the first poll; False without metrics-server
+        self.error       = ''
+        self._kubeconfig = kubeconfig
+        self._series     = {'nodes': {}, 'pods': {}}   # kind -> name -> {'cpu', 'memory'}
+        self._lock       = Lock()
+        self._queried_at = time.monotonic()
+
+    def touch(self):
+        self._queried_at = time.monotonic()
+
+    def _record(self, kind: str, name: str, usages: list, ts: float):
+        series = self._series[kind].setdefault(name, {'cpu': _Series(), 'memory': _Series()})
+        series['cpu'].add(ts, sum(_parse_quantity(u.get('cpu', '0')) for u in usages))
+        series['memory'].add(ts, sum(_parse_quantity(u.get('memory', '0')) for u in usages))
+
+    def _sample(self):
+        ts     = time.time()
+        client = _client_for(self._kubeconfig)
+        nodes  = client.get_json('/apis/metrics.k8s.io/v1beta1/nodes', timeout=15)
+        pods   = (client.get_json('/apis/metrics.k8s.io/v1beta1/pods', timeout=15)
+                  if METRICS_PODS else {'items': []})
+        with self._lock:
+            for item in nodes.get('items', []):
+                self._record('nodes', item['metadata']['name'], [item.get('usage', {})], ts)
+            for item in pods.get('items', []):
+                meta = item['metadata']
+                self._record('pods', f"{meta.get('namespace', '')}/{meta['name']}",
+                             [c.get('usage', {}) for c in item.get('containers', [])], ts)
+            # Forget nodes/pods that no tier would show any more.
+            horizon = ts - max(step * slots for _, step, slots in METRICS_TIERS)
+            for by_name in self._series.values():
+                for name in [n for n, s in by_name.items() if s['cpu'].updated < horizon]:
+                    del by_name[name]
+
+    def run(self):
+        while True:
+            if time.monotonic() - self._queried_at > METRICS_IDLE_STOP:
+                with _samplers_lock:
+                    if _samplers.get(self.key) is self:
+                        del _samplers[self.key]
+                return
+            try:
+                self._sample()
+                self.available, self.error = True, ''
+            except _KubeAPIError as exc:
+                self.available, self.error = False, str(exc)
+            except Exception as exc:
+                self.error = str(exc)
+            time.sleep(METRICS_INTERVAL)
+
+    def query(self, kind: str, tier: str, since: float, names: list = None) -> dict:
+        with self._lock:
+            return {name: {metric: s.query(tier, since) for metric, s in series.items()}
+                    for name, series in self._series[kind].items()
+                    if not names or name in names}
+
+
+def _sampler_for(sess) -> _Sampler:
+    """The session's cluster sampler, started on first use."""
+    with _samplers_lock:
+        sampler = _samplers.get(sess.identity)
+        if sampler is None:
+            sess.client()   # raises _KubeAPIUnavailable for an unusable kubeconfig
+            sampler = _samplers[sess.identity] = _Sampler(sess.identity, sess.kubeconfig)
+            Thread(target=sampler.run, daemon=True).start()
+        sampler.touch()
+    return sampler
+
+
+# ── Routes ────────────────────────────────────────────────────────────────
+
+@metrics_bp.route('/kube-metrics', methods=['GET'])
+def kube_metrics():
+    """CPU (cores) and memory (bytes) history for a kubeconfig session.
+
+    Query: session, tier (10s / 1m / 10m), since (unix time, exclusive),
+    kind (nodes / pods), names (comma-separated filter). Served from the
+    cluster's in-memory sampler; the first call starts it.
+    """
+    sess = _get_session(request.args.get('session', ''))
+    if sess is None:
+        return jsonify({'status': 'error', 'message': 'Unknown or expired session.'}), 404
+    tier = request.args.get('tier', _TIER_NAMES[0])
+    kind = request.args.get('kind', 'nodes')
+    if tier not in _TIER_NAMES:
+        return jsonify({'status': 'error',
+                        'message': f"tier must be one of: {', '.join(_TIER_NAMES)}"}), 400
+    if kind not in ('nodes', 'pods') or (kind == 'pods' and not METRICS_PODS):
+        return jsonify({'status': 'error', 'message': f'Cannot sample: {kind}'}), 400
+    try:
+        since = float(request.args.get('since') or 0)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since must be a unix timestamp.'}), 400
+    names = [n for n in request.args.get('names', '').split(',') if n]
+
+    try:
+        sampler = _sampler_for(sess)
+    except _KubeAPIUnavailable as exc:
+        return jsonify({'status': 'error',
+                        'message': f'Metrics history needs direct API access: {exc}'}), 400
+    step = next(step for name, step, _ in METRICS_TIERS if name == tier)
+    return jsonify({
+        'status':            'success',
+        'tier':              tier,
+        'step':              step,
+        'interval':          METRICS_INTERVAL,
+        'metrics_available': sampler.available,
+        'message':           sampler.error,
+        kind:                sampler.query(kind, tier, since, names),
+    })
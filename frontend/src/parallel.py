@@ -0,0 +1,54 @@
+import queue
+import threading
+
+_WORKER_DONE = object()
+
+
+def _gen_parallel(gens: list, parallelism: int, abort):
+    """Drive several SSE sub-generators concurrently and yield their events
+    as soon as any of them produces one.
+
+    At most *parallelism* sub-generators run at the same time. Sub-generators
+    that have not started yet are skipped once *abort* is set. Returns the
+    list of sub-generator return codes in the same order as *gens* (-1 for
+    any that were skipped or raised).
+    """
+    results = [-1] * len(gens)
+    if not gens:
+        return results
+
+    pending = queue.Queue()
+    for item in enumerate(gens):
+        pending.put(item)
+    events = queue.Queue()
+
+    def _worker():
+        try:
+            while not abort.is_set():
+                try:
+                    idx, gen = pending.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    while True:
+                        events.put(next(gen))
+                except StopIteration as stop:
+                    results[idx] = stop.value if stop.value is not None else -1
+                except Exception:
+                    results[idx] = -1
+        finally:
+            events.put(_WORKER_DONE)
+
+    n_workers = max(1, min(parallelism, len(gens)))
+    for _ in range(n_workers):
+        threading.Thread(target=_worker, daemon=True).start()
+
+    running = n_workers
+    while running:
+        event = events.get()
+        if event is _WORKER_DONE:
+            running -= 1
+            continue
+        yield event
+
+    return results
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import shlex
+import time
+from threading import Lock
+
+from artifacts import _ARCHES
+from config import (PREFLIGHT_FACTS_TTL, PREFLIGHT_MIN_DISK_MB, PREFLIGHT_MIN_MEMORY_MB,
+                    PREFLIGHT_TIMEOUT)
+from parallel import _gen_parallel
+from readiness import K3S_API_PORT
+from ssh import _SSHPool, _ssh_run_live
+
+# One round trip per node: every fact is printed as key=value.
+_FACTS_SCRIPT = r'''
+. /etc/os-release 2>/dev/null
+echo "os=${PRETTY_NAME:-$(uname -s)}"
+echo "arch=$(uname -m)"
+echo "kernel=$(uname -r)"
+echo "cpus=$(nproc 2>/dev/null || getconf _NPROCESSORS_ONLN)"
+echo "mem_kb=$(awk '/^MemTotal:/ {print $2}' /proc/meminfo)"
+d=/var/lib; [ -d /var/lib/rancher ] && d=/var/lib/rancher
+echo "disk_free_kb=$(df -Pk $d | awk 'NR==2 {print $4}')"
+echo "k3s=$(k3s --version 2>/dev/null | awk 'NR==1 {print $3}')"
+for s in k3s k3s-agent; do systemctl is-active --quiet $s 2>/dev/null && echo "k3s_active=$s"; done
+c=/etc/rancher/k3s/config.yaml
+echo "config_sha256=$( (sudo -n sha256sum $c 2>/dev/null || sha256sum $c 2>/dev/null) | awk '{print $1}')"
+echo "docker=$(docker --version 2>/dev/null | awk '{print $3}' | tr -d ,)"
+echo "curl=$(command -v curl)"
+echo "python3=$(command -v python3)"
+echo "sudo=$(sudo -n true 2>/dev/null && echo yes)"
+echo "ports=$( (ss -Hltn 2>/dev/null || netstat -ltn 2>/dev/null | tail -n +3) | awk '{print $4}' | sed 's/.*://' | sort -un | tr '\n' ' ')"
+'''
+
+_INT_FACTS = ('cpus', 'mem_kb', 'disk_free_kb')
+
+# Ports K3s binds, by node role (etcd peers only on servers of an HA cluster).
+_ROLE_PORTS = {'server': (K3S_API_PORT, 10250), 'agent': (10250,), 'etcd': (2379, 2380)}
+
+_facts      = {}   # (ip, username) -> (expires at, facts)
+_facts_lock = Lock()
+
+
+def _parse_facts(lines: list) -> dict:
+    facts = {}
+    for line in lines:
+        key, sep, value = line.strip().partition('=')
+        if sep:
+            facts[key] = value.strip()
+    for key in _INT_FACTS:
+        try:
+            facts[key] = int(facts.get(key) or 0)
+        except ValueError:
+            facts[key] = 0
+    facts['ports'] = sorted(int(p) for p in facts.get('ports', '').split() if p.isdigit())
+    facts['sudo']  = facts.get('sudo') == 'yes'
+    return facts
+
+
+def _gather_facts(client, abort, timeout: int = 30) -> dict:
+    lines, rc = [], None
+    for line, code in _ssh_run_live(client, f'sh -c {shlex.quote(_FACTS_SCRIPT)}',
+                                    timeout=timeout, abort=abort):
+        if code is None:
+            lines.append(line)
+        else:
+            rc = code
+    if rc != 0:
+        raise RuntimeError(f'fact gathering failed (rc={rc})')
+    return _parse_facts(lines)
+
+
+def _cached_facts(ip: str, username: str):
+    with _facts_lock:
+        entry = _facts.get((ip, username))
+    return entry[1] if entry and entry[0] > time.monotonic() else None
+
+
+def _forget_facts(ips):
+    """Drop cached facts of nodes a deploy or uninstall has changed."""
+    ips = set(ips)
+    with _facts_lock:
+        for key in [k for k in _facts if k[0] in ips]:
+            del _facts[key]
+
+
+def _node_facts(ip: str, username: str, key_path: str, pool: _SSHPool, abort,
+                fresh: bool = False) -> dict:
+    """Facts of one node, from the cache unless *fresh* or expired.
+
+    'gathered_at' (time.monotonic()) tells how old they are.
+    """
+    facts = None if fresh else _cached_facts(ip, username)
+    if facts is not None:
+        return facts
+    client = pool.acquire(ip, username, key_path, connect_timeout=PREFLIGHT_TIMEOUT)
+    try:
+        facts = _gather_facts(client, abort, timeout=PREFLIGHT_TIMEOUT)
+        facts['gathered_at'] = time.monotonic()
+    finally:
+        pool.release(client)
+    with _facts_lock:
+        _facts[(ip, username)] = (time.monotonic() + PREFLIGHT_FACTS_TTL, facts)
+    return facts
+
+
+def _problems(facts: dict, role: str, ha: bool, tools: tuple = ('curl',)) -> list:
+    """Why K3s cannot be installed on a node with *facts* as *role*
+    ('server' or 'agent'); empty when it can. *tools* are the commands the
+    install will run on the node."""
+    problems = []
+    if facts.get('arch') not in _ARCHES:
+        problems.append(f"unsupported architecture {facts.get('arch') or '?'}")
+    for tool in tools:
+        if not facts.get(tool):
+            problems.append(f'{tool} is not installed')
+    if not facts.get('sudo'):
+        problems.append('passwordless sudo is not available')
+    if facts['mem_kb'] and facts['mem_kb'] < PREFLIGHT_MIN_MEMORY_MB * 1024:
+        problems.append(f"only {facts['mem_kb'] // 1024} MiB of memory "
+                        f'(needs {PREFLIGHT_MIN_MEMORY_MB} MiB)')
+    if facts['disk_free_kb'] < PREFLIGHT_MIN_DISK_MB * 1024:
+        problems.append(f"only {facts['disk_free_kb'] // 1024} MiB free under /var/lib "
+                        f'(needs {PREFLIGHT_MIN_DISK_MB} MiB)')
+    if not facts.get('k3s_active'):
+        wanted = _ROLE_PORTS[role] + (_ROLE_PORTS['etcd'] if role == 'server' and ha else ())
+        busy   = [str(port) for port in wanted if port in facts['ports']]
+        if busy:
+            problems.append(f"port{'s' if len(busy) > 1 else ''} {', '.join(busy)} already in use")
+    return problems
+
+
+def _config_digest(content: str) -> str:
+    """sha256 of a rendered config.yaml, as `sha256sum` prints it on the node."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _converged(facts: dict, config_content: str, service: str, version: str = '') -> bool:
+    """True when the node already runs *service* ('k3s' or 'k3s-agent') with
+    exactly *config_content* (and *version*, when pinned): installing it
+    again would change nothing."""
+    return (facts.get('k3s_active') == service
+            and facts.get('config_sha256') == _config_digest(config_content)
+            and (not version or facts.get('k3s') == version))
+
+
+def _summary(facts: dict) -> str:
+    parts = [facts.get('os') or '?', facts.get('arch') or '?',
+             f"{facts['cpus']} CPU", f"{facts['mem_kb'] // 1024} MiB",
+             f"{facts['disk_free_kb'] // 1024} MiB free"]
+    if facts.get('k3s'):
+        parts.append(f"k3s {facts['k3s']}")
+    if facts.get('docker'):
+        parts.append(f"docker {facts['docker']}")
+    return ', '.join(parts)
+
+
+# ── Sub-generators ────────────────────────────────────────────────────────
+
+def _gen_preflight_node(node: dict, role: str, ha: bool, username: str, key_path: str,
+                        pool: _SSHPool, abort, results: dict, fresh: bool = False,
+                        tools: tuple = ('curl',)):
+    """Sub-generator: gather (or reuse, unless *fresh*) one node's facts and
+    check them.
+
+    Stores the facts in *results* under the node name.
+    """
+    def _sse(d): return f"data: {json.dumps(d)}\n\n"
+    name = node['name']
+    yield _sse({'type': 'node_start', 'step': 'preflight', 'node': name})
+    try:
+        facts = _node_facts(node['ip'], username, key_path, pool, abort, fresh)
+    except Exception as exc:
+        yield _sse({'type': 'log', 'step': 'preflight', 'node': name,
+                    'msg': f'Could not gather facts: {exc}'})
+        yield _sse({'type': 'node_failed', 'step': 'preflight', 'node': name})
+        return -1
+    results[name] = facts
+    yield _sse({'type': 'log', 'step': 'preflight', 'node': name, 'msg': _summary(facts)})
+
+    problems = _problems(facts, role, ha, tools)
+    for problem in problems:
+        yield _sse({'type': 'log', 'step': 'preflight', 'node': name, 'msg': problem})
+    if problems:
+        yield _sse({'type': 'node_failed', 'step': 'preflight', 'node': name})
+        return 1
+    yield _sse({'type': 'node_done', 'step': 'preflight', 'node': name})
+    return 0
+
+
+def _gen_preflight(servers: list, agents: list, username: str, key_path: str,
+                   pool: _SSHPool, abort, parallelism: int, results: dict,
+                   fresh: bool = False, tools: tuple = ('curl',)):
+    """Sub-generator: check every node in parallel before anything is
+    installed. Returns 0 when all nodes pass; *results* receives the facts.
+    With *fresh*, cached facts are not reused; *tools* are the commands the
+    install needs on every node.
+    """
+    ha   = len(servers) > 1
+    gens = ([_gen_preflight_node(n, 'server', ha, username, key_path, pool, abort, results,
+                                 fresh, tools) for n in servers] +
+            [_gen_preflight_node(n, 'agent', ha, username, key_path, pool, abort, results,
+                                 fresh, tools) for n in agents])
+    rcs = yield from _gen_parallel(gens, parallelism, abort)
+    return 0 if all(rc == 0 for rc in rcs) else 1
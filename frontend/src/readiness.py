@@ -0,0 +1,114 @@
+import http.client
+import socket
+import ssl
+import time
+
+from config import READY_BACKOFF, READY_SSH_FALLBACK_INTERVAL, READY_TIMEOUT
+from ssh import _ssh_run_live
+
+K3S_API_PORT = 6443
+KUBELET_HEALTHZ_PORT = 10248
+
+# Client certs K3s leaves on every server node; lets the SSH fallback query
+# /readyz with curl instead of spawning kubectl.
+_ADMIN_CURL = ('sudo curl -sf --max-time 5 '
+               '--cacert /var/lib/rancher/k3s/server/tls/server-ca.crt '
+               '--cert /var/lib/rancher/k3s/server/tls/client-admin.crt '
+               '--key /var/lib/rancher/k3s/server/tls/client-admin.key '
+               f'-o /dev/null https://127.0.0.1:{K3S_API_PORT}/readyz')
+
+_KUBELET_CURL = f'curl -sf --max-time 5 -o /dev/null http://127.0.0.1:{KUBELET_HEALTHZ_PORT}/healthz'
+
+_tls_context = ssl.create_default_context()
+_tls_context.check_hostname = False
+_tls_context.verify_mode    = ssl.CERT_NONE
+
+
+# ── Probes ────────────────────────────────────────────────────────────────
+
+def _probe_readyz(ip: str, timeout: float = 2) -> str:
+    """One direct GET of https://<ip>:6443/readyz.
+
+    Returns 'ready', 'not_ready' (server up, checks failing), 'unauthorized'
+    (anonymous access disabled) or 'down' (no TLS/HTTP answer).
+    """
+    conn = http.client.HTTPSConnection(ip, K3S_API_PORT, timeout=timeout, context=_tls_context)
+    try:
+        conn.request('GET', '/readyz')
+        status = conn.getresponse().status
+    except (OSError, socket.timeout, http.client.HTTPException):
+        return 'down'
+    finally:
+        conn.close()
+    if status == 200:
+        return 'ready'
+    if status in (401, 403):
+        return 'unauthorized'
+    return 'not_ready'
+
+
+def _ssh_ok(client, cmd: str, abort) -> bool:
+    rc = None
+    for _, code in _ssh_run_live(client, cmd, timeout=10, abort=abort):
+        if code is not None:
+            rc = code
+    return rc == 0
+
+
+# ── Wait loops ────────────────────────────────────────────────────────────
+
+def _poll(check, abort, timeout: float, schedule=READY_BACKOFF) -> dict:
+    """Call *check* on the *schedule* backoff (last delay repeats) until it
+    returns a truthy channel name, *timeout* runs out or *abort* is set.
+
+    Returns {'ready', 'seconds', 'probes', 'via'}.
+    """
+    started  = time.monotonic()
+    deadline = started + timeout
+    probes   = 0
+    while True:
+        probes += 1
+        via = check()
+        now = time.monotonic()
+        if via:
+            return {'ready': True, 'seconds': round(now - started, 2), 'probes': probes,
+                    'via': via}
+        remaining = deadline - now
+        delay     = schedule[min(probes - 1, len(schedule) - 1)]
+        if remaining <= 0 or abort.wait(min(delay, remaining)):
+            return {'ready': False, 'seconds': round(time.monotonic() - started, 2),
+                    'probes': probes, 'via': None}
+
+
+def _wait_apiserver(ip: str, client, abort, timeout: float = READY_TIMEOUT) -> dict:
+    """Wait for the API server on *ip* to report ready.
+
+    Probes /readyz directly over HTTPS. When that gets no answer, or the
+    server refuses anonymous access, the same endpoint is checked on the
+    node over the pooled SSH *client* (at most every few seconds while the
+    direct path might still come up).
+    """
+    state = {'ssh_only': False, 'last_ssh': float('-inf')}
+
+    def _check():
+        if not state['ssh_only']:
+            result = _probe_readyz(ip)
+            if result == 'ready':
+                return 'https'
+            if result == 'not_ready':
+                return None
+            state['ssh_only'] = result == 'unauthorized'
+        now = time.monotonic()
+        if client is None or (not state['ssh_only']
+                              and now - state['last_ssh'] < READY_SSH_FALLBACK_INTERVAL):
+            return None
+        state['last_ssh'] = now
+        return 'ssh' if _ssh_ok(client, _ADMIN_CURL, abort) else None
+
+    return _poll(_check, abort, timeout)
+
+
+def _wait_kubelet(client, abort, timeout: float = READY_TIMEOUT) -> dict:
+    """Wait for the kubelet on the node behind *client* to pass /healthz."""
+    return _poll(lambda: 'ssh' if _ssh_ok(client, _KUBELET_CURL, abort) else None,
+                 abort, timeout)
@@ -6,6 +6,7 @@ function _goHome() {
   document.getElementById('uninstallContainer').style.display  = 'none';
   document.getElementById('welcomeScreen').style.display       = '';
   _clusterData = { nodes: null, pods: null, services: null, nodeResources: null };
+  _closeKubeSession();
   document.getElementById('btnHomeFixed').style.display = 'none';
 }
 
@@ -120,6 +121,7 @@ function initWelcomeScreen() {
       document.getElementById('clusterDashboard').style.display = 'none';
       document.getElementById('kubeconfigView').style.display   = '';
       _clusterData = { nodes: null, pods: null, services: null, nodeResources: null };
+      _closeKubeSession();
     });
   }
 
@@ -173,17 +175,13 @@ async function enterClusterDashboard() {
     const nrcEl = document.getElementById('nodeResourcesContainer');
     if (nrcEl) nrcEl.innerHTML = '<div class="nrc-loading"><span class="cluster-spinner"></span>Loading resource metrics…</div>';
 
-    const [nodesRes, podsRes, svcRes, resourcesRes] = await Promise.all([
-      fetchKubectl('/kubectl-nodes',          kubeconfig),
-      fetchKubectl('/kubectl-pods',           kubeconfig),
-      fetchKubectl('/kubectl-services',       kubeconfig),
-      fetchKubectl('/kubectl-node-resources', kubeconfig),
-    ]);
+    const snapshot = await fetchSnapshot(kubeconfig);
 
-    handleNodesData(nodesRes);
-    handlePodsData(podsRes);
-    handleServicesData(svcRes);
-    handleNodeResourcesData(resourcesRes);
+    handleNodesData(snapshot.nodes);
+    handlePodsData(snapshot.pods);
+    handleServicesData(snapshot.services);
+    handleNodeResourcesData(snapshot.node_resources);
+    _startKubeWatch();
 
   } catch(e) {
     showToast('Network error while loading cluster info.');
@@ -195,13 +193,125 @@ async function enterClusterDashboard() {
   }
 }
 
-async function fetchKubectl(endpoint, kubeconfig) {
-  const res = await fetch(endpoint, {
+// ── Kubeconfig session ───────────────────────────────────────────────
+// The kubeconfig is uploaded once; later calls only send the session handle.
+async function _openKubeSession(kubeconfig) {
+  const res  = await fetch('/kube-sessions', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ kubeconfig }),
   });
-  return res.json();
+  const json = await res.json();
+  _kubeSession = json.status === 'success' ? { id: json.session, kubeconfig } : null;
+  return _kubeSession;
+}
+
+function _closeKubeSession() {
+  _stopKubeWatch();
+  _stopNodeHistory();
+  if (!_kubeSession) return;
+  fetch(`/kube-sessions/${encodeURIComponent(_kubeSession.id)}`, { method: 'DELETE' }).catch(() => {});
+  _kubeSession   = null;
+  _kubeResponses = {};
+}
+
+async function _postWithSession(endpoint, kubeconfig, extra = {}, etag = null) {
+  const headers = { 'Content-Type': 'application/json' };
+  if (etag) headers['If-None-Match'] = etag;
+  const post = payload => fetch(endpoint, {
+    method: 'POST',
+    headers,
+    body: JSON.stringify({ ...payload, ...extra }),
+  });
+  if (!_kubeSession || _kubeSession.kubeconfig !== kubeconfig) await _openKubeSession(kubeconfig);
+  if (!_kubeSession) return post({ kubeconfig });
+
+  let res = await post({ session: _kubeSession.id });
+  if (res.status === 404 && await _openKubeSession(kubeconfig)) {
+    res = await post({ session: _kubeSession.id });   // session expired server-side
+  }
+  return res;
+}
+
+// ── Live updates ─────────────────────────────────────────────────────
+// /kube-watch sends a 'reset' per resource, then row deltas keyed by
+// namespace/name; tables are re-rendered at most every 250 ms.
+const _LIVE_HANDLERS = {
+  nodes:    json => handleNodesData(json),
+  pods:     json => handlePodsData(json),
+  services: json => handleServicesData(json),
+};
+
+function _startKubeWatch() {
+  _stopKubeWatch();
+  if (!_kubeSession) return;
+  const live    = {};   // resource -> { headers, rows: Map(key -> row) }
+  const pending = {};   // resource -> render timer
+  const es = new EventSource(
+    `/kube-watch?session=${encodeURIComponent(_kubeSession.id)}&resources=nodes,pods,services`);
+
+  const render = resource => {
+    if (pending[resource]) return;
+    pending[resource] = setTimeout(() => {
+      delete pending[resource];
+      const table = live[resource];
+      const rows  = [...table.rows.values()];
+      _LIVE_HANDLERS[resource]({ status: 'success', headers: rows.length ? table.headers : [], rows });
+    }, 250);
+  };
+
+  es.onmessage = e => {
+    const ev = JSON.parse(e.data);
+    if (!_LIVE_HANDLERS[ev.resource] || ev.type === 'error') return;
+    if (ev.type === 'reset') {
+      live[ev.resource] = { headers: ev.headers, rows: new Map(ev.keys.map((k, i) => [k, ev.rows[i]])) };
+    } else {
+      const table = live[ev.resource];
+      if (!table) return;
+      if (ev.type === 'DELETED') table.rows.delete(ev.key);
+      else table.rows.set(ev.key, ev.row);
+    }
+    render(ev.resource);
+  };
+  es.onerror = () => {
+    // CONNECTING: the browser retries by itself. CLOSED: the session is
+    // gone (e.g. expired); try again once a later request has renewed it.
+    if (es.readyState !== EventSource.CLOSED || _kubeWatch !== es) return;
+    _kubeWatch = null;
+    setTimeout(() => { if (_kubeSession && !_kubeWatch) _startKubeWatch(); }, 5000);
+  };
+  _kubeWatch = es;
+}
+
+function _stopKubeWatch() {
+  if (_kubeWatch) { _kubeWatch.close(); _kubeWatch = null; }
+}
+
+// POST with If-None-Match: a 304 reuses the body we already hold.
+async function _fetchRevalidated(endpoint, kubeconfig, extra = {}) {
+  const key    = endpoint + JSON.stringify(extra);
+  const cached = _kubeResponses[key];
+  const res    = await _postWithSession(endpoint, kubeconfig, extra, cached?.etag);
+  if (res.status === 304 && cached) return cached.json;
+  const json = await res.json();
+  const etag = res.headers.get('ETag');
+  if (res.ok && etag) _kubeResponses[key] = { etag, json };
+  return json;
+}
+
+async function fetchKubectl(endpoint, kubeconfig) {
+  return _fetchRevalidated(endpoint, kubeconfig);
+}
+
+// One round trip for several dashboard sections; a section that failed on
+// the server comes back as its own { status: 'error' } object.
+async function fetchSnapshot(kubeconfig, sections) {
+  const json = await _fetchRevalidated('/cluster-snapshot', kubeconfig, { sections });
+  if (json.status === 'error') {
+    const failed = { status: 'error', message: json.message };
+    return { nodes: failed, pods: failed, services: failed, node_resources: failed };
+  }
+  return json;
 }
 
 async function refreshCurrentSection() {
@@ -219,12 +329,9 @@ async function refreshCurrentSection() {
     if (section === 'overview') {
       const nrcEl = document.getElementById('nodeResourcesContainer');
       if (nrcEl) nrcEl.innerHTML = '<div class="nrc-loading"><span class="cluster-spinner"></span>Loading resource metrics…</div>';
-      const [json, resourcesJson] = await Promise.all([
-        fetchKubectl('/kubectl-nodes',          kubeconfig),
-        fetchKubectl('/kubectl-node-resources', kubeconfig),
-      ]);
-      handleNodesData(json);
-      handleNodeResourcesData(resourcesJson);
+      const snapshot = await fetchSnapshot(kubeconfig, ['nodes', 'node_resources']);
+      handleNodesData(snapshot.nodes);
+      handleNodeResourcesData(snapshot.node_resources);
     } else {
       const endpointMap = { workloads: '/kubectl-pods', services: '/kubectl-services' };
       const json = await fetchKubectl(endpointMap[section], kubeconfig);
@@ -309,7 +416,7 @@ function renderNodeResourceCards(resourcesData) {
     const card     = document.createElement('div');
     card.className = 'node-resource-card';
 
-    const podsUsed = podCountPerNode[node.name] || 0;
+    const podsUsed = node.pods_scheduled ?? (podCountPerNode[node.name] || 0);
     const podsMax  = node.pods_allocatable || 110;
     const podsPct  = Math.min(100, Math.round((podsUsed / podsMax) * 100));
 
@@ -324,14 +431,59 @@ function renderNodeResourceCards(resourcesData) {
       memHtml = `<div class="nrc-metric"><div class="nrc-metric-label"><span>Memory</span><span class="nrc-metric-value nrc-dim">Allocatable: ${escapeHtml(_formatMemory(node.memory_allocatable))}</span></div><div class="nrc-no-metrics">metrics-server unavailable</div></div>`;
     }
 
+    if (resourcesData.requests_available) {
+      cpuHtml += _requestsHtml(_formatCpu(node.cpu_requests), node.cpu_requests_percent, _formatCpu(node.cpu_limits));
+      memHtml += _requestsHtml(_formatMemory(node.memory_requests), node.memory_requests_percent, _formatMemory(node.memory_limits));
+    }
+
     const podsHtml = `<div class="nrc-metric"><div class="nrc-metric-label"><span>Pods</span><span class="nrc-metric-value">${podsUsed} / ${podsMax}</span></div><div class="nrc-bar-track"><div class="nrc-bar-fill ${_barClass(podsPct)}" style="width:${podsPct}%"></div></div><span class="nrc-pct">${podsPct}%</span></div>`;
 
-    card.innerHTML = `<div class="nrc-header"><span class="nrc-name">${escapeHtml(node.name)}</span><span class="nrc-role nrc-role-${escapeHtml(node.role)}">${escapeHtml(node.role.toUpperCase())}</span></div>${cpuHtml}${memHtml}${podsHtml}`;
+    card.dataset.node = node.name;
+    card.innerHTML = `<div class="nrc-header"><span class="nrc-name">${escapeHtml(node.name)}</span><span class="nrc-role nrc-role-${escapeHtml(node.role)}">${escapeHtml(node.role.toUpperCase())}</span></div>${cpuHtml}${memHtml}${podsHtml}<svg class="nrc-spark" viewBox="0 0 100 24" preserveAspectRatio="none"></svg>`;
     grid.appendChild(card);
   });
 
   container.innerHTML = '';
   container.appendChild(grid);
+  _startNodeHistory();
+}
+
+// ── Node CPU history (server-side sampler, /kube-metrics) ────────────
+function _startNodeHistory() {
+  _loadNodeHistory();
+  if (!_kubeHistoryTimer) _kubeHistoryTimer = setInterval(_loadNodeHistory, 30000);
+}
+
+function _stopNodeHistory() {
+  if (_kubeHistoryTimer) { clearInterval(_kubeHistoryTimer); _kubeHistoryTimer = null; }
+}
+
+async function _loadNodeHistory() {
+  if (!_kubeSession) return;
+  try {
+    const res  = await fetch(`/kube-metrics?session=${encodeURIComponent(_kubeSession.id)}&tier=10s`);
+    const json = await res.json();
+    if (json.status !== 'success') return;
+    Object.entries(json.nodes || {}).forEach(([name, series]) => {
+      const svg = document.querySelector(`.node-resource-card[data-node="${CSS.escape(name)}"] .nrc-spark`);
+      if (svg) svg.innerHTML = _sparkline(series.cpu);
+    });
+  } catch (e) {
+    console.error(e);
+  }
+}
+
+function _sparkline(points) {
+  if (!points || points.length < 2) return '';
+  const t0   = points[0][0];
+  const span = (points[points.length - 1][0] - t0) || 1;
+  const max  = Math.max(...points.map(p => p[1])) || 1;
+  const path = points.map(([t, v]) => `${((t - t0) / span * 100).toFixed(1)},${(23 - v / max * 22).toFixed(1)}`).join(' ');
+  return `<title>CPU, last ${Math.round(span / 60)} min (peak ${max.toFixed(2)} cores)</title><polyline points="${path}" />`;
+}
+
+function _requestsHtml(requested, pct, limits) {
+  return `<div class="nrc-requests"><span>Requests ${escapeHtml(requested)} (${escapeHtml(pct)}%)</span><span>Limits ${escapeHtml(limits)}</span></div>`;
 }
 
 function _barClass(pct) {
@@ -385,7 +537,7 @@ function renderPodsTable(headers, rows) {
   const filterVal = document.getElementById('nsFilter')?.value || '';
   const filteredRows = filterVal && nsIndex !== -1 ? rows.filter(r => r[nsIndex] === filterVal) : rows;
 
-  const PODS_HIDDEN = new Set(['NOMINATED', 'NODE', 'READINESS', 'GATES']);
+  const PODS_HIDDEN = new Set(['NOMINATED', 'NODE', 'READINESS', 'GATES', 'NOMINATED NODE', 'READINESS GATES']);
   let orderedHeaders = headers;
   let orderedRows    = filteredRows;
   if (nsIndex !== -1 && nameIndex !== -1 && nsIndex !== nameIndex) {
@@ -561,6 +713,8 @@ function startExistingUninstall() {
       }
     };
     es.onerror = () => {
+      // Still CONNECTING: the browser is resuming the job via Last-Event-ID.
+      if (es.readyState === EventSource.CONNECTING) return;
       es.close(); _eventSource = null;
       if (abortBtn) abortBtn.style.display = 'none';
       if (titleEl) titleEl.textContent = 'Connection lost';
@@ -634,31 +788,22 @@ async function testUninstallConnections() {
     resultsEl.appendChild(item);
   }
 
-  let allPassed = true;
-  for (const node of _uninstallNodes) {
-    const item    = document.getElementById(`uconn-${node.name}`);
+  const show = (name, ok, message) => {
+    const item    = document.getElementById(`uconn-${name}`);
     const statusD = item?.querySelector('.connection-status');
     const msgEl   = item?.querySelector('.connection-message');
-    try {
-      const res  = await fetch('/test-ssh', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ name: node.name, ip: node.ip, username, ssh_key: sshKey }),
-      });
-      const json = await res.json();
-      if (res.ok && json.status === 'success') {
-        if (statusD) { statusD.className = 'connection-status success'; statusD.textContent = '✓'; }
-        if (msgEl)   msgEl.textContent = json.message || 'Connected';
-      } else {
-        allPassed = false;
-        if (statusD) { statusD.className = 'connection-status failure'; statusD.textContent = '✕'; }
-        if (msgEl)   msgEl.textContent = json.message || 'Connection failed';
-      }
-    } catch {
-      allPassed = false;
-      if (statusD) { statusD.className = 'connection-status failure'; statusD.textContent = '✕'; }
-      if (msgEl)   msgEl.textContent = 'Network error';
-    }
+    if (statusD) { statusD.className = `connection-status ${ok ? 'success' : 'failure'}`; statusD.textContent = ok ? '✓' : '✕'; }
+    if (msgEl)   msgEl.textContent = message;
+  };
+
+  let allPassed = true;
+  try {
+    const summary = await testAllConnections(username, sshKey, _uninstallNodes,
+      ev => show(ev.name, ev.status === 'success', ev.status === 'success' ? 'Connected' : ev.message));
+    allPassed = !!summary && summary.failed === 0;
+  } catch {
+    allPassed = false;
+    _uninstallNodes.forEach(node => show(node.name, false, 'Network error'));
   }
 
   _uninstallConnPass = allPassed;
@@ -794,6 +939,8 @@ function startWelcomeUninstall() {
     };
 
     es.onerror = () => {
+      // Still CONNECTING: the browser is resuming the job via Last-Event-ID.
+      if (es.readyState === EventSource.CONNECTING) return;
       es.close(); _eventSource = null;
       const title = document.getElementById('uninstallProgressTitle')?.textContent || '';
       if (!title.includes('✅') && !title.includes('❌') && !title.includes('⛔')) {
@@ -24,13 +24,29 @@ async function testConnections() {
     connectionList.appendChild(item);
   });
 
-  let allPassed = true;
-  for (const vm of vms) {
-    const passed = await testSingleConnection(vm.name, vm.ip, username, sshKey);
-    if (!passed) allPassed = false;
+  let allPassed = vms.length > 0;
+  try {
+    const summary = await testAllConnections(username, sshKey, vms, ev => {
+      const item = document.getElementById(`conn-${ev.name}`);
+      if (!item) return;
+      const statusEl  = item.querySelector('.connection-status');
+      const messageEl = item.querySelector('.connection-message');
+      const ok        = ev.status === 'success';
+      if (statusEl)  { statusEl.className = `connection-status ${ok ? 'success' : 'failure'}`; statusEl.textContent = ok ? '✓' : '✕'; }
+      if (messageEl) messageEl.textContent = ok ? `${ev.message} (${Math.round(ev.latency_ms)} ms)` : ev.message;
+      if (!ok) _addRetryButton(item, ev.name, ev.ip, username, sshKey);
+    });
+    if (!summary || summary.failed > 0) allPassed = false;
+  } catch(e) {
+    // Streaming unavailable: fall back to one request per host.
+    allPassed = vms.length > 0;
+    for (const vm of vms) {
+      const passed = await testSingleConnection(vm.name, vm.ip, username, sshKey);
+      if (!passed) allPassed = false;
+    }
   }
 
-  if (allPassed && vms.length > 0) {
+  if (allPassed) {
     allConnectionsPass = true;
     updateTabStates();
     const proceedBtn = document.getElementById('proceedToDeploy');
@@ -39,6 +55,50 @@ async function testConnections() {
   }
 }
 
+// POST /test-ssh-all and hand each streamed 'host' event to onHost as it
+// arrives; resolves with the final 'done' summary.
+async function testAllConnections(username, sshKey, nodes, onHost) {
+  const res = await fetch('/test-ssh-all', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ username, ssh_key: sshKey, nodes: nodes.map(n => ({ name: n.name, ip: n.ip })) }),
+  });
+  if (!res.ok || !res.body) throw new Error(`test-ssh-all failed (${res.status})`);
+
+  const reader  = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '', summary = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const frames = buffer.split('\n\n');
+    buffer = frames.pop();
+    for (const frame of frames) {
+      if (!frame.startsWith('data: ')) continue;
+      const ev = JSON.parse(frame.slice(6));
+      if (ev.type === 'host') onHost(ev);
+      else if (ev.type === 'done') summary = ev;
+    }
+  }
+  return summary;
+}
+
+function _addRetryButton(item, name, ip, username, sshKey) {
+  if (item.querySelector('.connection-actions')) return;
+  const actions  = document.createElement('div');
+  actions.className = 'connection-actions';
+  const retryBtn = document.createElement('button');
+  retryBtn.className = 'retry-btn'; retryBtn.textContent = '🔄 Retry';
+  retryBtn.addEventListener('click', async () => {
+    retryBtn.disabled = true;
+    await testSingleConnection(name, ip, username, sshKey, true);
+    retryBtn.disabled = false;
+  });
+  actions.appendChild(retryBtn);
+  item.appendChild(actions);
+}
+
 async function testSingleConnection(name, ip, username, sshKey, isRetry = false) {
   const item = document.getElementById(`conn-${name}`);
   if (!item) return false;
@@ -50,19 +110,7 @@ async function testSingleConnection(name, ip, username, sshKey, isRetry = false)
   if (statusEl)  { statusEl.className = 'connection-status loading'; statusEl.textContent = ''; }
   if (messageEl) messageEl.textContent = 'Testing connection...';
 
-  const addRetry = () => {
-    const actions  = document.createElement('div');
-    actions.className = 'connection-actions';
-    const retryBtn = document.createElement('button');
-    retryBtn.className = 'retry-btn'; retryBtn.textContent = '🔄 Retry';
-    retryBtn.addEventListener('click', async () => {
-      retryBtn.disabled = true;
-      await testSingleConnection(name, ip, username, sshKey, true);
-      retryBtn.disabled = false;
-    });
-    actions.appendChild(retryBtn);
-    item.appendChild(actions);
-  };
+  const addRetry = () => _addRetryButton(item, name, ip, username, sshKey);
 
   try {
     const res  = await fetch('/test-ssh', {
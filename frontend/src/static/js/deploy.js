@@ -1,13 +1,15 @@
 // ── Deploy / Uninstall ────────────────────────────────────────────────
 
 const STEP_ICONS = {
-  docker: '🐳', primordial: '⚡', masters: '🖥️', workers: '⚙️',
+  preflight: '🔍', docker: '🐳', distribute: '📦', primordial: '⚡', masters: '🖥️', workers: '⚙️',
 };
 const DONE_ICON = '✓';
 const FAIL_ICON = '✕';
 
 const STEP_DESCRIPTIONS = {
+  preflight:  'Checking every node before anything is installed',
   docker:     'Installing the container runtime across all nodes',
+  distribute: 'Spreading the K3s release from node to node',
   primordial: 'Installing K3s and bootstrapping the primary control plane',
   masters:    'Joining additional nodes to the control plane',
   workers:    'Registering worker nodes with the control plane',
@@ -28,8 +30,10 @@ function _getSSHCreds() {
 
 function _getDeployOptions() {
   return {
-    token:  document.getElementById('k3sToken')?.value.trim()  || '',
-    docker: document.getElementById('dockerToggle')?.checked   || false,
+    token:       document.getElementById('k3sToken')?.value.trim()     || '',
+    docker:      document.getElementById('dockerToggle')?.checked      || false,
+    incremental: document.getElementById('incrementalToggle')?.checked || false,
+    preflight:   document.getElementById('preflightToggle')?.checked   || false,
   };
 }
 
@@ -223,11 +227,11 @@ function _setPhaseState(stepId, state) {
   }
   const nodes = _nodeStatuses[stepId] || {};
   if (state === 'done') {
-    Object.keys(nodes).forEach(n => { if (nodes[n] !== 'failed') _setNodeStatus(stepId, n, 'done'); });
+    Object.keys(nodes).forEach(n => { if (nodes[n] !== 'failed' && nodes[n] !== 'skipped') _setNodeStatus(stepId, n, 'done'); });
   } else if (state === 'failed') {
     Object.keys(nodes).forEach(n => { if (nodes[n] === 'active') _setNodeStatus(stepId, n, 'failed'); });
   } else if (state === 'aborted') {
-    Object.keys(nodes).forEach(n => { if (nodes[n] !== 'done' && nodes[n] !== 'failed') _setNodeStatus(stepId, n, 'aborted'); });
+    Object.keys(nodes).forEach(n => { if (!['done', 'failed', 'skipped'].includes(nodes[n])) _setNodeStatus(stepId, n, 'aborted'); });
   }
 }
 
@@ -237,7 +241,7 @@ function _setNodeStatus(stepId, nodeName, status) {
   const nd = _deployNodes[nodeName];
   if (!nd) return;
   const { el, role, color, hex, ring, nameT, statusT } = nd;
-  el.classList.remove('dhn-idle', 'dhn-active', 'dhn-done', 'dhn-failed', 'dhn-aborted');
+  el.classList.remove('dhn-idle', 'dhn-active', 'dhn-done', 'dhn-failed', 'dhn-aborted', 'dhn-skipped');
   if (status === 'active') {
     el.classList.add('dhn-active');
     hex.setAttribute('fill', 'rgba(99,102,241,0.09)');
@@ -278,6 +282,16 @@ function _setNodeStatus(stepId, nodeName, status) {
     nameT.setAttribute('fill', '#fca5a5');
     statusT.setAttribute('fill', '#f87171');
     statusT.textContent = '✕ FAILED';
+  } else if (status === 'skipped') {
+    // Already converged: nothing to install, shown settled but dimmer than a fresh install.
+    el.classList.add('dhn-skipped');
+    hex.setAttribute('fill', role === 'master' ? 'rgba(156,255,110,0.04)' : 'rgba(125,211,252,0.04)');
+    hex.setAttribute('stroke', color);
+    hex.setAttribute('stroke-width', '1.5');
+    ring.style.opacity = '0';
+    nameT.setAttribute('fill', 'rgba(255,255,255,0.7)');
+    statusT.setAttribute('fill', color);
+    statusT.textContent = '= UNCHANGED';
   } else if (status === 'aborted') {
     el.classList.add('dhn-aborted');
     hex.setAttribute('fill', 'rgba(245,158,11,0.04)');
@@ -322,7 +336,7 @@ function startDeploy() {
     showToast('⚠️ SSH credentials from the connection tab are required.', 4000);
     return;
   }
-  const { token, docker } = _getDeployOptions();
+  const { token, docker, incremental, preflight } = _getDeployOptions();
   if (!token) {
     showToast('⚠️ A cluster token is required in the deploy options.', 4000);
     return;
@@ -331,12 +345,18 @@ function startDeploy() {
   const container = document.getElementById('deploySteps');
   container.innerHTML = '<div style="color:rgba(255,255,255,0.5);text-align:center;">Connecting…</div>';
 
-  const params = new URLSearchParams({ username, ssh_key: sshKey, token, docker });
+  const params = new URLSearchParams({ username, ssh_key: sshKey, token, docker, incremental, preflight });
   const es = new EventSource(`/deploy?${params.toString()}`);
   _eventSource = es;
+  const preflightLog = {};   // node -> messages (fact summary first, then problems)
 
   es.onmessage = (ev) => {
     let data; try { data = JSON.parse(ev.data); } catch { return; }
+    if (data.type === 'log' && data.step === 'preflight') { (preflightLog[data.node] ||= []).push(data.msg); return; }
+    if (data.type === 'node_failed' && data.step === 'preflight') {
+      const log = preflightLog[data.node] || [];
+      showToast(`${data.node}: ${(log.length > 1 ? log.slice(1) : log).join('; ')}`, 6000);
+    }
     if (data.type === 'steps')      { _renderDeployCanvas(container, data.steps, false); return; }
     if (data.type === 'step_start')  { _setPhaseState(data.step, 'active'); return; }
     if (data.type === 'step_done')   { _setPhaseState(data.step, 'done'); return; }
@@ -344,6 +364,9 @@ function startDeploy() {
     if (data.type === 'node_start')  { _setNodeStatus(data.step, data.node, 'active'); return; }
     if (data.type === 'node_done')   { _setNodeStatus(data.step, data.node, 'done');   return; }
     if (data.type === 'node_failed') { _setNodeStatus(data.step, data.node, 'failed'); return; }
+    if (data.type === 'node_skipped') { _setNodeStatus(data.step, data.node, 'skipped'); return; }
+
+    if (data.type === 'finished' || data.type === 'error') _reportStaged(data.staged);
 
     if (data.type === 'finished') {
       es.close(); _eventSource = null;
@@ -399,6 +422,8 @@ function startDeploy() {
   };
 
   es.onerror = () => {
+    // Still CONNECTING: the browser is resuming the job via Last-Event-ID.
+    if (es.readyState === EventSource.CONNECTING) return;
     es.close(); _eventSource = null;
     const title = document.getElementById('deployTitle')?.textContent || '';
     if (!title.includes('✅') && !title.includes('❌') && !title.includes('⛔')) {
@@ -412,6 +437,13 @@ function startDeploy() {
   };
 }
 
+// Pipelined deploys pre-stage joining nodes; a failed run leaves those with
+// config.yaml written and K3s installed but not started.
+function _reportStaged(staged) {
+  if (!staged || !staged.length) return;
+  showToast(`⚠️ Pre-staged but not started: ${staged.join(', ')}. Redeploy or uninstall to clean them up.`, 8000);
+}
+
 function abortDeploy() {
   showConfirmToast('Abort the running deployment?', async () => {
     try { await fetch('/deploy-abort', { method: 'POST' }); }
@@ -123,7 +123,8 @@ function setupHandlers() {
   // ── Deploy ─────────────────────────────────────────────────────────
   const startDeployBtn = document.getElementById('startDeploy');
   if (startDeployBtn) startDeployBtn.addEventListener('click', () => {
-    if (clusterDeployed) { showToast('⚠️ A cluster is already deployed. Uninstall first before redeploying.', 4000); return; }
+    const incremental = document.getElementById('incrementalToggle')?.checked;
+    if (clusterDeployed && !incremental) { showToast('⚠️ A cluster is already deployed. Uninstall first before redeploying.', 4000); return; }
     startDeploy();
   });
 
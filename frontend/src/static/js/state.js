@@ -13,6 +13,10 @@ let _nodeStatuses = {};
 // Cluster dashboard (existing cluster flow)
 let _clusterData = { nodes: null, pods: null, services: null, nodeResources: null };
 let _activeClusterSection = 'overview';
+let _kubeSession = null;   // { id, kubeconfig } from POST /kube-sessions
+let _kubeResponses = {};   // request key -> { etag, json } for If-None-Match revalidation
+let _kubeWatch = null;     // EventSource on /kube-watch while the dashboard is open
+let _kubeHistoryTimer = null;   // interval refreshing node sparklines from /kube-metrics
 
 // Welcome-screen uninstall flow
 let _uninstallNodes = [];
@@ -1,11 +1,13 @@
 import json
 import os
 
-from flask import Blueprint, Response, jsonify, request
+from flask import Blueprint, jsonify, request
 
-from config import abort_flag, deploy_state, proc_lock
-from inventory import _load_inventory
-from ssh import _open_ssh_client, _ssh_run_live, _write_temp_key
+from inventory import _inventory_errors, _load_inventory, _local_kubeconfig_path
+from jobs import (_Job, _job_response, _last_event_id, _latest_job, _request_cluster_id,
+                  _start_job, _valid_cluster_id)
+from preflight import _forget_facts
+from ssh import _SSHPool, _remove_temp_key, _ssh_run_live, _write_temp_key
 
 uninstaller_bp = Blueprint('uninstaller', __name__)
 
@@ -13,7 +15,7 @@ uninstaller_bp = Blueprint('uninstaller', __name__)
 # ── Sub-generator ─────────────────────────────────────────────────────────
 
 def _gen_uninstall_node(ip: str, name: str, username: str, key_path: str,
-                        is_server: bool, step_id: str):
+                        pool: _SSHPool, abort, is_server: bool, step_id: str):
     """Sub-generator: run the K3s uninstall script on a single node.
 
     Servers:  /usr/local/bin/k3s-uninstall.sh
@@ -23,7 +25,7 @@ def _gen_uninstall_node(ip: str, name: str, username: str, key_path: str,
     script = 'k3s-uninstall.sh' if is_server else 'k3s-agent-uninstall.sh'
     client = None
     try:
-        client = _open_ssh_client(ip, username, key_path)
+        client = pool.acquire(ip, username, key_path)
         yield _sse({'type': 'node_start', 'step': step_id, 'node': name})
         yield _sse({'type': 'task', 'step': step_id,
                     'task': f'{name}: Running {script}…'})
@@ -37,7 +39,7 @@ def _gen_uninstall_node(ip: str, name: str, username: str, key_path: str,
             f'fi'
         )
         rc = None
-        for line, code in _ssh_run_live(client, _cmd, timeout=120):
+        for line, code in _ssh_run_live(client, _cmd, timeout=120, abort=abort):
             if code is None:
                 yield _sse({'type': 'log', 'step': step_id, 'node': name, 'msg': line})
             else:
@@ -59,7 +61,7 @@ def _gen_uninstall_node(ip: str, name: str, username: str, key_path: str,
         for line, _ in _ssh_run_live(
                 client,
                 'RUNNING=$(docker ps -q 2>/dev/null); [ -n "$RUNNING" ] && docker kill $RUNNING 2>&1 || true',
-                timeout=60):
+                timeout=60, abort=abort):
             if line is not None:
                 yield _sse({'type': 'log', 'step': step_id, 'node': name, 'msg': line})
 
@@ -67,7 +69,7 @@ def _gen_uninstall_node(ip: str, name: str, username: str, key_path: str,
         for line, _ in _ssh_run_live(
                 client,
                 'ALL=$(docker ps -aq 2>/dev/null); [ -n "$ALL" ] && docker rm -f $ALL 2>&1 || true',
-                timeout=60):
+                timeout=60, abort=abort):
             if line is not None:
                 yield _sse({'type': 'log', 'step': step_id, 'node': name, 'msg': line})
 
@@ -87,22 +89,32 @@ def _gen_uninstall_node(ip: str, name: str, username: str, key_path: str,
         return -1
     finally:
         if client:
-            client.close()
+            pool.release(client)
 
 
 # ── Main uninstall stream generator ──────────────────────────────────────
 
-def _stream_k3s_uninstall(username: str, key_path: str):
-    """Generator: uninstalls K3s from all nodes via SSH and yields SSE events.
+def _stream_k3s_uninstall(job: _Job, username: str, key_path: str):
+    """Generator: uninstalls K3s from *job*'s cluster via SSH and yields SSE events.
 
     Order: workers → joining masters → primordial → local kubeconfig cleanup.
     """
     def _sse(d): return f"data: {json.dumps(d)}\n\n"
 
+    abort = job.abort
+    pool  = _SSHPool()
+    nodes = []
     try:
-        nodes = _load_inventory()
+        # A node file that does not parse must not shrink the cluster silently.
+        errors = _inventory_errors(job.cluster_id)
+        if errors:
+            job.status = 'failed'
+            yield _sse({'type': 'error', 'errors': errors,
+                        'msg': f"Invalid inventory file(s): {'; '.join(errors)}"})
+            return
+        nodes = _load_inventory(job.cluster_id)
         if not nodes:
-            deploy_state.status = 'failed'
+            job.status = 'failed'
             yield _sse({'type': 'error', 'msg': 'No inventory found.'})
             return
 
@@ -127,15 +139,15 @@ def _stream_k3s_uninstall(username: str, key_path: str):
             yield _sse({'type': 'step_start', 'step': 'workers'})
             step_ok = True
             for node in workers:
-                if abort_flag.is_set():
+                if abort.is_set():
                     break
                 rc = yield from _gen_uninstall_node(
-                    node['ip'], node['name'], username, key_path, False, 'workers')
+                    node['ip'], node['name'], username, key_path, pool, abort, False, 'workers')
                 if rc != 0:
                     step_ok = False
 
-            if abort_flag.is_set():
-                deploy_state.status = 'aborted'
+            if abort.is_set():
+                job.status = 'aborted'
                 yield _sse({'type': 'finished', 'success': False, 'aborted': True})
                 return
 
@@ -151,15 +163,15 @@ def _stream_k3s_uninstall(username: str, key_path: str):
             yield _sse({'type': 'step_start', 'step': 'masters'})
             step_ok = True
             for node in joining_masters:
-                if abort_flag.is_set():
+                if abort.is_set():
                     break
                 rc = yield from _gen_uninstall_node(
-                    node['ip'], node['name'], username, key_path, True, 'masters')
+                    node['ip'], node['name'], username, key_path, pool, abort, True, 'masters')
                 if rc != 0:
                     step_ok = False
 
-            if abort_flag.is_set():
-                deploy_state.status = 'aborted'
+            if abort.is_set():
+                job.status = 'aborted'
                 yield _sse({'type': 'finished', 'success': False, 'aborted': True})
                 return
 
@@ -174,10 +186,11 @@ def _stream_k3s_uninstall(username: str, key_path: str):
         if primordial:
             yield _sse({'type': 'step_start', 'step': 'primordial'})
             rc = yield from _gen_uninstall_node(
-                primordial['ip'], primordial['name'], username, key_path, True, 'primordial')
+                primordial['ip'], primordial['name'], username, key_path, pool, abort,
+                True, 'primordial')
 
-            if abort_flag.is_set():
-                deploy_state.status = 'aborted'
+            if abort.is_set():
+                job.status = 'aborted'
                 yield _sse({'type': 'finished', 'success': False, 'aborted': True})
                 return
 
@@ -186,7 +199,7 @@ def _stream_k3s_uninstall(username: str, key_path: str):
                 overall_ok = False
             else:
                 # Clean local kubeconfig only when primordial cleaned successfully
-                kube_path = os.path.expanduser('~/.kube/k3s.yaml')
+                kube_path = _local_kubeconfig_path(job.cluster_id)
                 try:
                     if os.path.exists(kube_path):
                         os.remove(kube_path)
@@ -194,40 +207,45 @@ def _stream_k3s_uninstall(username: str, key_path: str):
                     pass  # Non-fatal
                 yield _sse({'type': 'step_done', 'step': 'primordial'})
 
-        deploy_state.status = 'success' if overall_ok else 'failed'
+        job.status = 'success' if overall_ok else 'failed'
         yield _sse({'type': 'finished', 'success': overall_ok})
 
     except Exception as exc:
-        deploy_state.status = 'failed'
+        job.status = 'failed'
         yield _sse({'type': 'error', 'msg': str(exc)})
     finally:
-        try:
-            os.unlink(key_path)
-        except OSError:
-            pass
+        _forget_facts(n['ip'] for n in nodes)
+        pool.close()
+        _remove_temp_key(key_path)
 
 
 # ── Route ─────────────────────────────────────────────────────────────────
 
 @uninstaller_bp.route('/uninstall', methods=['GET'])
 def uninstall():
+    cluster_id = _request_cluster_id()
+    if not _valid_cluster_id(cluster_id):
+        return jsonify({'status': 'error', 'message': 'Invalid cluster id.'}), 400
+
+    # EventSource reconnects send Last-Event-ID: re-attach to the cluster's
+    # uninstall job instead of starting a new one.
+    if 'Last-Event-ID' in request.headers:
+        job = _latest_job(cluster_id, 'uninstall')
+        if job is None:
+            return jsonify({'status': 'error', 'message': 'No uninstall job to resume.'}), 404
+        return _job_response(job, _last_event_id())
+
     username = request.args.get('username', '').strip()
     ssh_key  = request.args.get('ssh_key',  '').strip()
 
     if not username or not ssh_key:
         return jsonify({'status': 'error', 'message': 'Missing SSH credentials.'}), 400
 
-    with proc_lock:
-        if deploy_state.status == 'running':
-            return jsonify({'status': 'error',
-                            'message': 'A process is already running.'}), 409
-        deploy_state.status = 'running'
-
-    abort_flag.clear()
     key_path = _write_temp_key(ssh_key)
-
-    def gen():
-        yield from _stream_k3s_uninstall(username, key_path)
-
-    return Response(gen(), mimetype='text/event-stream',
-                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    job = _start_job('uninstall', cluster_id,
+                     lambda j: _stream_k3s_uninstall(j, username, key_path))
+    if job is None:
+        _remove_temp_key(key_path)
+        return jsonify({'status': 'error',
+                        'message': 'A process is already running for this cluster.'}), 409
+    return _job_response(job)
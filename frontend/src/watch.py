@@ -0,0 +1,258 @@
+import json
+import queue
+import time
+from threading import Lock, Thread
+
+from flask import Blueprint, Response, jsonify, request
+
+from config import (SSE_KEEPALIVE_INTERVAL, WATCH_BACKOFF_MAX, WATCH_LINGER, WATCH_QUEUE_SIZE,
+                    WATCH_TIMEOUT)
+from kubeapi import (_TABLE_ACCEPT, _KubeAPIError, _KubeAPIUnavailable, _client_for,
+                     _table_columns, _table_row)
+from kubectl import _get_session
+
+watch_bp = Blueprint('watch', __name__)
+
+# resource -> (API path, wide, namespaced); same columns as the /kubectl-* views
+_WATCHABLE = {
+    'nodes':    ('/api/v1/nodes',    True,  False),
+    'pods':     ('/api/v1/pods',     True,  True),
+    'services': ('/api/v1/services', False, True),
+}
+
+_watchers      = {}   # (cluster identity, resource) -> _Watcher
+_watchers_lock = Lock()
+
+
+class _Gone(Exception):
+    """The watch's resourceVersion is too old (410); a relist is needed."""
+
+
+class _Subscription:
+    """One browser stream's event queue, shared by every watcher it follows.
+
+    A subscriber that falls WATCH_QUEUE_SIZE events behind is marked
+    overflowed instead of blocking the watchers; its stream then ends and
+    the browser reconnects to a fresh 'reset'.
+    """
+
+    def __init__(self):
+        self.queue      = queue.Queue(maxsize=WATCH_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+def _row_key(row: dict) -> str:
+    meta = (row.get('object') or {}).get('metadata') or {}
+    return f"{meta.get('namespace', '')}/{meta.get('name', '')}"
+
+
+class _Watcher:
+    """One upstream list+watch of a resource for one cluster.
+
+    Holds the current rows in memory and fans every change out to all
+    browser subscribers, so N open dashboards cost one API watch. The
+    thread stops once it has had no subscribers for WATCH_LINGER seconds.
+
+    It talks to the cluster through the shared `_client_for` client, never
+    a session's own, so it keeps working after that session is closed.
+    """
+
+    def __init__(self, key: tuple, kubeconfig: str, resource: str):
+        self.key          = key
+        self.resource     = resource
+        self._kubeconfig  = kubeconfig
+        self._path, self._wide, self._namespaced = _WATCHABLE[resource]
+        self._columns     = []
+        self._headers     = []
+        self._rows        = {}     # row key -> row cells
+        self._version     = None   # resourceVersion to resume the watch from
+        self._subscribers = set()
+        self._idle_since  = time.monotonic()
+        self._lock        = Lock()
+        self._ready       = False
+
+    # ── Subscribers ──────────────────────────────────────────────────────
+
+    def _reset_event(self) -> dict:
+        return {'type': 'reset', 'resource': self.resource, 'headers': self._headers,
+                'keys': list(self._rows), 'rows': list(self._rows.values())}
+
+    def subscribe(self, sub: _Subscription):
+        """Register *sub*; it receives the current state first."""
+        with self._lock:
+            self._subscribers.add(sub)
+            if self._ready:
+                sub.put(self._reset_event())
+
+    def unsubscribe(self, sub: _Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+            if not self._subscribers:
+                self._idle_since = time.monotonic()
+
+    def _publish(self, event: dict):
+        # Caller holds self._lock.
+        for sub in self._subscribers:
+            sub.put(event)
+
+    def _should_stop(self) -> bool:
+        with _watchers_lock, self._lock:
+            if self._subscribers or time.monotonic() - self._idle_since < WATCH_LINGER:
+                return False
+            if _watchers.get(self.key) is self:
+                del _watchers[self.key]
+            return True
+
+    # ── Upstream ─────────────────────────────────────────────────────────
+
+    def _list(self):
+        table = _client_for(self._kubeconfig).get_json(self._path, {'includeObject': 'Metadata'},
+                                      accept=_TABLE_ACCEPT)
+        if table.get('kind') != 'Table':
+            raise _KubeAPIUnavailable('API server does not support the Table format.')
+        columns, headers = _table_columns(table, self._wide, self._namespaced)
+        rows = {_row_key(row): _table_row(row, columns, self._namespaced)
+                for row in table.get('rows', [])}
+        with self._lock:
+            self._columns, self._headers, self._rows = columns, headers, rows
+            self._version = (table.get('metadata') or {}).get('resourceVersion')
+            self._ready   = True
+            self._publish(self._reset_event())
+
+    def _watch(self):
+        query = {'watch': 'true', 'includeObject': 'Metadata', 'allowWatchBookmarks': 'true',
+                 'resourceVersion': self._version, 'timeoutSeconds': WATCH_TIMEOUT}
+        lines = _client_for(self._kubeconfig).stream(self._path, query, accept=_TABLE_ACCEPT,
+                                    timeout=WATCH_TIMEOUT + 15)
+        try:
+            for line in lines:
+                self._apply(json.loads(line))
+                if self._should_stop():
+                    return
+        except _KubeAPIError as exc:
+            if exc.status == 410:
+                raise _Gone()
+            raise
+        finally:
+            lines.close()
+
+    def _apply(self, event: dict):
+        kind = event.get('type')
+        obj  = event.get('object') or {}
+        if kind == 'ERROR':
+            if obj.get('code') == 410:
+                raise _Gone()
+            raise _KubeAPIError(obj.get('code') or 500, obj.get('message') or 'watch error')
+        if kind == 'BOOKMARK':
+            self._version = (obj.get('metadata') or {}).get('resourceVersion') or self._version
+            return
+
+        if obj.get('columnDefinitions'):
+            columns, _ = _table_columns(obj, self._wide, self._namespaced)
+        else:
+            columns = self._columns
+        with self._lock:
+            for row in obj.get('rows', []):
+                key   = _row_key(row)
+                cells = _table_row(row, columns, self._namespaced)
+                meta  = (row.get('object') or {}).get('metadata') or {}
+                self._version = meta.get('resourceVersion') or self._version
+                if kind == 'DELETED':
+                    self._rows.pop(key, None)
+                else:
+                    self._rows[key] = cells
+                self._publish({'type': kind, 'resource': self.resource, 'key': key,
+                               'row': cells})
+
+    def run(self):
+        backoff = 1
+        relist  = True
+        while not self._should_stop():
+            try:
+                if relist:
+                    self._list()
+                    relist = False
+                self._watch()
+                backoff = 1
+            except _Gone:
+                relist = True
+            except Exception as exc:
+                with self._lock:
+                    self._publish({'type': 'error', 'resource': self.resource,
+                                   'message': str(exc)})
+                time.sleep(backoff)
+                backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+                relist  = True
+
+
+def _subscribe(sess, resource: str, sub: _Subscription) -> _Watcher:
+    """Attach *sub* to the shared watcher for *resource* on the session's
+    cluster, starting one on first use.
+
+    Subscribing under the registry lock keeps an idle watcher from stopping
+    between lookup and subscription.
+    """
+    key = (sess.identity, resource)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            sess.client()   # raises _KubeAPIUnavailable for an unusable kubeconfig
+            watcher = _watchers[key] = _Watcher(key, sess.kubeconfig, resource)
+            Thread(target=watcher.run, daemon=True).start()
+        watcher.subscribe(sub)
+    return watcher
+
+
+# ── Routes ────────────────────────────────────────────────────────────────
+
+@watch_bp.route('/kube-watch', methods=['GET'])
+def kube_watch():
+    """SSE stream of resource deltas for a kubeconfig session.
+
+    Each resource starts with a 'reset' event (headers, keys, rows), then
+    ADDED / MODIFIED / DELETED events carrying one row keyed by
+    'namespace/name'. A new 'reset' follows any relist (410 Gone, upstream
+    errors, or this subscriber falling behind).
+    """
+    sess = _get_session(request.args.get('session', ''))
+    if sess is None:
+        return jsonify({'status': 'error', 'message': 'Unknown or expired session.'}), 404
+    resources = [r for r in request.args.get('resources', 'nodes,pods,services').split(',') if r]
+    unknown   = [r for r in resources if r not in _WATCHABLE]
+    if unknown:
+        return jsonify({'status': 'error',
+                        'message': f"Cannot watch: {', '.join(unknown)}"}), 400
+    sub      = _Subscription()
+    watchers = []
+    try:
+        for resource in resources:
+            watchers.append(_subscribe(sess, resource, sub))
+    except _KubeAPIUnavailable as exc:
+        for watcher in watchers:
+            watcher.unsubscribe(sub)
+        return jsonify({'status': 'error',
+                        'message': f'Live updates need direct API access: {exc}'}), 400
+
+    def _stream():
+        try:
+            while not sub.overflowed:
+                try:
+                    event = sub.queue.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            for watcher in watchers:
+                watcher.unsubscribe(sub)
+
+    return Response(_stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import inventory  # noqa: E402
+import jobs  # noqa: E402
+from main import app  # noqa: E402
+
+
+@pytest.fixture
+def inv_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(inventory, 'K3S_INVENTORY_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _import(body: str, cluster: str = 'default'):
+    return app.test_client().post(f'/import-inventory?format=csv&cluster={cluster}',
+                                  data=body, content_type='text/csv')
+
+
+def test_import_default_cluster_keeps_other_clusters(inv_root):
+    (inv_root / 'old-worker.yaml').write_text('name: old-worker\nip: 10.0.0.9\nrole: worker\n')
+    (inv_root / 'notes.txt').write_text('keep me')
+    prod = inv_root / 'prod'
+    prod.mkdir()
+    (prod / 'p1.yaml').write_text('name: p1\nip: 10.1.0.1\nrole: master\nprimordial: true\n')
+
+    res = _import('name,ip,role\nm1,10.0.0.1,master\nw1,10.0.0.2,worker\n')
+
+    assert res.status_code == 200, res.get_json()
+    assert sorted(p.name for p in inv_root.iterdir()) == ['m1.yaml', 'notes.txt', 'prod', 'w1.yaml']
+    assert yaml.safe_load((inv_root / 'm1.yaml').read_text())['primordial'] is True
+    assert (prod / 'p1.yaml').read_text().startswith('name: p1')
+    assert [n['name'] for n in inventory._load_inventory('prod')] == ['p1']
+
+
+def test_failed_import_leaves_inventory_untouched(inv_root):
+    (inv_root / 'old-worker.yaml').write_text('name: old-worker\nip: 10.0.0.9\nrole: worker\n')
+
+    res = _import('name,ip,role\nm1,10.0.0.1,master\nbad,not-an-ip,worker\n')
+
+    assert res.status_code == 400
+    assert sorted(p.name for p in inv_root.iterdir()) == ['old-worker.yaml']
+
+
+def test_failed_import_into_new_cluster_leaves_no_directory(inv_root):
+    res = _import('name,ip,role\nw1,10.0.0.2,worker\n', cluster='staging')
+
+    assert res.status_code == 400
+    assert not (inv_root / 'staging').exists()
+
+
+def test_import_refused_when_a_job_starts_before_commit(inv_root, monkeypatch):
+    (inv_root / 'old-worker.yaml').write_text('name: old-worker\nip: 10.0.0.9\nrole: worker\n')
+    release = threading.Event()
+    finish  = inventory._InventoryImport.finish
+
+    def running(job):
+        release.wait(10)
+        yield ''
+
+    def finish_then_deploy(self):
+        finish(self)
+        jobs._start_job('deploy', 'default', running)
+
+    monkeypatch.setattr(inventory._InventoryImport, 'finish', finish_then_deploy)
+    try:
+        res = _import('name,ip,role\nm1,10.0.0.1,master\n')
+    finally:
+        release.set()
+
+    assert res.status_code == 409
+    assert sorted(p.name for p in inv_root.iterdir()) == ['old-worker.yaml']